@@ -22,6 +22,8 @@ if __name__ == "__main__":
     # sys.argv = sys.argv[:1] + remain
 
     if pargs.filename is not None:
-        pyiridium9602.run_serial_log_file(pargs.filename, pargs.p)
+        result = pyiridium9602.run_serial_log_file(pargs.filename, pargs.p)
+        print("Replayed {} commands ({:,} bytes) in {:.3f} sec ({:.1f} MB/s)".format(
+            result.commands, result.size, result.seconds, result.mb_per_sec))
     else:
         pyiridium9602.run_communicator(pargs.p)
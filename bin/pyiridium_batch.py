@@ -0,0 +1,6 @@
+import sys
+
+from pyiridium9602.pyiridium_batch import main
+
+if __name__ == "__main__":
+    sys.exit(main())
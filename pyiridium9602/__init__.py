@@ -2,6 +2,27 @@ from .__meta__ import version as __version__
 
 from .pyiridium import Command, MO_STATUS, MT_STATUS, IridiumError, \
     parse_system_time, parse_serial_number, parse_signal_quality, parse_check_ring, \
-    parse_session, parse_read_binary, has_read_binary_data, parse_write_binary, \
-    Signal, IridiumCommunicator, run_serial_log_file, run_communicator
-from .pyiridium_server import IridiumServer, run_server
+    parse_session, parse_read_binary, parse_read_binary_into, has_read_binary_data, parse_write_binary, \
+    parse_clear_buffer, ReceiveBuffer, Signal, CommandRequest, ExchangeResult, OutboxFull, Outbox, CommandHandler, \
+    CommandRegistry, COMMANDS, IridiumCommunicator, run_serial_log_file, run_communicator
+from .pyiridium_server import EmulatedModem, IridiumServer, run_server
+from .pyiridium_async import AsyncIridiumCommunicator
+from .pyiridium_hub import IridiumHub
+from .pyiridium_fragment import MO_LIMIT, MT_LIMIT, FRAGMENT_HEADER, split_message, Reassembler, FragmentLayer
+from .pyiridium_codec import CODEC_RAW, CODEC_ZLIB, CODEC_LZMA, CODEC_ZSTD, MessageCodec, train_dictionary
+from .pyiridium_schema import Bool, Enum, Bits, MessageSchema, SchemaRegistry
+from .pyiridium_checksum import checksum, Checksum, checksum_batch, verify_checksums
+from .pyiridium_lexer import SessionResult, RingResult, ResponseLexer, LEXER, lex_response, lex_responses
+from .pyiridium_replay import SEGMENT_DATA, SEGMENT_COMMAND, SEGMENT_RESPONSE, SEGMENT_WRITTEN, CaptureSegment, \
+    read_binary_content, iter_capture, ReplayResult, ReplayEngine
+from .pyiridium_capture import CAPTURE_MAGIC, CAPTURE_READ, CAPTURE_WRITE, CaptureFrame, CaptureWriter, \
+    is_framed_capture, capture_start_time, iter_frames
+from .pyiridium_index import INDEX_EXTENSION, IndexEntry, CaptureIndex
+from .pyiridium_batch import RECORD_FIELDS, BatchResult, decode_capture, find_captures, iter_decoded, decode_batch
+from .pyiridium_loopback import MemoryPort, memory_pair, open_pty, bridge, PtyLoopback, Loopback, back_to_back
+from .pyiridium_farm import FarmStats, EmulatorFarm
+from .pyiridium_link import LINK_FAILURES, SessionOutcome, fixed_latency, uniform_latency, lognormal_latency, \
+    random_walk_csq, LinkModel
+from .pyiridium_gateway import MOMessage, MTMessage, MTConfirmation, GatewayStats, encode_mo, encode_mt, \
+    decode_directip, read_directip, send_directip, DirectIPGateway
+from .pyiridium_metrics import LATENCY_BUCKETS, Histogram, command_family, CommunicatorMetrics, prometheus_text
@@ -30,7 +30,9 @@ if __name__ == "__main__":
         run_server(args.p)
 
     elif args.filename is not None:
-        run_serial_log_file(args.filename, args.p)
+        result = run_serial_log_file(args.filename, args.p)
+        print("Replayed {} commands ({:,} bytes) in {:.3f} sec ({:.1f} MB/s)".format(
+            result.commands, result.size, result.seconds, result.mb_per_sec))
 
     else:
         run_communicator(args.p)
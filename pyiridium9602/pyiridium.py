@@ -6,8 +6,10 @@
 Manages iridium satellite communications.
 Iridium data sheet: http://www.nalresearch.com/Info/AT%20Commands%20for%20Models%209602.pdf
 """
+import os
 import time
 import serial
+import selectors
 import threading
 import collections
 import contextlib
@@ -15,16 +17,24 @@ import datetime
 
 import atexit
 
+from pyiridium9602.pyiridium_checksum import checksum, Checksum
+from pyiridium9602.pyiridium_lexer import LEXER
+from pyiridium9602.pyiridium_metrics import CommunicatorMetrics
+
 
 __all__ = ['Command', 'MO_STATUS', 'MT_STATUS', 'IridiumError',
            'parse_system_time', 'parse_serial_number', 'parse_signal_quality', 'parse_check_ring',
-           'parse_session', 'parse_read_binary', 'has_read_binary_data', 'parse_write_binary',
-           'Signal', 'IridiumCommunicator', 'run_serial_log_file', 'run_communicator']
+           'parse_session', 'parse_read_binary', 'parse_read_binary_into', 'has_read_binary_data',
+           'parse_write_binary', 'parse_clear_buffer', 'ReceiveBuffer', 'Signal', 'CommandRequest', 'ExchangeResult', 'OutboxFull', 'Outbox',
+           'CommandHandler', 'CommandRegistry', 'COMMANDS', 'IridiumCommunicator', 'run_serial_log_file',
+           'run_communicator']
 
 
 class Command:
-    """Commands for Iridium. Maybe in the future make a system where a command is a class associated with a specific 
-    parsing action. That would make it easier to add new commands.
+    """Commands for Iridium.
+
+    See Also:
+        CommandRegistry: Associates a command with the handler that parses its response.
     """
     OK = b'OK'
     RING = b'SBDRING'
@@ -55,6 +65,7 @@ class Command:
     CLEAR_BOTH_BUFFERS = b'AT+SBDD2'
 
     SESSION = b'AT+SBDIX'
+    SESSION_RING_ALERT = b'AT+SBDIXA'  # Session in response to an SBD ring alert
     SESSION_RECEIVE = b'+SBDIX:'
 
     READ_BINARY = b'AT+SBDRB'
@@ -74,14 +85,24 @@ class Command:
         Note:
             The command value is yielded so SESSION yields b'AT+SBDIX'.
         """
-        for name in dir(cls):
-            if not name.startswith(b"_") and name != "OK" and name != "RING" and name != "READY":
-                yield getattr(cls, name)
+        yield from cls.command_set()
+
+    @classmethod
+    def command_set(cls):
+        """Return a cached frozenset of all of the commands except for OK, SBDRING, and READY."""
+        commands = cls.__dict__.get('_command_set')
+        if commands is None:
+            commands = frozenset(getattr(cls, name) for name in dir(cls)
+                                 if not name.startswith("_") and name not in ("OK", "RING", "READY")
+                                 and isinstance(getattr(cls, name), bytes))
+            cls._command_set = commands
+        return commands
 
     @classmethod
     def is_command(cls, data):
         """Return if the data is a command."""
-        return data in cls.all_commands() or data + b'\r' in cls.all_commands()
+        commands = cls.command_set()
+        return data in commands or data + b'\r' in commands
 # end Command
 
 
@@ -142,23 +163,9 @@ def parse_system_time(data):
         IridiumError: If the data could not be parsed
     """
     try:
-        # Find the Message data
-        resp = data.strip()
-        idx = resp.find(b"-MSSTM:")
-        if idx >= 0:
-            resp = resp[idx+7:].strip()
-            endline = resp.find(b'\n')
-            if endline >= 0:
-                resp = resp[:endline].strip()
-
-            # Check the data
-            split_resp = resp.decode("utf-8")
-            if len(split_resp) >= 8:
-                sys_time = int(split_resp, 16)
-                return sys_time
+        return LEXER.lex(data, b"-MSSTM:")
     except Exception as err:
         raise IridiumError("Could not parse the system time!") from err
-    raise IridiumError("Could not parse the system time!")
 # end parse_system_time
 
 
@@ -210,22 +217,9 @@ def parse_signal_quality(data):
         IridiumError: If the data could not be parsed
     """
     try:
-        # Find the Message data
-        resp = data.strip()
-        idx = resp.find(b"+CSQ:")
-        if idx >= 0:
-            resp = resp[idx+5:].strip()
-            endline = resp.find(b'\n')
-            if endline >= 0:
-                resp = resp[:endline].strip()
-
-            # Check the data
-            split_resp = resp.decode("utf-8")
-            sig = int(split_resp)
-            return sig
+        return LEXER.lex(data, b"+CSQ:")
     except Exception as err:
         raise IridiumError("Could not parse the signal quality!") from err
-    raise IridiumError("Could not parse the signal quality!")
 # end parse_signal_quality
 
 
@@ -238,31 +232,18 @@ def parse_check_ring(data):
         data (bytes): Data bytes read in.
 
     Returns:
-        tri (int): Telephone ring indication status
-        sri (int): SBD ring indication status
+        ring (RingResult): Record that unpacks to (tri, sri).
+
+            * tri (int): Telephone ring indication status
+            * sri (int): SBD ring indication status
 
     Raise:
         IridiumError: If the data could not be parsed
     """
     try:
-        # Find the Message data
-        resp = data.strip()
-        idx = resp.find(b"+CRIS:")
-        if idx >= 0:
-            resp = resp[idx+6:].strip()
-            endline = resp.find(b'\n')
-            if endline >= 0:
-                resp = resp[:endline].strip()
-
-            # Check the data
-            split_resp = resp.decode("utf-8")
-            parts = split_resp.split(",")
-            tri = int(parts[0])  # indicates the telephony ring indication status
-            sri = int(parts[1])  # indicates the SBD ring indication status
-            return tri, sri
+        return LEXER.lex(data, b"+CRIS:")
     except Exception as err:
         raise IridiumError("Could not parse the check ring response!") from err
-    raise IridiumError("Could not parse the check ring response!")
 # end parse_check_ring
 
 
@@ -275,51 +256,34 @@ def parse_session(data):
         data (bytes): Data bytes read in.
 
     Returns:
-        mo_status (int): Outgoing status
-        mo_msn (int): Outgoing message serial number
-        mt_status (int): Incoming status
-        mt_msn (int): Incoming message serial number
-        mt_length (int): Incoming message length
-        mt_queued (int): Number of incoming messages queued
+        session (SessionResult): Record that unpacks to (mo_status, mo_msn, mt_status, mt_msn, mt_length, mt_queued).
+
+            * mo_status (int): Outgoing status
+            * mo_msn (int): Outgoing message serial number
+            * mt_status (int): Incoming status
+            * mt_msn (int): Incoming message serial number
+            * mt_length (int): Incoming message length
+            * mt_queued (int): Number of incoming messages queued
 
     Raise:
         IridiumError: If the data could not be parsed
     """
     try:
-        # Find the Message data
-        resp = data.strip()
-        idx = resp.find(b"+SBDIX:")
-        if idx >= 0:
-            resp = resp[idx+7:].strip()
-            endline = resp.find(b'\n')
-            if endline >= 0:
-                resp = resp[:endline].strip()
-
-            # Check the data
-            split_resp = resp.decode("utf-8")
-            parts = split_resp.split(",")
-
-            mo_status = int(parts[0])
-            mo_msn = int(parts[1])
-            mt_status = int(parts[2])
-            mt_msn = int(parts[3])
-            mt_length = int(parts[4])
-            mt_queued = int(parts[5])
-            return mo_status, mo_msn, mt_status, mt_msn, mt_length, mt_queued
-
+        return LEXER.lex(data, b"+SBDIX:")
     except Exception as err:
         raise IridiumError("Could not parse the session!") from err
-    raise IridiumError("Could not parse the session!")
 # end parse_session
 
 
-def parse_read_binary(data):
+def parse_read_binary(data, calc_check=None):
     """Parse and return the values.
 
     Parse the data returned from the message: b'AT+SBDRB'
 
     Args:
         data (bytes): Data bytes read in.
+        calc_check (bytes)[None]: Checksum that was calculated while the data was received. If None the checksum is
+            calculated from the message content.
 
     Returns:
         msg_len (int): Message content length (will not exceed 270 or 340).
@@ -338,20 +302,78 @@ def parse_read_binary(data):
         # Check the data
         msg_len = int.from_bytes(data[:2], "big")
         content = data[2: msg_len + 2]
-        checksum = data[msg_len + 2: msg_len + 2 + 2]
-        if len(checksum) != 2:
+        msg_check = data[msg_len + 2: msg_len + 2 + 2]
+        if len(msg_check) != 2:
             raise ValueError("Not enough data given!")
 
         # Calculate the checksum
-        calc_check = int(sum(content)).to_bytes(4, 'big')[2:]  # smallest 2 bytes of the sum
+        if calc_check is None:
+            calc_check = checksum(content)
 
-        return msg_len, content, checksum, calc_check
+        return msg_len, content, msg_check, calc_check
 
     except Exception as err:
         raise IridiumError("Could not parse the read binary response!") from err
 # end parse_read_binary
 
 
+def parse_read_binary_into(data, buffer, calc_check=None):
+    """Parse the read binary response in place and copy the message content into a reusable buffer.
+
+    This is the zero copy form of `parse_read_binary`. The response is not sliced. The checksum is calculated from the
+    content in the buffer and the content is copied exactly once.
+
+    Args:
+        data (memoryview): Read binary response. This is usually a view of the receive buffer.
+        buffer (bytearray): Reusable buffer that the content is copied into. The buffer grows if the content does not
+            fit. If a view of the old content is still in use a new bytearray is used instead. `content.obj` is the
+            buffer to reuse for the next response.
+        calc_check (bytes)[None]: Checksum that was calculated while the data was received. If None the checksum is
+            calculated from the message content.
+
+    Returns:
+        msg_len (int): Message content length.
+        content (memoryview): View of the buffer with the message content. It is only valid until the buffer is reused.
+        checksum (bytes): 2 checksum bytes included in the read binary message
+        calc_check (bytes): 2 calculated checksum bytes from the message content.
+
+    Raise:
+        IridiumError: If the data could not be parsed
+    """
+    try:
+        if not isinstance(data, memoryview):
+            data = memoryview(data)
+        start = 0
+        if data[:9] != b"AT+SBDRB\r":
+            # Rare. Something was received before the echo or echo is off.
+            idx = bytes(data).find(b"AT+SBDRB\r")
+            if idx >= 0:
+                start = idx + 9
+        else:
+            start = 9
+
+        msg_len = int.from_bytes(data[start: start + 2], "big")
+        end = start + 2 + msg_len
+        if len(data) < end + 2:
+            raise ValueError("Not enough data given!")
+
+        if msg_len > len(buffer):
+            try:
+                buffer += bytes(msg_len - len(buffer))  # Grow the reusable buffer once
+            except BufferError:
+                buffer = bytearray(msg_len)  # A view of the old content is still being used
+        buffer[:msg_len] = data[start + 2: end]
+        content = memoryview(buffer)[:msg_len]
+        if calc_check is None:
+            calc_check = checksum(content)
+
+        return msg_len, content, bytes(data[end: end + 2]), calc_check
+
+    except Exception as err:
+        raise IridiumError("Could not parse the read binary response!") from err
+# end parse_read_binary_into
+
+
 def has_read_binary_data(data):
     """Return True if the given data has enough data for the read binary command. 
 
@@ -365,16 +387,13 @@ def has_read_binary_data(data):
     """
     try:
         idx = data.find(b"AT+SBDRB\r")
-        if idx >= 0:
-            data = data[idx+9:]
-    
-        # Check the data
-        msg_len = int.from_bytes(data[:2], "big")
-        # content = data[2: msg_len + 2]
-        checksum = data[msg_len + 2: msg_len + 2 + 2]
-        if len(checksum) != 2:
+        start = idx + 9 if idx >= 0 else 0
+
+        # Check the length without copying the data
+        if len(data) < start + 2:
             return False
-        return True
+        msg_len = int.from_bytes(data[start: start + 2], "big")
+        return len(data) >= start + 2 + msg_len + 2
 
     except (AttributeError, ValueError, TypeError):
         return False
@@ -403,6 +422,164 @@ def parse_write_binary(data):
 # end parse_write_binary
 
 
+def parse_clear_buffer(data):
+    """Parse and return the values.
+
+    Parse the data returned from the messages: b'AT+SBDD0', b'AT+SBDD1', b'AT+SBDD2'
+
+    Args:
+        data (bytes): Data bytes read in.
+
+    Returns:
+        success (bool): Return True if the response was b'0'.
+    """
+    resp = data.replace(Command.CLEAR_MO_BUFFER, b'').replace(Command.CLEAR_MT_BUFFER, b'')\
+        .replace(Command.CLEAR_BOTH_BUFFERS, b'').strip()
+    return resp == b'0'
+# end parse_clear_buffer
+
+
+class ReceiveBuffer(object):
+    """Growable receive buffer with a read cursor.
+
+    Incoming bytes are appended to a bytearray once and consumed by moving a cursor forward. Searches remember how far
+    they have already scanned for each pattern, so repeated checks like `Command.OK in buffer` only look at the bytes
+    that arrived since the last check instead of rescanning the whole buffer.
+
+    Note:
+        Indexes given to and returned from this object are relative to the read cursor (the first unread byte).
+
+    Args:
+        data (bytes)[b'']: Initial buffer contents.
+        compact_size (int)[4096]: Number of consumed bytes to keep before the consumed data is removed from memory.
+    """
+
+    def __init__(self, data=b'', compact_size=4096):
+        self._buf = bytearray(data)
+        self._pos = 0
+        self._scanned = {}  # pattern: absolute index where the next search for the pattern can start
+        self.compact_size = compact_size
+
+    def __len__(self):
+        return len(self._buf) - self._pos
+
+    def __bytes__(self):
+        return bytes(self._buf[self._pos:])
+
+    def __contains__(self, sub):
+        return self.find(sub) >= 0
+
+    def __eq__(self, other):
+        if isinstance(other, ReceiveBuffer):
+            other = bytes(other)
+        return bytes(self) == other
+
+    def __repr__(self):
+        return "ReceiveBuffer(" + repr(bytes(self)) + ")"
+
+    def extend(self, data):
+        """Append the given bytes to the end of the buffer."""
+        self._buf += data
+
+    def clear(self):
+        """Remove all of the data from the buffer."""
+        self._buf.clear()
+        self._pos = 0
+        self._scanned.clear()
+
+    def find(self, sub, start=0):
+        """Return the index of the first occurrence of sub at or after start or -1 if sub was not found.
+
+        Only the bytes that have not been scanned for this pattern before are searched.
+        """
+        pos = self._pos
+        begin = pos + start
+        resume = self._scanned.get(sub, pos)
+        if resume < pos:
+            resume = pos
+        contiguous = resume >= begin
+        if contiguous:
+            begin = resume
+
+        idx = self._buf.find(sub, begin)
+        if contiguous:
+            # Nothing before idx (or the end of the buffer) matches, so remember where to resume scanning
+            if idx < 0:
+                self._scanned[sub] = max(begin, len(self._buf) - len(sub) + 1)
+            else:
+                self._scanned[sub] = idx
+        if idx < 0:
+            return -1
+        return idx - pos
+
+    def index(self, sub, start=0):
+        """Return the index of the first occurrence of sub at or after start.
+
+        Raises:
+            ValueError: If the sub bytes were not found.
+        """
+        idx = self.find(sub, start)
+        if idx < 0:
+            raise ValueError("subsection not found")
+        return idx
+
+    def endswith(self, suffix):
+        """Return if the unread data ends with the given suffix."""
+        return len(self) >= len(suffix) and self._buf.endswith(suffix)
+
+    def view(self, start=0, end=None):
+        """Return a memoryview of the unread bytes from start to end without copying or consuming them.
+
+        Note:
+            The buffer cannot grow or be consumed while the view exists. Call `release()` on the view when done.
+        """
+        if end is None:
+            end = len(self)
+        return memoryview(self._buf)[self._pos + start: self._pos + end]
+
+    def sum(self, start=0, end=None):
+        """Return the sum of the unread byte values from start to end without consuming them."""
+        if end is None:
+            end = len(self)
+        return sum(self._buf[self._pos + start: self._pos + end])
+
+    def peek(self, start=0, end=None):
+        """Return a copy of the unread bytes from start to end without consuming them."""
+        if end is None:
+            end = len(self)
+        return bytes(self._buf[self._pos + start: self._pos + end])
+
+    def take(self, size):
+        """Consume and return the next size bytes."""
+        data = self.peek(0, size)
+        self.consume(size)
+        return data
+
+    def consume(self, size):
+        """Move the read cursor forward size bytes, discarding the data."""
+        self._pos = min(self._pos + size, len(self._buf))
+        if self._pos == len(self._buf):
+            self.clear()
+        elif self._pos >= self.compact_size and self._pos * 2 >= len(self._buf):
+            # Drop consumed bytes from memory. Only happens after the cursor passed half of the buffer, so every byte
+            # is moved at most a constant number of times.
+            del self._buf[:self._pos]
+            self._scanned = {sub: idx - self._pos for sub, idx in self._scanned.items() if idx >= self._pos}
+            self._pos = 0
+
+    def trim_lines(self):
+        """Discard all complete lines keeping only the trailing partial line."""
+        buf = self._buf
+        if buf.endswith(b'\n') or buf.endswith(b'\r'):
+            self.clear()
+            return
+
+        idx = max(buf.rfind(b'\n', self._pos), buf.rfind(b'\r', self._pos))
+        if idx >= 0:
+            self.consume(idx + 1 - self._pos)
+# end class ReceiveBuffer
+
+
 class Signal(object):
     def connecting(self):
         """This method is called when the connection process is about to start."""
@@ -527,6 +704,570 @@ class Signal(object):
 # end class Signal
 
 
+class CommandRequest(object):
+    """Result handle for a command that is queued and written by the listen thread.
+
+    The listen thread writes the command when it reaches the front of the queue and stores the result in this object
+    when the command finishes. Commands that the response handler queues while this command is finishing (like the
+    read binary command after a session) are tracked as follow up requests.
+
+    Args:
+        command (bytes): Command bytes to send without the b'\r'.
+        options (dict)[None]: Options that override `IridiumCommunicator.get_option` while this command and its
+            follow up commands are handled.
+        payload (bytes)[None]: Message that is written when the modem is READY (write binary commands).
+    """
+
+    def __init__(self, command, options=None, payload=None):
+        self.command = command
+        self.options = options or {}
+        self.payload = payload
+        self.success = False
+        self.value = None
+        self.data = b''
+        self.follow_ups = []
+        self.planned = []  # Requests that are written right after this request succeeds
+        self.cancelled = False
+        self.dropped = None  # Reason the request was dropped from the outbox without being written
+        self.message = None  # Decoded message that a read binary request received
+        self.decode_error = None  # Reason the message could not be decoded. The message is then the raw bytes
+        self._written = threading.Event()
+        self._finished = threading.Event()
+
+    def __repr__(self):
+        return "CommandRequest(" + repr(self.command) + ")"
+
+    def add_follow_up(self, command):
+        """Create and return a follow up request for a command that was queued while handling this request."""
+        request = self.__class__(command, self.options)
+        self.follow_ups.append(request)
+        return request
+
+    def then(self, command, payload=None):
+        """Plan a command to be written right after this command succeeds and return its request.
+
+        The planned request is dropped if this command fails.
+        """
+        request = self.__class__(command, self.options, payload)
+        self.planned.append(request)
+        return request
+
+    def set_written(self):
+        """Mark that the command was written to the serial port."""
+        self._written.set()
+
+    def drop(self, reason):
+        """Mark that the command will never be written and wake up the waiting threads with a failed result."""
+        self.cancelled = True
+        self.dropped = reason
+        self._written.set()
+        self.set_result(False)
+
+    def set_result(self, success, value=None, data=b''):
+        """Store the result of the command and wake up the waiting threads."""
+        self.success = success
+        self.value = value
+        self.data = data
+        self._finished.set()
+
+    def is_written(self):
+        """Return if the command was written to the serial port."""
+        return self._written.is_set() and self.dropped is None
+
+    def is_finished(self):
+        """Return if the command finished."""
+        return self._finished.is_set()
+
+    def wait_written(self, timeout=None):
+        """Wait for the command to be written or dropped. Return False if the timeout expired."""
+        return self._written.wait(timeout)
+
+    def wait(self, timeout=None):
+        """Wait for the command and all of its follow up commands to finish. Return False if the timeout expired."""
+        end = None if timeout is None else time.time() + timeout
+        for request in self.iter_requests():
+            remaining = None if end is None else max(end - time.time(), 0)
+            if not request._finished.wait(remaining):
+                return False
+        return True
+
+    def iter_requests(self):
+        """Iterate through this request and all of the follow up requests in the order they were queued.
+
+        Follow up requests are only known after their parent request finished.
+        """
+        yield self
+        for request in self.follow_ups:
+            yield from request.iter_requests()
+    # end iter_requests
+# end class CommandRequest
+
+
+class ExchangeResult(object):
+    """Result of `IridiumCommunicator.exchange`.
+
+    Attributes:
+        mo_status (int): Outgoing status. 0 - 4 means that the message was transferred. See MO_STATUS.
+        mo_msn (int): Outgoing message serial number.
+        mt_status (int): Incoming status. 0 no message, 1 message received, 2 error. See MT_STATUS.
+        mt_msn (int): Incoming message serial number.
+        mt_length (int): Incoming message length.
+        mt_queued (int): Number of incoming messages still waiting at the gateway.
+        mt_payload (bytes): Received message or None if no message was received or it failed the checksum.
+        mt_decode_error (str): Reason the received message could not be decoded with the `codec` or None. The
+            mt_payload is the message as it was received when this is set.
+    """
+
+    def __init__(self, session, mt_payload=None, mt_decode_error=None):
+        self.mo_status, self.mo_msn, self.mt_status, self.mt_msn, self.mt_length, self.mt_queued = session
+        self.mt_payload = mt_payload
+        self.mt_decode_error = mt_decode_error
+
+    def __repr__(self):
+        return "ExchangeResult(mo_status={}, mo_msn={}, mt_status={}, mt_msn={}, mt_queued={}, mt_payload={!r})" \
+            .format(self.mo_status, self.mo_msn, self.mt_status, self.mt_msn, self.mt_queued, self.mt_payload)
+
+    @property
+    def mo_transferred(self):
+        """Return if the outgoing message was transferred."""
+        return 4 >= self.mo_status >= 0
+# end class ExchangeResult
+
+
+class OutboxFull(IridiumError):
+    """The outbox is full and the command was not queued."""
+    pass
+
+
+class Outbox(object):
+    """Bounded priority queue of the commands that are waiting to be written to the modem.
+
+    A lower lane number is written first and each lane is first in first out. Items can expire, so stale telemetry is
+    dropped instead of being sent late. When the outbox is full `put` either waits for space or raises `OutboxFull`.
+    Items are never dropped silently. Rejected and expired items are counted in `stats()` and a dropped
+    `CommandRequest` fails with the `dropped` reason set.
+
+    Args:
+        capacity (int)[100]: Maximum number of queued items. None or 0 for no limit.
+        lanes (int)[3]: Number of priority lanes.
+    """
+
+    PRIORITY_HIGH = 0
+    PRIORITY_NORMAL = 1
+    PRIORITY_LOW = 2
+
+    def __init__(self, capacity=100, lanes=3):
+        self.capacity = capacity
+        self._lanes = [collections.deque() for _ in range(lanes)]  # (item, deadline)
+        self._size = 0
+        self._not_full = threading.Condition()
+        self._counts = dict.fromkeys(('queued', 'written', 'rejected', 'expired', 'cancelled'), 0)
+        self.high_water = 0  # Largest depth that was reached
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        """Iterate over a snapshot of the queued items in the order they will be written."""
+        with self._not_full:
+            items = [item for lane in self._lanes for item, _ in lane]
+        return iter(items)
+
+    def is_full(self):
+        """Return if there is no space for another item."""
+        return bool(self.capacity) and self._size >= self.capacity
+
+    def lane_depths(self):
+        """Return a list of the number of queued items in each lane."""
+        return [len(lane) for lane in self._lanes]
+
+    def _drop(self, item, reason):
+        """Count a dropped item and fail it if it is a request."""
+        self._counts[reason] += 1
+        if isinstance(item, CommandRequest):
+            item.drop(reason)
+
+    def put(self, item, priority=PRIORITY_NORMAL, expires=None, block=False, timeout=None, force=False):
+        """Queue an item to be written.
+
+        Args:
+            item (bytes/CommandRequest): Command or request to queue.
+            priority (int)[PRIORITY_NORMAL]: Lane to queue the item in. Lane 0 is written first.
+            expires (float)[None]: Seconds from now after which the item is dropped instead of being written.
+            block (bool)[False]: If True wait for space when the outbox is full.
+            timeout (float)[None]: Maximum time in seconds to wait for space when blocking.
+            force (bool)[False]: Queue the item even if the outbox is full. Used for protocol follow up commands.
+
+        Raises:
+            OutboxFull: If the outbox is full and there was no space in time.
+        """
+        deadline = None if expires is None else time.monotonic() + expires
+        with self._not_full:
+            if not force and self.is_full():
+                if not block or not self._not_full.wait_for(lambda: not self.is_full(), timeout):
+                    self._drop(item, 'rejected')
+                    raise OutboxFull("The outbox is full! " + repr(item) + " was not queued.")
+
+            self._lanes[priority].append((item, deadline))
+            self._size += 1
+            self._counts['queued'] += 1
+            if self._size > self.high_water:
+                self.high_water = self._size
+    # end put
+
+    def push(self, items):
+        """Queue items in front of all of the other items in the given order.
+
+        Used for follow up commands, so a chain of commands is written without other commands in between. The capacity
+        is not checked.
+        """
+        with self._not_full:
+            self._lanes[0].extendleft((item, None) for item in reversed(items))
+            self._size += len(items)
+            self._counts['queued'] += len(items)
+            if self._size > self.high_water:
+                self.high_water = self._size
+    # end push
+
+    def get(self):
+        """Remove and return the next item to write or None if nothing is queued.
+
+        Expired and cancelled items are dropped along the way.
+        """
+        with self._not_full:
+            now = None
+            for lane in self._lanes:
+                while lane:
+                    item, deadline = lane.popleft()
+                    self._size -= 1
+                    self._not_full.notify()
+
+                    if getattr(item, 'cancelled', False):
+                        self._counts['cancelled'] += 1
+                        continue
+                    if deadline is not None:
+                        if now is None:
+                            now = time.monotonic()
+                        if deadline <= now:
+                            self._drop(item, 'expired')
+                            continue
+
+                    self._counts['written'] += 1
+                    return item
+        return None
+    # end get
+
+    def expire(self):
+        """Drop all of the expired items now instead of when they reach the front of the queue."""
+        with self._not_full:
+            now = time.monotonic()
+            for i, lane in enumerate(self._lanes):
+                if any(deadline is not None and deadline <= now for _, deadline in lane):
+                    keep = collections.deque()
+                    for item, deadline in lane:
+                        if deadline is not None and deadline <= now:
+                            self._drop(item, 'expired')
+                        else:
+                            keep.append((item, deadline))
+                    self._size -= len(lane) - len(keep)
+                    self._lanes[i] = keep
+            self._not_full.notify_all()
+    # end expire
+
+    def clear(self):
+        """Drop all of the queued items."""
+        with self._not_full:
+            for lane in self._lanes:
+                while lane:
+                    self._drop(lane.popleft()[0], 'cancelled')
+            self._size = 0
+            self._not_full.notify_all()
+    # end clear
+
+    def stats(self):
+        """Return a dictionary of the queue depth and the counters.
+
+        Keys are 'depth', 'capacity', 'lanes', 'high_water', 'queued', 'written', 'rejected', 'expired', 'cancelled'
+        and 'dropped' (rejected + expired).
+        """
+        self.expire()
+        with self._not_full:
+            stats = dict(self._counts)
+            stats.update(depth=self._size, capacity=self.capacity, lanes=self.lane_depths(),
+                         high_water=self.high_water, dropped=self._counts['rejected'] + self._counts['expired'])
+        return stats
+    # end stats
+# end class Outbox
+
+
+class CommandHandler(object):
+    """Handle the response of a command by parsing the response data and emitting the signals for the parsed value.
+
+    Args:
+        parser (function)[None]: Function that takes the response bytes (without the OK) and returns the parsed value.
+            The parser should raise an IridiumError if the data could not be parsed. If None the response is not
+            parsed and the command is always successful.
+        emit (function)[None]: Function that takes the communicator and the parsed value to emit signals. If this
+            function returns False the command is marked as failed.
+        error_message (str)["Could not parse the response"]: Notification message when the parser fails.
+        ready (function)[None]: Function that takes the communicator and the data before READY. This is called when
+            the modem responds with READY instead of OK (Write Binary).
+        binary (bool)[False]: If True the response contains binary data (Read Binary). The OK is only searched for
+            after the binary data and READY is ignored. The parser is given the `calc_check` keyword with the checksum
+            that was calculated while the binary data was received.
+        view_parser (function)[None]: Function that takes a memoryview of the response and a reusable bytearray and
+            parses the response in place like `parse_read_binary_into`. The second item of the value must be the
+            memoryview of the buffer. This is used instead of the parser when the 'zero_copy' option is on.
+    """
+
+    def __init__(self, parser=None, emit=None, error_message="Could not parse the response", ready=None,
+                 binary=False, view_parser=None):
+        self.parser = parser
+        self.emit = emit
+        self.error_message = error_message
+        self.ready = ready
+        self.binary = binary
+        self.view_parser = view_parser
+
+    def handle(self, communicator, data, buffer=None, **kwargs):
+        """Parse the response data and emit the signals.
+
+        Args:
+            communicator (IridiumCommunicator): Communicator that received the response.
+            data (bytes/memoryview): Response bytes without the OK.
+            buffer (bytearray)[None]: Reusable buffer for the `view_parser`. If given the data is a memoryview that
+                is parsed in place.
+            **kwargs (object): Extra keyword arguments for the parser.
+
+        Returns:
+            success (bool): True if the command was successful.
+            value (object): Parsed value or None if the response was not parsed or could not be parsed.
+        """
+        parser = self.parser if buffer is None else self.view_parser
+        if parser is None:
+            return True, None
+
+        try:
+            value = parser(data, **kwargs) if buffer is None else parser(data, buffer, **kwargs)
+        except IridiumError as err:
+            communicator.signal.notification("Error", self.error_message, str(err))
+            return False, None
+
+        if self.emit is not None:
+            return self.emit(communicator, value) is not False, value
+        return value is not False, value
+
+    def handle_ready(self, communicator, data):
+        """Run the ready function if the modem responded with READY.
+
+        Returns:
+            waiting (bool): True if the command is still waiting for the OK after the ready function ran.
+        """
+        if self.ready is not None:
+            self.ready(communicator, data)
+            return True
+        return False
+# end class CommandHandler
+
+
+class CommandRegistry(object):
+    """Map command bytes to the CommandHandler that processes the command's response.
+
+    Commands are matched exactly. Command families that end with a value like b'AT+SBDWB=' + length can be registered
+    with `prefix=True`. Prefix commands must end with b'=' and are matched by the command text up to the b'='.
+
+    Example:
+        >>> registry = CommandRegistry()
+        >>> registry.register(b'AT+SBDIXA', CommandHandler(parse_session, emit_session, "Could not parse"))
+        >>> registry.register(b'AT+SBDWB=', CommandHandler(ready=write_binary_ready), prefix=True)
+    """
+
+    def __init__(self):
+        self._handlers = {}
+        self._prefix_handlers = {}
+
+    def __contains__(self, command):
+        return self.get(command) is not None
+
+    def copy(self):
+        """Return a copy of the registry, so new commands can be registered without changing this registry."""
+        registry = self.__class__()
+        registry._handlers.update(self._handlers)
+        registry._prefix_handlers.update(self._prefix_handlers)
+        return registry
+
+    def register(self, command, handler, prefix=False):
+        """Register a handler for a command.
+
+        Args:
+            command (bytes/str): Command bytes that are sent to the modem without the b'\\r'.
+            handler (CommandHandler): Handler object to process the command's response.
+            prefix (bool)[False]: If True the command is a family of commands that start with the command bytes.
+
+        Raises:
+            IridiumError: If prefix is True and the command does not end with b'='.
+        """
+        if isinstance(command, str):
+            command = command.encode("utf-8")
+
+        if prefix:
+            if not command.endswith(b'='):
+                raise IridiumError("Prefix commands must end with '='!")
+            self._prefix_handlers[command] = handler
+        else:
+            self._handlers[command] = handler
+    # end register
+
+    def unregister(self, command, prefix=False):
+        """Remove the handler for the given command."""
+        if isinstance(command, str):
+            command = command.encode("utf-8")
+
+        if prefix:
+            self._prefix_handlers.pop(command, None)
+        else:
+            self._handlers.pop(command, None)
+    # end unregister
+
+    def get(self, command, default=None):
+        """Return the handler for the command or the default value if the command is not registered."""
+        handler = self._handlers.get(command)
+        if handler is None and command:
+            idx = command.find(b'=')
+            if idx >= 0:
+                handler = self._prefix_handlers.get(command[:idx+1])
+
+        if handler is None:
+            return default
+        return handler
+    # end get
+# end class CommandRegistry
+
+
+def emit_system_time(communicator, sys_time):
+    """Emit the system time signal."""
+    communicator.signal.system_time_updated(sys_time)
+
+
+def emit_serial_number(communicator, sn):
+    """Store the serial number and emit the serial number signal."""
+    communicator.serial_number = sn
+    communicator.signal.serial_number_updated(sn)
+
+
+def emit_signal_quality(communicator, sig):
+    """Emit the signal quality signal."""
+    communicator.signal.signal_quality_updated(sig)
+
+
+def emit_check_ring(communicator, ring):
+    """Emit the check ring signal and start a session if there is an SBD ring."""
+    tri, sri = ring
+    communicator.signal.check_ring_updated(tri, sri)
+
+    # Handle the response
+    if sri > 0 and not communicator.get_option('telephone') and communicator.get_option('auto_read'):
+        communicator.queue_session()
+# end emit_check_ring
+
+
+def emit_session(communicator, session):
+    """Emit the message transfer signals and queue the commands to read the received messages."""
+    mo_status, mo_msn, mt_status, mt_msn, mt_length, mt_queued = session
+
+    # ========== Run operations from parsed message ==========
+    # Check outgoing
+    if 4 >= mo_status >= 0:
+        communicator.queue_clear_mo_buffer()
+
+        # Success - Message Transferred signal
+        communicator.signal.message_transferred(mo_msn)
+    else:
+        # Failed - Message Transfer Failed signal
+        communicator.signal.notification("Error", "Message Transfer Failed!",
+                                         MO_STATUS.get(mo_status, "Unknown failure!"))
+        communicator.signal.message_transfer_failed(mo_msn)
+
+    # Check if there is a message to process - mt_status 0 no message, 1 success, 2 fail
+    if mt_status == 1 and mt_length > 0:
+        communicator._last_mt_queued = mt_queued
+        communicator._last_mt_queued_retry = 0
+        communicator.queue_read_binary_message()
+
+    elif mt_status > 1:
+        communicator.signal.notification("Error", "Message Receive Failed!",
+                                         MT_STATUS.get(mt_status, "Unknown error!"))
+
+        # An error happened! Check the last mt_queued value to see if we should retry
+        if mt_queued == 0 and communicator._last_mt_queued > 1 and communicator._last_mt_queued_retry < 2:
+            communicator._last_mt_queued_retry += 1
+            if communicator.get_option("auto_read"):
+                # Wait some time to retry without blocking the thread or event loop that reads the serial port
+                communicator.queue_command_later(communicator.MT_RETRY_DELAY, Command.SESSION)
+            return
+
+    # Check for additional messages until the queue is empty
+    if mt_queued > 0 and communicator.get_option("auto_read"):
+        communicator.queue_session()
+# end emit_session
+
+
+def emit_read_binary(communicator, message):
+    """Emit the message received signal or the message receive failed signal."""
+    msg_len, content, checksum, calc_check = message
+
+    # Check if the message is valid. A length of 0 means that the MT buffer was empty.
+    if msg_len == 0 and len(content) == 0:
+        pass
+    elif msg_len == len(content) and calc_check == checksum:
+        # Message received successfully
+        communicator.receive_message(content)
+    else:
+        # Message Receive Failed signal
+        communicator.signal.message_receive_failed(msg_len, content, checksum, calc_check)
+# end emit_read_binary
+
+
+def write_binary_ready(communicator, data):
+    """Write the request's message and checksum after the modem is READY for the write binary contents."""
+    message = getattr(communicator._pending_request, 'payload', None)
+    if message is None:
+        communicator.signal.notification("Error", "The modem is READY but there is no message to write!",
+                                         repr(communicator.pending_command()))
+        return
+    # msg_length already given with the write binary message
+    communicator.write_serial(message + checksum(message))
+# end write_binary_ready
+
+
+# Default command handlers. Register new commands here before creating a communicator or use
+# `IridiumCommunicator.commands` to register commands for a single communicator.
+COMMANDS = CommandRegistry()
+COMMANDS.register(Command.SYSTEM_TIME,
+                  CommandHandler(parse_system_time, emit_system_time, "Could not parse the system time response"))
+COMMANDS.register(Command.SERIAL_NUMBER,
+                  CommandHandler(parse_serial_number, emit_serial_number, "Could not parse the serial number response"))
+COMMANDS.register(Command.SIGNAL_QUALITY,
+                  CommandHandler(parse_signal_quality, emit_signal_quality,
+                                 "Could not parse the signal quality response"))
+COMMANDS.register(Command.CHECK_RING,
+                  CommandHandler(parse_check_ring, emit_check_ring, "Could not parse the check ring response"))
+COMMANDS.register(Command.SESSION,
+                  CommandHandler(parse_session, emit_session, "Could not parse the session response"))
+COMMANDS.register(Command.SESSION_RING_ALERT,
+                  CommandHandler(parse_session, emit_session, "Could not parse the session response"))
+COMMANDS.register(Command.READ_BINARY,
+                  CommandHandler(parse_read_binary, emit_read_binary, "Could not parse the read binary data",
+                                 binary=True, view_parser=parse_read_binary_into))
+COMMANDS.register(Command.WRITE_BINARY,
+                  CommandHandler(parse_write_binary, None, "Could not parse the write binary response",
+                                 ready=write_binary_ready),
+                  prefix=True)
+for _cmd in (Command.CLEAR_MO_BUFFER, Command.CLEAR_MT_BUFFER, Command.CLEAR_BOTH_BUFFERS):
+    COMMANDS.register(_cmd, CommandHandler(parse_clear_buffer))
+del _cmd
+
+
 class IridiumCommunicator(object):
     """Communicates with an iridium modem through a serial port.
     
@@ -542,7 +1283,14 @@ class IridiumCommunicator(object):
     Args:
         serialport(serial.Serial/str): Serial port or string com port name.
         signal (Signal)[None]: Signal object with methods for custom actions.
-        options (dict): Dictionary of options 'echo', 'ring_alerts', 'auto_read', 'flow_control', 'telephone'.
+        options (dict): Dictionary of options 'echo', 'ring_alerts', 'auto_read', 'flow_control', 'telephone',
+            'zero_copy'.
+
+    Note:
+        With the 'zero_copy' option the read binary response is parsed in place in the receive buffer and the message
+        is copied once into a reusable buffer. `Signal.message_received` is given a memoryview of that buffer. The view
+        is only valid during the callback, so copy it with `bytes(message)` to keep it. Messages that are decoded with
+        a `codec` and messages that are returned by `acquire_message` are always bytes.
     """
 
     DEFAULT_OPTIONS = {'echo': True,
@@ -550,8 +1298,24 @@ class IridiumCommunicator(object):
                        'auto_read': True,
                        'flow_control': False,
                        'telephone': False,
+                       'zero_copy': False,
                        }
 
+    # Initial size of the reusable buffer for received messages with the 'zero_copy' option
+    MESSAGE_BUFFER_SIZE = 340
+
+    # Maximum time in seconds the listen thread waits for data before checking if it should stop listening
+    LISTEN_TIMEOUT = 1
+
+    # Maximum number of commands waiting to be written
+    OUTBOX_CAPACITY = 100
+
+    # Time in seconds to wait before retrying a session after the MT message failed
+    MT_RETRY_DELAY = 0.5
+
+    # Commands whose parsed value is recorded by `record_command_metrics` besides the round trip time
+    OUTCOME_COMMANDS = frozenset((Command.SESSION, Command.SESSION_RING_ALERT, Command.READ_BINARY))
+
     # Iridium epoch will change about every 12 years
     IRIDIUM_EPOCH_STR = "Mar 8, 2007, 03:50:35 (GMT)"
     IRIDIUM_EPOCH = datetime.datetime.strptime(IRIDIUM_EPOCH_STR, "%b %d, %Y, %H:%M:%S (%Z)")
@@ -587,11 +1351,24 @@ class IridiumCommunicator(object):
         self._serial_number = ""
         self._last_mt_queued = 0
         self._last_mt_queued_retry = 0
-        self._read_buf = b''
-        self._write_queue = collections.deque(maxlen=100)
-        self._sequential_write_queue = collections.deque(maxlen=100)
+        self._read_buf = ReceiveBuffer()
+        self._message_buffer = bytearray(self.MESSAGE_BUFFER_SIZE)
+        self._read_binary_check = None  # [start, content end, summed until, Checksum] of the read binary response
+        self.commands = COMMANDS.copy()
+        self.outbox = Outbox(self.OUTBOX_CAPACITY)
         self._previous_command = None
         self._que_next_command = False
+        self._wakeup_fd = None
+        self._wakeup_lock = threading.Lock()
+        self.hub = None  # IridiumHub that reads the serial port instead of a listen thread
+        self._command_condition = threading.Condition()  # Notified when the pending command finishes
+        self._pending_request = None  # CommandRequest for the pending command
+        self._handling_thread = None  # Thread ident while a command handler runs
+        self._follow_ups = []  # Commands queued by the command handler that is running
+        self.codec = None  # MessageCodec that encodes the sent messages and decodes the received messages
+        self.capture = None  # CaptureWriter that records the serial port reads and writes
+        self.metrics = CommunicatorMetrics()  # Set to None to turn off the metrics
+        self._command_start = 0.0  # perf_counter time the pending command was written
         self.listen_thread = None
 
         if serialport is not None:
@@ -697,11 +1474,27 @@ class IridiumCommunicator(object):
     # end connect_timeout
     
     def read_serial(self):
-        """Serial port readline command that can be overwritten with inheritance to log data. This should return all 
+        """Serial port read command that can be overwritten with inheritance to log data. This should return all 
         characters that were read in.
+
+        All of the bytes that are waiting are read at once. If no bytes are waiting this falls back to readline with
+        the normal timeout. The bytes are recorded by the `capture` if it is set.
         """
         try:
-            return self.serialport.readline()
+            waiting = getattr(self.serialport, 'in_waiting', 0)
+            if waiting > 0:
+                data = self.serialport.read(waiting)
+            else:
+                data = self.serialport.readline()
+            if self.capture is not None:
+                self.capture.record_read(data)
+            metrics = self.metrics
+            if metrics is not None:
+                metrics.reads += 1
+                metrics.bytes_read += len(data)
+                if waiting <= 0:
+                    metrics.readline_calls += 1
+            return data
         except Exception as err:
             self.signal.notification("Error", "Error when reading from the serial port! The connection will be closed!",
                                      str(err))
@@ -710,9 +1503,17 @@ class IridiumCommunicator(object):
     # end read_serial
     
     def write_serial(self, msg):
-        """Serial port write command that can be overwritten with inheritance to log data."""
+        """Serial port write command that can be overwritten with inheritance to log data. The bytes are recorded by the
+        `capture` if it is set.
+        """
         try:
+            if self.capture is not None:
+                self.capture.record_write(msg)
             self.serialport.write(msg)
+            metrics = self.metrics
+            if metrics is not None:
+                metrics.writes += 1
+                metrics.bytes_written += len(msg)
         except Exception as err:
             self.signal.notification("Error", "Error when writing to the serial port! The connection will be closed!",
                                      str(err))
@@ -849,16 +1650,55 @@ class IridiumCommunicator(object):
 
     def stop_listening(self):
         """Stop the IridiumCommunicator from listening."""
+        hub, self.hub = self.hub, None
+        if hub is not None:
+            hub.unregister(self)
+
         self._active.clear()
+        self.wakeup()
         try:
             self.listen_thread.join()
         except AttributeError:
             pass
         self.listen_thread = None
 
-    def listen(self):
+    def wakeup(self):
+        """Wake up the listen thread if it is waiting for data, so queued commands are written right away."""
+        hub = self.hub
+        if hub is not None:
+            hub.wakeup(self)
+            return
+
+        with self._wakeup_lock:
+            if self._wakeup_fd is not None:
+                try:
+                    os.write(self._wakeup_fd, b'\0')
+                except OSError:
+                    pass  # The pipe is full, so the thread is already being woken up
+    # end wakeup
+
+    def serial_fileno(self):
+        """Return the serial port file descriptor or None if the serial port does not have one that can be selected.
+
+        On Windows the serial port does not have a file descriptor.
+        """
+        if os.name == 'nt':
+            return None
+        try:
+            return self.serialport.fileno()
+        except Exception:
+            return None
+    # end serial_fileno
+
+    def listen(self, use_select=True):
         """Continuously listen for commands. (This method should be called in a separate thread).
 
+        If the serial port has a file descriptor the thread sleeps until data arrives or a command is queued. Otherwise
+        the serial port is polled with readline.
+
+        Args:
+            use_select (bool)[True]: If False always poll the serial port with readline.
+
         Raises:
             IridiumError: If there is already a thread listening. Multiple threads will mess up the internal read buffer
         """
@@ -869,15 +1709,76 @@ class IridiumCommunicator(object):
         self._active.set()
         while self.is_listening():
             if self.is_port_connected():
-                data = self.read_serial()
-                self.check_io(data)
+                fd = None
+                if use_select:
+                    fd = self.serial_fileno()
+
+                if fd is not None:
+                    self.listen_select(fd)
+                else:
+                    data = self.read_serial()
+                    self.process_io(data)
             time.sleep(0.001)  # prevent the thread from being greedy when not connected
     # end listen
 
+    def listen_select(self, fd):
+        """Wait for the serial port file descriptor to be readable and process all of the available data.
+
+        This method returns when the communicator stops listening or the serial port is closed.
+
+        Args:
+            fd (int): Serial port file descriptor.
+        """
+        wakeup_read, wakeup_write = os.pipe()
+        os.set_blocking(wakeup_read, False)
+        os.set_blocking(wakeup_write, False)
+        with self._wakeup_lock:
+            self._wakeup_fd = wakeup_write
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(fd, selectors.EVENT_READ)
+                selector.register(wakeup_read, selectors.EVENT_READ)
+
+                # Write any commands that were queued before listening
+                self.process_io()
+
+                while self.is_listening() and self.is_port_connected():
+                    data = b''
+                    for key, _ in selector.select(self.LISTEN_TIMEOUT):
+                        if key.fd == wakeup_read:
+                            try:
+                                os.read(wakeup_read, 512)
+                            except OSError:
+                                pass
+                        else:
+                            data = self.read_serial()
+                    self.process_io(data)
+        except (OSError, ValueError):
+            pass  # The serial port was closed
+        finally:
+            with self._wakeup_lock:
+                os.close(self._wakeup_fd)
+                self._wakeup_fd = None
+            os.close(wakeup_read)
+    # end listen_select
+
+    def process_io(self, message=b''):
+        """Run `check_io` with the given message and keep running it while it makes progress.
+
+        A single read can contain several responses and the responses may queue more commands. Each call to `check_io`
+        only handles one response, so this keeps going until everything that can be handled has been handled.
+        """
+        self.check_io(message)
+        state = None
+        while state != (self._previous_command, len(self._read_buf), len(self.outbox)):
+            state = (self._previous_command, len(self._read_buf), len(self.outbox))
+            self.check_io()
+    # end process_io
+
     def check_io(self, message=b''):
         """Check for incoming and outgoing messages."""
         # Add the message to the existing buffer
-        self._read_buf += message
+        self._read_buf.extend(message)
 
         # Check if in a command
         if self.pending_command():
@@ -888,190 +1789,208 @@ class IridiumCommunicator(object):
 
     def check_pending_command(self):
         """Check the incoming messages for responses from the previous command."""
-        # Check for an OK
-        if Command.OK in self._read_buf:
+        handler = self.commands.get(self._previous_command)
 
-            # Split out the command from the buff
-            command_success = True
-            idx = self._read_buf.index(Command.OK)
-            data = self._read_buf[:idx]
-            self._read_buf = self._read_buf[idx+2:]
-
-            # Check the commands
-            if Command.SYSTEM_TIME == self._previous_command:
-                try:
-                    sys_time = parse_system_time(data)
-                    self.signal.system_time_updated(sys_time)
-                except IridiumError as err:
-                    self.signal.notification("Error", "Could not parse the system time response", str(err))
-                    command_success = False
+        # Find the OK. The read binary contents may contain OK so only look for OK after the binary data.
+        if handler is not None and handler.binary:
+            end_idx = self.read_binary_end()
+            ok_idx = -1 if end_idx < 0 else self._read_buf.find(Command.OK, end_idx)
+        else:
+            ok_idx = self._read_buf.find(Command.OK)
 
-            elif Command.SERIAL_NUMBER == self._previous_command:
-                try:
-                    sn = parse_serial_number(data)
-                    self.serial_number = sn
-                    self.signal.serial_number_updated(sn)
-                except IridiumError as err:
-                    self.signal.notification("Error", "Could not parse the serial number response", str(err))
-                    command_success = False
-
-            elif Command.SIGNAL_QUALITY == self._previous_command:
+        # Check for an OK
+        if ok_idx >= 0:
+            in_place = handler is not None and handler.view_parser is not None and self.get_option('zero_copy')
+            if in_place:
+                # Parse the response where it is in the receive buffer
+                data = self._read_buf.view(0, ok_idx)
+            else:
+                # Split out the command from the buff
+                data = self._read_buf.take(ok_idx)
+                self._read_buf.consume(len(Command.OK))
+
+            # Parse the response and emit the signals for the command
+            command_success, value = True, None
+            kwargs = {}
+            if handler is not None and handler.binary and self._read_binary_check is not None:
+                kwargs['calc_check'] = self._read_binary_check[3].digest()
+            if handler is not None:
+                self._handling_thread = threading.get_ident()
                 try:
-                    sig = parse_signal_quality(data)
-                    self.signal.signal_quality_updated(sig)
-                except IridiumError as err:
-                    self.signal.notification("Error", "Could not parse the signal quality response", str(err))
-                    command_success = False
+                    command_success, value = handler.handle(self, data, self._message_buffer if in_place else None,
+                                                            **kwargs)
+                finally:
+                    self._handling_thread = None
+                    if in_place:
+                        data.release()
+                        self._read_buf.consume(ok_idx + len(Command.OK))
+            if in_place:
+                data = b''  # The response was not copied out of the receive buffer
+                if value is not None:
+                    # The content is a view of the reusable buffer, which may have been replaced to grow. The result
+                    # gets a copy, so the next response does not change it or keep the buffer from growing.
+                    self._message_buffer = value[1].obj
+                    value = (value[0], bytes(value[1])) + tuple(value[2:])
 
-            elif Command.CHECK_RING == self._previous_command:
-                try:
-                    tri, sri = parse_check_ring(data)
-                    self.signal.check_ring_updated(tri, sri)
+            # A message completed
+            self.finish_command(command_success, data, value)
 
-                    # Handle the response
-                    if sri > 0 and not self.get_option('telephone') and self.get_option('auto_read'):
-                        self.queue_session()
+        # Check for a READY
+        elif (handler is None or not handler.binary) and Command.READY in self._read_buf:
 
-                except IridiumError as err:
-                    self.signal.notification("Error", "Could not parse the check ring response", str(err))
-                    command_success = False
+            # Split out the command from the buff
+            data = self._read_buf.take(self._read_buf.index(Command.READY))
+            self._read_buf.consume(len(Command.READY))
 
-            elif Command.SESSION == self._previous_command:
-                try:
-                    mo_status, mo_msn, mt_status, mt_msn, mt_length, mt_queued = parse_session(data)
+            # Check the commands that use "READY". These commands finish with the OK after the ready action.
+            if handler is None or not handler.handle_ready(self, data):
+                # A message with no known response completed
+                self.finish_command(True, data)
+    # end check_pending_command
 
-                    # ========== Run operations from parsed message ==========
-                    # Check outgoing
-                    if 4 >= mo_status >= 0:
-                        self.queue_clear_mo_buffer()
+    def finish_command(self, success, data=b'', value=None):
+        """Complete the pending command, emit the `Signal.command_finished` signal and clear the pending command.
 
-                        # Success - Message Transferred signal
-                        self.signal.message_transferred(mo_msn)
-                    else:
-                        # Failed - Message Transfer Failed signal
-                        self.signal.notification("Error", "Message Transfer Failed!",
-                                                 MO_STATUS.get(mo_status, "Unknown failure!"))
-                        self.signal.message_transfer_failed(mo_msn)
-
-                    # Check if there is a message to process - mt_status 0 no message, 1 success, 2 fail
-                    if mt_status == 1 and mt_length > 0:
-                        self._last_mt_queued = mt_queued
-                        self._last_mt_queued_retry = 0
-                        self.queue_read_binary_message()
-
-                    elif mt_status > 1:
-                        self.signal.notification("Error", "Message Receive Failed!",
-                                                 MT_STATUS.get(mt_status, "Unknown error!"))
-
-                        # An error happened! Check the last mt_queued value to see if we should retry
-                        if mt_queued == 0 and self._last_mt_queued > 1 and self._last_mt_queued_retry < 2:
-                            time.sleep(0.5)  # Wait some time to retry
-                            mt_queued = self._last_mt_queued
-                            self._last_mt_queued_retry += 1
-
-                    # Check for additional messages until the queue is empty
-                    if mt_queued > 0 and self.get_option("auto_read"):
-                        self.queue_session()
-
-                except IridiumError as err:
-                    self.signal.notification("Error", "Could not parse the session response", str(err))
-                    command_success = False
-        
-            # Read Binary
-            elif Command.READ_BINARY == self._previous_command:
-                # Check if the read binary command has received enough data
-                while not has_read_binary_data(data) and Command.OK in self._read_buf:
-                    idx = self._read_buf.index(Command.OK)
-                    data = data + Command.OK + self._read_buf[:idx]
-                    self._read_buf = self._read_buf[idx+2:]
-
-                # Final check for data
-                if not has_read_binary_data(data):
-                    self._read_buf = data + Command.OK + self._read_buf
-                    print("here", data, self._read_buf)
-                    return
-
-                # Parse the data
-                try:
-                    msg_len, content, checksum, calc_check = parse_read_binary(data)
-    
-                    # Check if the message is valid
-                    if msg_len == len(content) and calc_check == checksum:
-                        # Message received successfully
-                        self.signal.message_received(content)
-                    else:
-                        # Message Receive Failed signal
-                        self.signal.message_receive_failed(msg_len, content, checksum, calc_check)
-    
-                except IridiumError as err:
-                    self.signal.notification("Error", "Could not parse the read binary data", str(err))
-                    command_success = False
+        Args:
+            success (bool): True if OK was found and the response was parsed successfully.
+            data (bytes)[b'']: Response bytes for the command without the OK.
+            value (object)[None]: Parsed response value from the command's handler.
+        """
+        command = self._previous_command
+        request, self._pending_request = self._pending_request, None
+        self._read_binary_check = None
+
+        # Write the follow up commands next, before anything else that was queued
+        follow_ups, self._follow_ups = self._follow_ups, []
+        if request is not None and request.planned:
+            if success:
+                request.follow_ups[0:0] = request.planned
+                follow_ups[0:0] = request.planned
+            else:
+                for planned in request.planned:
+                    planned.drop('cancelled')
+        if follow_ups:
+            self.outbox.push(follow_ups)
+
+        if self.metrics is not None and command is not None:
+            self.record_command_metrics(command, success, data, value)
+
+        self.signal.command_finished(command, success, data)
+        with self._command_condition:
+            self._previous_command = None
+            self._command_condition.notify_all()
+
+        if request is not None:
+            request.set_result(success, value, data)
+    # end finish_command
+
+    def record_command_metrics(self, command, success, data=b'', value=None):
+        """Record the round trip time of the finished command, the session outcome and the checksum failures."""
+        seconds = time.perf_counter() - self._command_start
+        metrics = self.metrics
+        histogram = metrics.commands.get(command)
+        if histogram is not None:
+            histogram.observe(seconds, success)
+        elif command.startswith(Command.WRITE_BINARY):
+            metrics.observe_command(command, seconds, success)  # Recorded under b'AT+SBDWB=' with every length
+            if value is False and bytes(data).strip()[-1:] == b'2':
+                metrics.mo_checksum_failures += 1  # The modem's write binary status 2 is a checksum failure
+            return
+        else:
+            metrics.observe_command(command, seconds, success)
+
+        if value is None or command not in self.OUTCOME_COMMANDS:
+            return
+        elif command == Command.READ_BINARY:
+            msg_len, content, msg_check, calc_check = value
+            if (msg_len != 0 or len(content) != 0) and (msg_len != len(content) or msg_check != calc_check):
+                metrics.mt_checksum_failures += 1
+        else:
+            metrics.observe_session(value[0], value[2], value[5])
+    # end record_command_metrics
+
+    def metrics_snapshot(self):
+        """Return the metrics and the queue depths in a dictionary. See `CommunicatorMetrics.snapshot`."""
+        if self.metrics is None:
+            raise IridiumError("The metrics are turned off!")
+        snapshot = self.metrics.snapshot()
+        outbox = self.outbox.stats()
+        snapshot['queues']['outbox'] = {'depth': outbox['depth'], 'high_water': outbox['high_water'],
+                                        'dropped': outbox['dropped'], 'rejected': outbox['rejected'],
+                                        'expired': outbox['expired']}
+        return snapshot
+    # end metrics_snapshot
+
+    def read_binary_end(self):
+        """Return the receive buffer index after the read binary checksum or -1 if not all of the data was received.
+
+        The read binary response is the optional b'AT+SBDRB\r' echo, 2 bytes of message length, the message contents,
+        and 2 bytes of checksum. The checksum of the contents is updated with the bytes that arrived since the last
+        call, so it is ready when the last byte is received.
+        """
+        start = self._read_buf.find(Command.READ_BINARY_RECEIVE)
+        if start >= 0:
+            start += len(Command.READ_BINARY_RECEIVE)
+        else:
+            start = 0
 
-            # Write Binary
-            elif Command.WRITE_BINARY == self._previous_command:
-                try:
-                    command_success = parse_write_binary(data)
-                except IridiumError as err:
-                    self.signal.notification("Error", "Could not parse the write binary response", str(err))
-                    command_success = False
-
-            # Clear Buffer (MO or MT or both)
-            elif Command.CLEAR_BUFFER in self._previous_command:
-                # The data should be b'0'
-                resp = data.replace(Command.CLEAR_MO_BUFFER, b'').replace(Command.CLEAR_MO_BUFFER, b'')\
-                    .replace(Command.CLEAR_BOTH_BUFFERS, b'').strip()
-                if resp != b'0':
-                    command_success = False
+        if len(self._read_buf) < start + 2:
+            return -1
 
-            # A message completed
-            self.signal.command_finished(self._previous_command, command_success, data)
-            self._previous_command = None
+        state = self._read_binary_check
+        if state is None or state[0] != start:
+            # New response or the echo arrived after the length was read
+            content_end = start + 2 + int.from_bytes(self._read_buf.peek(start, start + 2), "big")
+            state = self._read_binary_check = [start, content_end, start + 2, Checksum()]
 
-        # Check for a READY
-        elif Command.READY in self._read_buf and Command.READ_BINARY != self._previous_command:
+        available = min(len(self._read_buf), state[1])
+        if available > state[2]:
+            state[3].total += self._read_buf.sum(state[2], available)
+            state[2] = available
 
-            # Split out the command from the buff
-            command_success = True
-            idx = self._read_buf.index(Command.READY)
-            data = self._read_buf[:idx]
-            self._read_buf = self._read_buf[idx + len(Command.READY):]
-
-            # Check the commands that use "READY"
-            if self._previous_command.startswith(Command.WRITE_BINARY):
-                # Write a binary message
-                message = self._write_queue.popleft()
-                # msg_length already given with the write binary message
-                checksum = int(sum(message)).to_bytes(4, 'big')[2:]  # smallest 2 bytes of the sum
-                self.write_serial(message + checksum)
-
-            # A message with no known response completed
-            self.signal.command_finished(self._previous_command, command_success, data)
-            self._previous_command = None        
-    # end check_pending_command
+        end = state[1] + 2
+        if len(self._read_buf) < end:
+            return -1
+        return end
+    # end read_binary_end
 
     def check_unsolicited(self):
         """Check the buffers for an unsolicited command or a queued write message."""
         # Check for unsolicited messages
-        if Command.RING in self._read_buf:
+        idx = self._read_buf.find(Command.RING)
+        if idx >= 0:
             # Ring received check for messages
-            idx = self._read_buf.index(Command.RING)
-            self._read_buf = self._read_buf[idx + len(Command.RING):]
+            self._read_buf.consume(idx + len(Command.RING))
 
-            if Command.SESSION not in self._sequential_write_queue:
-                self.queue_session()
+            if not self.is_command_queued(Command.SESSION):
+                try:
+                    self.queue_session()
+                except OutboxFull as err:
+                    self.signal.notification("Warning", "Could not start a session for the SBD ring!", str(err))
 
-        elif len(self._sequential_write_queue) > 0:
+        elif len(self.outbox) > 0:
             # Write messages from the queue
-            self._previous_command = self._sequential_write_queue.popleft()
-            self.write_serial(self.previous_command + b'\r')
-            self._read_buf = b''
+            command = self.outbox.get()
+            if command is None:
+                # Only expired or cancelled items were left
+                with self._command_condition:
+                    self._command_condition.notify_all()
+                return
+            if isinstance(command, CommandRequest):
+                self._pending_request = command
+                command = command.command
+
+            self._previous_command = command
+            self._command_start = time.perf_counter()
+            self.write_serial(command + b'\r')
+            self._read_buf.clear()
+            self._read_binary_check = None
+            if self._pending_request is not None:
+                self._pending_request.set_written()
 
         else:
             # Trim the buffer if no unsolicited messages were found and there are no pending commands
-            try:
-                self._read_buf = self._read_buf.splitlines()[-1]
-            except IndexError:
-                pass
+            self._read_buf.trim_lines()
     # end check_unsolicited
 
     @property
@@ -1082,11 +2001,24 @@ class IridiumCommunicator(object):
     @previous_command.setter
     def previous_command(self, command):
         """Set a command as pending."""
+        if self.metrics is not None:
+            if self._previous_command:
+                self.record_command_metrics(self._previous_command, command is None)
+            if command is not None:
+                self._command_start = time.perf_counter()
         if self._previous_command and command is None:
             self.signal.command_finished(self._previous_command, True)
         elif self._previous_command:
             self.signal.command_finished(self._previous_command, False)
-        self._previous_command = command
+
+        # A queued request was replaced by a command that was written directly
+        request, self._pending_request = self._pending_request, None
+        if request is not None:
+            request.set_result(command is None)
+
+        with self._command_condition:
+            self._previous_command = command
+            self._command_condition.notify_all()
     # end previous_command
 
     def pending_command(self):
@@ -1107,22 +2039,133 @@ class IridiumCommunicator(object):
             wait_for_previous (float)[120]: Time in seconds to wait for the previous command to finish
         """
         # Wait for previous command to finish
-        start = time.time()
-        while (self.pending_command() or len(self._sequential_write_queue) > 0) and (
-                time.time() - start < wait_for_previous):
-            time.sleep(0.001)
+        self.wait_for_idle(wait_for_previous)
 
         yield
 
         # Wait for this command to finish and nested commands to finish
-        start = time.time()
-        while self.pending_command() and (time.time() - start < wait_time):
-            time.sleep(0.001)
+        self.wait_for_response(wait_time)
     # end wait_for_command
 
+    def wait_for_idle(self, timeout=120):
+        """Block until no command is pending and no commands are queued.
+
+        The waiting thread sleeps until the listen thread finishes a command.
+
+        Args:
+            timeout (float)[120]: Time in seconds to wait.
+
+        Returns:
+            idle (bool): False if the timeout expired before the commands finished.
+        """
+        with self._command_condition:
+            return self._command_condition.wait_for(
+                lambda: not self._previous_command and len(self.outbox) == 0, timeout)
+    # end wait_for_idle
+
+    def wait_for_response(self, timeout=120):
+        """Block until the pending command finishes.
+
+        Args:
+            timeout (float)[120]: Time in seconds to wait.
+
+        Returns:
+            finished (bool): False if the timeout expired before the command finished.
+        """
+        with self._command_condition:
+            return self._command_condition.wait_for(lambda: not self._previous_command, timeout)
+    # end wait_for_response
+
+    def submit_command(self, command, options=None, priority=None, expires=None, block=False, timeout=None):
+        """Queue a command and return a CommandRequest result handle without waiting.
+
+        The listen thread writes the queued commands one at a time in the order they were submitted. This is safe to
+        call from many threads at once.
+
+        Args:
+            command (bytes/str): Command to send. This should only be one command message!
+            options (dict)[None]: Options that override `get_option` while this command and its follow up commands
+                are handled. For example {'auto_read': False}.
+            priority (int)[None]: Outbox lane. See `queue_command`.
+            expires (float)[None]: Seconds after which the command is dropped if it was not written.
+            block (bool)[False]: If True wait for space when the outbox is full.
+            timeout (float)[None]: Maximum time in seconds to wait for space in the outbox.
+
+        Returns:
+            request (CommandRequest): Result handle for the command.
+
+        Raises:
+            OutboxFull: If the outbox is full.
+        """
+        if isinstance(command, str):
+            command = command.encode("utf-8")
+
+        request = CommandRequest(command, options)
+        self.queue_command(request, priority, expires, block, timeout)
+        return request
+    # end submit_command
+
+    def acquire_request(self, command, wait_time=120, wait_for_previous=120, options=None):
+        """Submit a command and wait for it and its follow up commands to finish.
+
+        Args:
+            command (bytes/str): Command to send. This should only be one command message!
+            wait_time (float)[120]: Time in seconds to wait for the command to complete.
+            wait_for_previous (float)[120]: Time in seconds to wait for the previously queued commands to finish.
+            options (dict)[None]: Options that override `get_option` while this command is handled.
+
+        Returns:
+            request (CommandRequest): Finished result handle for the command.
+
+        Raises:
+            IridiumError: If no thread is listening or the command timed out.
+        """
+        if not self.is_listening():
+            raise IridiumError("No threads are listening for responses!")
+
+        request = self.submit_command(command, options)
+        return self.wait_request(request, wait_time, wait_for_previous)
+    # end acquire_request
+
+    def wait_request(self, request, wait_time=120, wait_for_previous=120):
+        """Wait for a queued request and its follow up commands to finish.
+
+        Args:
+            request (CommandRequest): Request that was queued with `queue_command`.
+            wait_time (float)[120]: Time in seconds to wait for the command to complete.
+            wait_for_previous (float)[120]: Time in seconds to wait for the previously queued commands to finish.
+
+        Returns:
+            request (CommandRequest): Finished result handle for the command.
+
+        Raises:
+            IridiumError: If the command was dropped from the outbox or the command timed out.
+        """
+        if not request.wait_written(wait_for_previous):
+            request.cancelled = True
+            raise IridiumError("The previous command did not finish in time!")
+        if request.dropped is not None:
+            raise IridiumError("The command was dropped from the outbox! (" + request.dropped + ")")
+
+        if not request.wait(wait_time):
+            raise IridiumError("The command timed out or completed without returning a proper value!")
+        return request
+    # end wait_request
+
+    @staticmethod
+    def _unpack_value(value):
+        """Unpack single item tuples that were collected from a response."""
+        if isinstance(value, (list, tuple)) and len(value) == 1:
+            return value[0]
+        return value
+
     def acquire_response(self, command, wait_time=120, wait_for_previous=120):
         """Wait for a command to run and return the value for that command.
 
+        Note:
+            This method can be called from several threads at once. The commands are written in the order they were
+            called. The Signal callbacks are still called for the responses.
+
         Args:
             command (bytes/str): Command to send and get the response for. This should only be one command message!
             wait_time (float)[120]: Time in seconds to wait for the command to complete.
@@ -1132,61 +2175,16 @@ class IridiumCommunicator(object):
             IridiumError: If no values were found
 
         Returns:
-            values (tuple): Returns the values that would be collected from the corresponding callback method.
+            values (tuple): Returns the values that would be collected from the corresponding callback method or the 
+                response bytes for commands that are not parsed.
         """
-        if isinstance(command, str):
-            command = command.encode("utf-8")
+        request = self.acquire_request(command, wait_time, wait_for_previous)
+        if not request.success:
+            raise IridiumError("The command timed out or completed without returning a proper value!")
 
-        # Get the old signal values
-        old_system_time = self.signal.system_time_updated
-        old_serial_number = self.signal.serial_number_updated
-        old_signal_quality = self.signal.signal_quality_updated
-        old_check_ring = self.signal.check_ring_updated
-        old_command_finished = self.signal.command_finished
-
-        # Create a collection method to collect the value
-        values = []
-
-        # Collect command finished data for unknown commands
-        cmd_finish = []
-
-        def command_finished(cmd, val, content=b''):
-            """"Find where commands finished True for unknown commands."""
-            if val and cmd == command and len(values) == 0:
-                values.append(content)  # May be empty
-            old_command_finished(cmd, val, content)
-
-        # Replace the signal callbacks with the collect callback
-        self.signal.system_time_updated = lambda s: values.append(s)
-        self.signal.serial_number_updated = lambda s: values.append(s)
-        self.signal.signal_quality_updated = lambda s: values.append(s)
-        self.signal.check_ring_updated = lambda tri, sri: values.append((tri, sri))
-
-        # Run the command and wait for it to finish
-        with self.wait_for_command(wait_time, wait_for_previous):
-            self.previous_command = command
-            self.signal.command_finished = command_finished
-            self.write_serial(self.previous_command + b"\r")
-
-        # Replace the signal callbacks with their original methods
-        self.signal.system_time_updated = old_system_time
-        self.signal.serial_number_updated = old_serial_number
-        self.signal.signal_quality_updated = old_signal_quality
-        self.signal.check_ring_updated = old_check_ring
-        self.signal.command_finished = old_command_finished
-
-        # Return the collected values or raise an IridiumError
-        if len(values) == 0:
-            # No known values were parsed try to find if an unknown command was sent
-            if len(cmd_finish) == 0:
-                # No commands finished successfully
-                raise IridiumError("The command timed out or completed without returning a proper value!")
-            values.append(cmd_finish[-1][2])  # Return the found content
-
-        # Unpack the last value
-        if isinstance(values[-1], (list, tuple)) and len(values[-1]) == 1:
-            return values[-1][0]
-        return values[-1]
+        if request.value is None:
+            return request.data  # Return the found content
+        return self._unpack_value(request.value)
     # end acquire_response
     
     def _acquire_response(self, command, wait_time=120, wait_for_previous=120):
@@ -1208,62 +2206,89 @@ class IridiumCommunicator(object):
         Raises:
             IridiumError: If no values were found
         """
-        if isinstance(command, str):
-            command = command.encode("utf-8")
-
-        # Get the old signal values
-        old_system_time = self.signal.system_time_updated
-        old_serial_number = self.signal.serial_number_updated
-        old_signal_quality = self.signal.signal_quality_updated
-        old_check_ring = self.signal.check_ring_updated
-
-        # Create a collection method to collect the value
-        values = []
-
-        # Replace the signal callbacks with the collect callback
-        self.signal.system_time_updated = lambda s: values.append(s)
-        self.signal.serial_number_updated = lambda s: values.append(s)
-        self.signal.signal_quality_updated = lambda s: values.append(s)
-        self.signal.check_ring_updated = lambda tri, sri: values.append((tri, sri))
-
-        # Run the command and wait for it to finish
-        with self.wait_for_command(wait_time, wait_for_previous):
-            self.previous_command = command
-            self.write_serial(self.previous_command + b"\r")
-
-        # Replace the signal callbacks with their original methods
-        self.signal.system_time_updated = old_system_time
-        self.signal.serial_number_updated = old_serial_number
-        self.signal.signal_quality_updated = old_signal_quality
-        self.signal.check_ring_updated = old_check_ring
-
-        # Return the collected values or raise an IridiumError
-        if len(values) == 0:
+        request = self.acquire_request(command, wait_time, wait_for_previous)
+        if not request.success or request.value is None:
             raise IridiumError("The command timed out or completed without returning a proper value!")
-
-        # Unpack the last value
-        if isinstance(values[-1], (list, tuple)) and len(values[-1]) == 1:
-            return values[-1][0]
-        return values[-1]
+        return self._unpack_value(request.value)
     # end _acquire_response
 
-    def queue_command(self, command):
+    def queue_command(self, command, priority=None, expires=None, block=False, timeout=None):
         """Queue a command to be written later in with the thread in the `check_unsolicited` method (inside `check_io`).
         
         This method should only be used when you have threading using `check_io` (`listen` uses `check_io`).
         The main reading loop `check_io` uses this method for any received messages that need to send messages in 
         a nested way. It preserves the `pending_command()` and `Signal.command_finished` methods.
+
+        Commands that a response handler queues (like clearing the MO buffer after a session) are follow ups of the
+        command being handled. They are written right after the command finishes, before all other queued commands, and
+        they are queued even if the outbox is full, so the protocol never stalls and the listen thread never blocks.
+
+        Args:
+            command (bytes/CommandRequest): Command to queue.
+            priority (int)[None]: Outbox lane (`Outbox.PRIORITY_HIGH`, `PRIORITY_NORMAL` or `PRIORITY_LOW`). The
+                normal lane is used by default.
+            expires (float)[None]: Seconds after which the command is dropped if it was not written.
+            block (bool)[False]: If True wait for space when the outbox is full.
+            timeout (float)[None]: Maximum time in seconds to wait for space in the outbox.
+
+        Raises:
+            OutboxFull: If the outbox is full.
         """
-        self._sequential_write_queue.append(command)
+        if self._handling_thread == threading.get_ident():
+            # Track commands queued by a response handler as follow ups of the request being handled
+            if self._pending_request is not None:
+                command = self._pending_request.add_follow_up(command)
+            self._follow_ups.append(command)
+        else:
+            if priority is None:
+                priority = Outbox.PRIORITY_NORMAL
+            self.outbox.put(command, priority, expires, block, timeout)
+        self.wakeup()
     # end queue_command
 
+    def queue_command_later(self, delay, command, priority=None, expires=None):
+        """Queue a command after a delay without blocking the thread that calls this method.
+
+        A timer thread queues the command, so response handlers can schedule a retry without stopping the listen
+        thread or the `IridiumHub` from reading the serial ports.
+
+        Args:
+            delay (float): Time in seconds to wait before the command is queued.
+            command (bytes/CommandRequest): Command to queue.
+            priority (int)[None]: Outbox lane. See `queue_command`.
+            expires (float)[None]: Seconds after the command is queued after which it is dropped if it was not written.
+
+        Returns:
+            timer (threading.Timer): Timer that can be cancelled before the command is queued.
+        """
+        def queue():
+            try:
+                self.queue_command(command, priority, expires)
+            except OutboxFull as err:
+                self.signal.notification("Warning", "Could not queue the delayed command!", str(err))
+
+        timer = threading.Timer(delay, queue)
+        timer.daemon = True
+        timer.start()
+        return timer
+    # end queue_command_later
+
+    def is_command_queued(self, command):
+        """Return if the given command bytes are waiting in the queue to be written."""
+        return any(getattr(item, 'command', item) == command for item in self.outbox)
+    # end is_command_queued
+
     def get_option(self, option_name):
         """Get the value for the option.
 
         See Also:
             DEFAULT_OPTIONS
         """
-        return self.options.get(str(option_name).lower(), False)
+        option_name = str(option_name).lower()
+        request = self._pending_request
+        if request is not None and option_name in request.options:
+            return request.options[option_name]
+        return self.options.get(option_name, False)
     # end get_option
 
     def set_option(self, option_name, value):
@@ -1528,7 +2553,7 @@ class IridiumCommunicator(object):
         """Wait for the response and return the read binary message.
         
         Note:
-            This method temporarily turns off the 'auto_read' option, so you should only receive one message at a time.
+            The 'auto_read' option is turned off for this session, so you should only receive one message at a time.
 
         Args:
             wait_time (float)[120]: Time in seconds to wait for the command to complete.
@@ -1540,52 +2565,57 @@ class IridiumCommunicator(object):
         Raises:
             IridiumError: If no values were found.
         """
-        # Get the old signal values
-        old_read = self.get_option("auto_read")
-        old_message_received = self.signal.message_received
-        old_message_receive_failed = self.signal.message_receive_failed
-
-        # Create a collection method to collect the value
-        values = []
-
-        def collect_values(data):
-            values.append(data)
-
-        def msg_failed(msg_len, content, checksum, calc_check):
-            values.append(content)
-
-        # Replace the signal callbacks with the collect callback
-        self.set_option("auto_read", False)
-        self.signal.message_received = collect_values
-        self.signal.message_receive_failed = msg_failed
-
-        # Wait for the previous command to finish
-        start = time.time()
-        while (self.pending_command() or len(self._sequential_write_queue) > 0) and (
-                time.time() - start < wait_for_previous):
-            time.sleep(0.001)
-
-        self.previous_command = Command.SESSION
-        self.write_serial(self.previous_command + b"\r")
+        # Run the session and wait for the follow up commands like clear_mo_buffer, and read_binary
+        request = self.acquire_request(Command.SESSION, wait_time, wait_for_previous, options={'auto_read': False})
+
+        # Only return the message read by this session's own read binary command
+        for follow_up in request.follow_ups:
+            if follow_up.command == Command.READ_BINARY and follow_up.message is not None:
+                if follow_up.decode_error is not None:
+                    raise IridiumError("Could not decode the received message! " + follow_up.decode_error)
+                return follow_up.message
+        raise IridiumError("The command timed out or completed without returning a proper value!")
+    # end acquire_message
 
-        # Wait for other commands to finish like clear_mo_buffer, and read_binary
-        start = time.time()
-        while (self.pending_command() or len(self._sequential_write_queue) > 0) and (
-                time.time() - start < wait_time):
-            time.sleep(0.001)
+    def decode_message(self, content):
+        """Return the received message decoded with the `codec`.
 
-        # Replace the signal callbacks with their original methods
-        self.set_option("auto_read", old_read)
-        self.signal.message_received = old_message_received
-        self.signal.message_receive_failed = old_message_receive_failed
+        Raises:
+            IridiumError: If the message could not be decoded.
+        """
+        if self.codec is None:
+            return content
+        return self.codec.decode(content)
+    # end decode_message
 
-        # Return the collected values or raise an IridiumError
-        if len(values) == 0:
-            raise IridiumError("The command timed out or completed without returning a proper value!")
+    def receive_message(self, content):
+        """Decode a received message and give it to the `Signal.message_received` callback. The message is stored
+        in the `message` attribute of the read binary request that received it.
 
-        # Unpack the last value
-        return values[-1]
-    # end acquire_message
+        Returns:
+            message (bytes/memoryview): Decoded message or None if the message could not be decoded. This is a
+                memoryview with the 'zero_copy' option and no `codec`.
+        """
+        try:
+            message = self.decode_message(content)
+        except IridiumError as err:
+            self.signal.notification("Error", "Could not decode the received message!", str(err))
+            request = self._pending_request
+            if request is not None:
+                # Keep the message, so it is not lost after the MT buffer was read
+                request.message = bytes(content)
+                request.decode_error = str(err)
+            return None
+
+        self.signal.message_received(message)
+        if self.metrics is not None:
+            self.metrics.messages_received += 1
+        request = self._pending_request
+        if request is not None:
+            # Zero copy messages are only valid during the callback
+            request.message = bytes(message) if isinstance(message, memoryview) else message
+        return message
+    # end receive_message
 
     def initiate_session(self):
         """Initiate an SBD session extended (Check and read binary data)."""
@@ -1615,124 +2645,136 @@ class IridiumCommunicator(object):
         """Queue the read binary message."""
         self.queue_command(Command.READ_BINARY)
 
+    def message_request(self, message, options=None):
+        """Return a write binary CommandRequest that carries the message. The message is encoded with the `codec`.
+
+        Raises:
+            IridiumError: If the message is too long.
+        """
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+        if self.codec is not None:
+            message = self.codec.encode(message)
+        if len(message) > 340:
+            raise IridiumError("Message length must be no more than 340 bytes.")
+        return CommandRequest(Command.WRITE_BINARY + str(len(message)).encode("utf-8"), options, payload=message)
+    # end message_request
+
+    def exchange(self, message, wait_time=120, wait_for_previous=120):
+        """Write a message into the MO buffer, run a session and read the received message as one transaction.
+
+        The write binary, session, clear MO buffer and read binary commands are written back to back without other
+        queued commands in between. Only one session is run. `mt_queued` of the result tells if more messages are
+        waiting at the gateway. The Signal callbacks are still called.
+
+        Args:
+            message (bytes/str): Message to send. Must be no more than 340 bytes.
+            wait_time (float)[120]: Time in seconds to wait for the transaction to complete.
+            wait_for_previous (float)[120]: Time in seconds to wait for the previously queued commands to finish.
+
+        Returns:
+            result (ExchangeResult): MO status, MOMSN and the received message.
+
+        Raises:
+            IridiumError: If no thread is listening, the modem did not accept the message, or the session failed.
+            OutboxFull: If the outbox is full.
+        """
+        if not self.is_listening():
+            raise IridiumError("No threads are listening for responses!")
+
+        request = self.message_request(message, {'auto_read': False})
+        session = request.then(Command.SESSION)
+        self.queue_command(request)
+        self.wait_request(request, wait_time, wait_for_previous)
+
+        if not request.success:
+            raise IridiumError("The modem did not accept the message!")
+        if not session.success or session.value is None:
+            raise IridiumError("The session failed!")
+
+        # The message was already decoded when it was received. A message that could not be decoded is returned as
+        # it was received with the error, since the MT buffer was already read.
+        for follow_up in session.follow_ups:
+            if follow_up.command == Command.READ_BINARY and follow_up.message is not None:
+                return ExchangeResult(session.value, follow_up.message, follow_up.decode_error)
+        return ExchangeResult(session.value)
+    # end exchange
+
     def send_message(self, message):
         """Send a message. Requires testing!"""
         if not self.is_port_connected():
             self.signal.notification("Error", "Serial port not connected", "The port is closed!")
             return False
 
-        if len(message) > 340:
-            raise IridiumError("Message length must be less than 341 bytes.")
+        request = self.message_request(message)
+        self.previous_command = request.command
+        self._pending_request = request
+        self.write_serial(request.command + b'\r')
+        request.set_written()
+        return request
+    # end send_message
 
-        if isinstance(message, str):
-            message = message.encode("utf-8")
+    def queue_send_message(self, message, priority=None, expires=None, block=False, timeout=None):
+        """Queue up a message to be written into the MO buffer. The message and its write binary command are queued
+        together, so the modem always gets the right message when it is READY.
 
-        self._write_queue.append(message)
-        self.previous_command = Command.WRITE_BINARY + str(len(message)).encode("utf-8")
-        self.write_serial(self.previous_command + b'\r')
-    # end send_message
+        Args:
+            message (bytes/str): Message to send. Must be no more than 340 bytes.
+            priority (int)[None]: Outbox lane. See `queue_command`.
+            expires (float)[None]: Seconds after which the message is dropped if it was not written.
+            block (bool)[False]: If True wait for space when the outbox is full.
+            timeout (float)[None]: Maximum time in seconds to wait for space in the outbox.
+
+        Returns:
+            request (CommandRequest): Result handle for the write binary command.
 
-    def queue_send_message(self, message):
-        """Queue up a message. Requires testing!"""
+        Raises:
+            IridiumError: If the message is too long.
+            OutboxFull: If the outbox is full.
+        """
         if not self.is_port_connected():
             self.signal.notification("Error", "Serial port not connected", "The port is closed!")
             return False
 
-        if len(message) > 340:
-            raise IridiumError("Message length must be no more than 340 bytes.")
-
-        if isinstance(message, str):
-            message = message.encode("utf-8")
-
-        self._write_queue.append(message)
-        self.queue_command(Command.WRITE_BINARY + str(len(message)).encode("utf-8"))
+        request = self.message_request(message)
+        self.queue_command(request, priority, expires, block, timeout)
+        return request
     # end _queue_message
 # end class IridiumCommunicator
 
 
-def run_serial_log_file(filename, communicator, print_serial=None):
+def run_serial_log_file(filename, communicator, print_serial=None, chunk_size=4096, speed=None):
     """Play a log file back through a communicator.
-    
+
+    The file is memory mapped and walked with offsets by the `ReplayEngine`, so large captures replay in linear time
+    without being read into memory. Raw logs and framed captures from the `CaptureWriter` are both read.
+
     Args:
         filename(str): Name of the log file to read in
         communicator (IridiumCommunicator/str): IridiumCommunicator object or com port name to use to emulate the 
             communications.
         print_serial (function): Function to emulate io for the reading and writing. This should simply be a display 
             function to see the I/O.
+        chunk_size (int)[4096]: Maximum number of bytes given to `check_io` at once.
+        speed (float)[None]: Replay a framed capture with its recorded timing. 1 is real time and 2 is twice as fast.
+            None replays as fast as possible.
+
+    Returns:
+        result (ReplayResult): Number of bytes and commands replayed, the time it took and the `mb_per_sec`.
     """
-    with open(filename, "rb") as file:
-        buffer = file.read()
+    from pyiridium9602.pyiridium_replay import ReplayEngine
 
     if isinstance(communicator, str):
         communicator = IridiumCommunicator(communicator)
         Signal.set_to_print(communicator.signal)
-        
-    if print_serial is None:
-        def print_serial(bs):
-            """Fake pass through method"""
-            pass
 
     if not communicator.is_connected():
         communicator.silent_connect()
 
-    # Prevent reading and writing
-    communicator.read_serial = lambda *args, **kwargs: b''
-    communicator.write_serial = lambda *args, **kwargs: None
-    communicator.queue_command = lambda *args, **kwargs: None
-
-    # Loop through the data commands
-    while len(buffer) > 0:
-        at_idx = buffer.find(b'AT')
-        if at_idx == -1:
-            break
-
-        end_idx = buffer[at_idx:].find(b'\r')
-        newline_idx = buffer[at_idx:].find(b'\n')
-        if end_idx + 2 < newline_idx:  # Commands send with \r. Commands echo with \r\r\n
-            # Valid command
-            previous_data = buffer[:at_idx]
-            if previous_data != b"":
-                communicator.check_io(previous_data)
-            cmd = buffer[at_idx: at_idx+end_idx]
-            buffer = buffer[at_idx+end_idx+1:]
-
-            # Find the end of the command
-            ok_idx = buffer.find(Command.OK)
-            if ok_idx == -1:
-                break
-
-            # Find the receive data
-            data = buffer[:ok_idx+2]
-            buffer = buffer[ok_idx+2:]
-            if cmd == Command.READ_BINARY:
-                while not has_read_binary_data(data) and Command.OK in buffer:
-                    ok_idx = buffer.index(Command.OK)
-                    data = data + buffer[:ok_idx+2]
-                    buffer = buffer[ok_idx+2:]
-
-                # Final check for data (End of data)
-                if not has_read_binary_data(data):
-                    data = buffer
-                    buffer = b''
-
-            # Set the receive buffer to process data
-            print_serial(cmd + b'\r')
-            print_serial(data)
-            communicator._previous_command = cmd
-            communicator.check_io(data)
-
-            # Separate commands printed
-            print()
-
-        else:
-            # Skip
-            data = buffer[:at_idx+end_idx]
-            if data != b"":
-                print_serial(data)
-                communicator.check_io(data)
-            buffer = buffer[at_idx+end_idx:]
-
-    communicator.close()
+    try:
+        return ReplayEngine(communicator, print_serial, chunk_size, speed).replay_file(filename)
+    finally:
+        communicator.close()
 # end run_serial_log_file
 
 
@@ -1785,6 +2827,8 @@ if __name__ == "__main__":
 
     # Run the file or client
     if pargs.filename is not None:
-        run_serial_log_file(pargs.filename, pargs.port)
+        result = run_serial_log_file(pargs.filename, pargs.port)
+        print("Replayed {} commands ({:,} bytes) in {:.3f} sec ({:.1f} MB/s)".format(
+            result.commands, result.size, result.seconds, result.mb_per_sec))
     else:
         run_communicator(pargs.port)
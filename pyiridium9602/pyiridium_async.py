@@ -0,0 +1,432 @@
+"""
+    pyiridium_async
+    SeaLandAire Technologies
+    @author: jengel
+
+Asyncio iridium satellite communications. The serial port is read with `loop.add_reader`, so one event loop can run
+many modems without a thread for each modem.
+
+Example:
+
+    .. code-block:: python
+
+        import asyncio
+        from pyiridium9602 import AsyncIridiumCommunicator
+
+        async def main():
+            modem = AsyncIridiumCommunicator("/dev/ttyUSB0")
+            await modem.connect()
+
+            print("Signal Quality:", await modem.signal_quality())
+            await modem.send(b"Hello")
+            print("Session:", await modem.session())
+
+            async for msg in modem.messages():
+                print("Message:", msg)
+
+        asyncio.get_event_loop().run_until_complete(main())
+"""
+import time
+import asyncio
+
+from pyiridium9602.pyiridium import Command, IridiumError, CommandRequest, OutboxFull, Outbox, IridiumCommunicator
+
+
+__all__ = ['AsyncIridiumCommunicator']
+
+
+class AsyncIridiumCommunicator(IridiumCommunicator):
+    """Communicates with an iridium modem through a serial port using an asyncio event loop.
+
+    Commands are awaitable and run one at a time in the order they were awaited. Commands that are queued by the modem
+    responses (clearing the MO buffer and reading binary messages after a session) are run before the next awaited
+    command. The `Signal` callbacks are still called.
+
+    Note:
+        The blocking `acquire_*` and `wait_for_command` methods must not be used with this class. They would block the
+        event loop that reads the responses.
+
+    Note:
+        The serial port must have a file descriptor (Linux/macOS) to be used with `loop.add_reader`.
+
+    Args:
+        serialport(serial.Serial/str): Serial port or string com port name.
+        signal (Signal)[None]: Signal object with methods for custom actions.
+        options (dict): Dictionary of options 'echo', 'ring_alerts', 'auto_read', 'flow_control', 'telephone'.
+        loop (asyncio.AbstractEventLoop)[None]: Event loop to use. The running event loop is used by default.
+        message_queue_size (int)[100]: Maximum number of received messages kept for `messages()`. The oldest message is
+            dropped when the queue is full.
+    """
+
+    def __init__(self, serialport=None, signal=None, options=None, loop=None, message_queue_size=100):
+        self._loop = loop
+        self._reader_fd = None
+        self._command_lock = None
+        self._idle = None
+        self._outbox_space = None
+        self._waiter = None
+        self._messages = None
+        self.message_queue_size = message_queue_size
+        super().__init__(serialport, signal, options)
+
+        # Never block the event loop waiting for bytes
+        self.timeout = 0
+    # end Constructor
+
+    @property
+    def loop(self):
+        """Return the event loop that this communicator runs on."""
+        if self._loop is None:
+            self._loop = asyncio.get_event_loop()
+        return self._loop
+
+    def _setup_loop(self):
+        """Create the asyncio objects on the event loop."""
+        if self._command_lock is None:
+            self._command_lock = asyncio.Lock()
+            self._idle = asyncio.Event()
+            self._idle.set()
+            self._outbox_space = asyncio.Event()
+            self._outbox_space.set()
+            self._messages = asyncio.Queue()
+    # end _setup_loop
+
+    def start_thread(self):
+        """The event loop reads the serial port, so a listen thread is never created."""
+        pass
+
+    def start_reading(self):
+        """Register the serial port file descriptor with the event loop."""
+        self._setup_loop()
+        if self._reader_fd is None:
+            fd = self.serial_fileno()
+            if fd is None:
+                raise IridiumError("The serial port does not have a file descriptor to use with the event loop!")
+            self.loop.add_reader(fd, self._read_ready)
+            self._reader_fd = fd
+            self._active.set()
+    # end start_reading
+
+    def stop_reading(self):
+        """Remove the serial port file descriptor from the event loop."""
+        if self._reader_fd is not None:
+            try:
+                self.loop.remove_reader(self._reader_fd)
+            except (ValueError, OSError, RuntimeError):
+                pass  # Loop or port already closed
+            self._reader_fd = None
+        self._active.clear()
+    # end stop_reading
+
+    def stop_listening(self):
+        """Stop the IridiumCommunicator from listening."""
+        self.stop_reading()
+        super().stop_listening()
+
+    def _read_ready(self):
+        """Read all of the available data when the event loop reports that the serial port is readable."""
+        data = self.read_serial()
+        if self._reader_fd is not None:
+            self.process_io(data)
+    # end _read_ready
+
+    def process_io(self, message=b''):
+        """Process the incoming data and write queued commands then update the idle state."""
+        super().process_io(message)
+        self._update_idle()
+
+    def _update_idle(self):
+        """Set the idle event if no command is pending and no commands are queued and wake up `queue_send` calls
+        that are waiting for space in the outbox.
+        """
+        if self._idle is not None:
+            if self._previous_command is None and len(self.outbox) == 0:
+                self._idle.set()
+            else:
+                self._idle.clear()
+
+            if not self.outbox.is_full():
+                self._outbox_space.set()
+    # end _update_idle
+
+    def queue_command(self, command, priority=None, expires=None, block=False, timeout=None):
+        """Queue a command to be written after the pending command finishes.
+
+        Note:
+            `block` must not be used from the event loop. Use `queue_send` to wait for space in the outbox.
+        """
+        super().queue_command(command, priority, expires, block, timeout)
+        if self._idle is not None:
+            self._idle.clear()
+            self.loop.call_soon_threadsafe(self.process_io)
+    # end queue_command
+
+    def queue_command_later(self, delay, command, priority=None, expires=None):
+        """Queue a command after a delay with the event loop instead of a timer thread.
+
+        Returns:
+            handle (asyncio.TimerHandle): Handle that can be cancelled before the command is queued.
+        """
+        def queue():
+            try:
+                self.queue_command(command, priority, expires)
+            except OutboxFull as err:
+                self.signal.notification("Warning", "Could not queue the delayed command!", str(err))
+
+        return self.loop.call_later(delay, queue)
+    # end queue_command_later
+
+    def finish_command(self, success, data=b'', value=None):
+        """Complete the pending command and resolve the future of the awaited command."""
+        command = self._previous_command
+        super().finish_command(success, data, value)
+
+        # Resolve the awaited command
+        if self._waiter is not None and self._waiter[0] == command:
+            future = self._waiter[1]
+            self._waiter = None
+            if not future.done():
+                future.set_result((success, value, data))
+    # end finish_command
+
+    def receive_message(self, content):
+        """Decode a received message and collect it for `messages()`."""
+        message = super().receive_message(content)
+        if isinstance(message, memoryview):
+            message = bytes(message)  # Zero copy messages are only valid during the callback
+        if message is not None:
+            self._put_message(message)
+        return message
+
+    def _put_message(self, message):
+        """Add a received message to the message queue dropping the oldest message if the queue is full."""
+        if self._messages is None:
+            return
+        if self.message_queue_size and self._messages.qsize() >= self.message_queue_size:
+            self._messages.get_nowait()
+            if self.metrics is not None:
+                self.metrics.messages_dropped += 1
+            self.signal.notification("Warning", "Message queue is full! The oldest message was dropped.", "")
+        self._messages.put_nowait(message)
+    # end _put_message
+
+    def metrics_snapshot(self):
+        """Return the metrics and the queue depths including the received message queue."""
+        snapshot = super().metrics_snapshot()
+        if self._messages is not None:
+            snapshot['queues']['messages'] = {'depth': self._messages.qsize(), 'dropped': self.metrics.messages_dropped}
+        return snapshot
+
+    async def connect(self, port_id=None):
+        """Connect to the iridium modem over the serial port and ensure that it is working.
+
+        Args:
+            port_id (str/serial.Serial): COM port string or serial object.
+
+        Raises:
+            IridiumError: If the port cannot be opened or if the ping did not find a response.
+        """
+        if port_id is not None:
+            self.serialport = port_id
+
+        # Connecting signal
+        self.signal.connecting()
+
+        # Force the serial port to be open
+        try:
+            if not self.serialport.isOpen():
+                self.serialport.open()
+        except Exception as err:
+            raise IridiumError("Could not connect. The serial port would not open!") from err
+
+        self.start_reading()
+
+        try:
+            # Configure the port options
+            await self.run_command(Command.ECHO_ON if self.get_option("echo") else Command.ECHO_OFF,
+                                   self.connect_timeout)
+            await self.run_command(Command.FLOW_CONTROL_ON if self.get_option("flow_control") else
+                                   Command.FLOW_CONTROL_OFF, self.connect_timeout)
+            await self.run_command(Command.RING_ALERTS_ON if self.get_option("ring_alerts") else
+                                   Command.RING_ALERTS_OFF, self.connect_timeout)
+
+            # Ping and wait for a response
+            await self.run_command(Command.PING, self.connect_timeout)
+        except IridiumError as err:
+            self.close()
+            raise IridiumError("Could not connect. The ping did not find a response!") from err
+
+        # Connected signal
+        self._connected = True
+        self.signal.connected()
+    # end connect
+
+    def close(self):
+        """Close the serial port properly and stop any `messages()` iterators."""
+        self.stop_reading()
+        super().close()
+
+        if self._waiter is not None:
+            future = self._waiter[1]
+            self._waiter = None
+            if not future.done():
+                future.set_exception(IridiumError("The connection was closed!"))
+        if self._messages is not None:
+            self._messages.put_nowait(None)
+    # end close
+
+    async def wait_idle(self, timeout=120):
+        """Wait until no command is pending and no commands are queued.
+
+        Raises:
+            IridiumError: If the commands did not finish in time.
+        """
+        self._setup_loop()
+        self._update_idle()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError as err:
+            raise IridiumError("The previous command did not finish in time!") from err
+    # end wait_idle
+
+    async def run_command(self, command, timeout=120, wait_for_previous=120, payload=None):
+        """Write a command and wait for the response.
+
+        Args:
+            command (bytes/str): Command to send without the b'\\r'.
+            timeout (float)[120]: Time in seconds to wait for the command to complete.
+            wait_for_previous (float)[120]: Time in seconds to wait for the previous commands to finish.
+            payload (bytes)[None]: Message to write when the modem is READY (write binary commands).
+
+        Returns:
+            value (object): Parsed response value from the command's handler or the response bytes if the command does
+                not have a parser.
+
+        Raises:
+            IridiumError: If the port is closed, the command timed out, or the command was not successful.
+        """
+        if isinstance(command, str):
+            command = command.encode("utf-8")
+        if not self.is_port_connected():
+            raise IridiumError("Serial port not connected!")
+
+        self._setup_loop()
+        async with self._command_lock:
+            await self.wait_idle(wait_for_previous)
+
+            future = self.loop.create_future()
+            self._waiter = (command, future)
+            self._previous_command = command
+            if payload is not None:
+                self._pending_request = CommandRequest(command, payload=payload)
+            self._idle.clear()
+            self._command_start = time.perf_counter()
+            self.write_serial(command + b'\r')
+
+            try:
+                success, value, data = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError as err:
+                if self._waiter is not None and self._waiter[1] is future:
+                    if self.metrics is not None:
+                        self.record_command_metrics(command, False)  # Count the timeout as a failure
+                    self._waiter = None
+                    self._previous_command = None
+                    self._pending_request = None
+                    self.process_io()  # Run any queued commands
+                raise IridiumError("The command " + repr(command) + " timed out!") from err
+
+        if not success:
+            raise IridiumError("The command " + repr(command) + " failed!")
+        if value is None:
+            return data
+        return value
+    # end run_command
+
+    async def signal_quality(self, timeout=120):
+        """Return the signal quality number (0 - 5)."""
+        return await self.run_command(Command.SIGNAL_QUALITY, timeout)
+
+    async def system_time(self, timeout=120):
+        """Return the system time."""
+        return await self.run_command(Command.SYSTEM_TIME, timeout)
+
+    async def get_serial_number(self, timeout=120):
+        """Return the serial number / imei identification number as a string."""
+        return await self.run_command(Command.SERIAL_NUMBER, timeout)
+
+    async def ring_status(self, timeout=120):
+        """Return the telephone ring indicator and the SBD ring indicator."""
+        return await self.run_command(Command.CHECK_RING, timeout)
+
+    async def session(self, timeout=120):
+        """Run an SBD session extended.
+
+        Received messages are read automatically if the 'auto_read' option is set and are given by `messages()`.
+
+        Returns:
+            mo_status (int): Outgoing status
+            mo_msn (int): Outgoing message serial number
+            mt_status (int): Incoming status
+            mt_msn (int): Incoming message serial number
+            mt_length (int): Incoming message length
+            mt_queued (int): Number of incoming messages queued
+        """
+        return await self.run_command(Command.SESSION, timeout)
+
+    async def send(self, message, timeout=120):
+        """Write a message into the MO buffer. Run `session()` to transfer the message.
+
+        Args:
+            message (bytes/str): Message to send. Must be no more than 340 bytes.
+            timeout (float)[120]: Time in seconds to wait for the command to complete.
+
+        Raises:
+            IridiumError: If the message is too long or the modem did not accept the message.
+        """
+        request = self.message_request(message)
+        await self.run_command(request.command, timeout, payload=request.payload)
+    # end send
+
+    async def queue_send(self, message, priority=Outbox.PRIORITY_NORMAL, expires=None, timeout=None):
+        """Queue a message to be written into the MO buffer and wait for space if the outbox is full.
+
+        The message is written after the pending commands. Run `session()` to transfer the message.
+
+        Args:
+            message (bytes/str): Message to send. Must be no more than 340 bytes.
+            priority (int)[Outbox.PRIORITY_NORMAL]: Outbox lane.
+            expires (float)[None]: Seconds after which the message is dropped if it was not written.
+            timeout (float)[None]: Maximum time in seconds to wait for space in the outbox.
+
+        Returns:
+            request (CommandRequest): Result handle for the write binary command.
+
+        Raises:
+            IridiumError: If the message is too long.
+            OutboxFull: If there was no space in the outbox in time.
+        """
+        request = self.message_request(message)
+        self._setup_loop()
+        end = None if timeout is None else self.loop.time() + timeout
+        while self.outbox.is_full():
+            self._outbox_space.clear()
+            remaining = None if end is None else max(end - self.loop.time(), 0)
+            try:
+                await asyncio.wait_for(self._outbox_space.wait(), remaining)
+            except asyncio.TimeoutError:
+                break  # put raises OutboxFull
+
+        self.queue_command(request, priority, expires)
+        return request
+    # end queue_send
+
+    async def messages(self):
+        """Asynchronously iterate over the received messages until the communicator is closed."""
+        self._setup_loop()
+        while True:
+            message = await self._messages.get()
+            if message is None:
+                return
+            yield message
+    # end messages
+# end class AsyncIridiumCommunicator
@@ -0,0 +1,297 @@
+"""
+    pyiridium_batch
+    SeaLandAire Technologies
+    @author: jengel
+
+Decode archives of modem captures in parallel. Each capture is decoded without a communicator into records for the
+sessions (MO/MT status), the received and sent messages and their checksums. The files are decoded by a process pool
+and the records are streamed to JSONL or CSV as each file finishes.
+
+Raw captures and framed captures from the `CaptureWriter` are both decoded. Records from framed captures have the wall
+clock 'time' of the command.
+
+Example:
+
+    .. code-block:: python
+
+        from pyiridium9602 import decode_capture, decode_batch
+
+        for record in decode_capture("field_unit.log"):
+            print(record['type'], record.get('mo_msn'), record.get('checksum_ok'))
+
+        result = decode_batch(["captures/"], "decoded.jsonl", processes=8)
+        print(result.files_per_sec, result.records_per_sec)
+
+Command line:
+
+    python -m pyiridium9602.pyiridium_batch captures/ -o decoded.csv -j 8
+"""
+import os
+import sys
+import csv
+import json
+import mmap
+import time
+import fnmatch
+import collections
+import multiprocessing
+
+from pyiridium9602.pyiridium import Command, IridiumError, parse_read_binary, parse_write_binary
+from pyiridium9602.pyiridium_lexer import LEXER
+from pyiridium9602.pyiridium_checksum import checksum
+from pyiridium9602.pyiridium_capture import CAPTURE_WRITE, is_framed_capture, capture_start_time, iter_frames
+from pyiridium9602.pyiridium_replay import SEGMENT_COMMAND, SEGMENT_RESPONSE, SEGMENT_WRITTEN, iter_capture
+from pyiridium9602.pyiridium_index import INDEX_EXTENSION
+
+
+__all__ = ['RECORD_FIELDS', 'BatchResult', 'decode_capture', 'find_captures', 'iter_decoded', 'decode_batch', 'main']
+
+
+# Record columns. Each record has 'file', 'offset' and 'type'. The other columns depend on the type.
+#   * 'session': SBDIX result
+#   * 'mt_message': Message read with SBDRB. 'checksum_ok' is False for a checksum failure.
+#   * 'mo_message': Message written with SBDWB. 'write_ok' is the modem's write binary response.
+#   * 'error': The file could not be decoded.
+RECORD_FIELDS = ['file', 'offset', 'time', 'type', 'command', 'mo_status', 'mo_msn', 'mt_status', 'mt_msn',
+                 'mt_length', 'mt_queued', 'mo_transferred', 'length', 'checksum_ok', 'write_ok', 'payload', 'error']
+
+
+class BatchResult(collections.namedtuple('BatchResult', 'files records failures seconds')):
+    """Result of a batch decode.
+
+    Attributes:
+        files (int): Number of files decoded.
+        records (int): Number of records written.
+        failures (int): Number of files that could not be decoded.
+        seconds (float): Time the batch took.
+    """
+    __slots__ = ()
+
+    @property
+    def files_per_sec(self):
+        return self.files / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def records_per_sec(self):
+        return self.records / self.seconds if self.seconds > 0 else 0.0
+# end class BatchResult
+
+
+def _iter_raw_commands(data):
+    """Yield (offset, time, command, response, written) for each command in a raw capture."""
+    current = None
+    for kind, command, start, end in iter_capture(data):
+        if kind == SEGMENT_COMMAND:
+            if current is not None:
+                yield current[0], None, current[1], b''.join(current[2]), current[3]
+            current = [start, command, [], None]
+        elif current is None:
+            continue
+        elif kind == SEGMENT_RESPONSE:
+            current[2].append(data[start: end])
+        elif kind == SEGMENT_WRITTEN:
+            current[3] = data[start: end]
+        else:
+            yield current[0], None, current[1], b''.join(current[2]), current[3]
+            current = None
+    if current is not None:
+        yield current[0], None, current[1], b''.join(current[2]), current[3]
+# end _iter_raw_commands
+
+
+def _iter_framed_commands(data):
+    """Yield (offset, time, command, response, written) for each command in a framed capture."""
+    start_time = capture_start_time(data)
+    current = None
+    for timestamp, direction, start, end in iter_frames(data):
+        if direction == CAPTURE_WRITE:
+            written = data[start: end]
+            if current is not None and current[4] is True:
+                current[4] = written  # Write binary message
+                continue
+            if written.startswith(Command.PING) and written.endswith(b'\r'):
+                if current is not None:
+                    yield current[0], current[1], current[2], b''.join(current[3]), current[4]
+                command = written[:-1]
+                current = [start, start_time + timestamp, command, [], command.startswith(Command.WRITE_BINARY)]
+        elif current is not None:
+            current[3].append(data[start: end])
+    if current is not None:
+        yield current[0], current[1], current[2], b''.join(current[3]), current[4]
+# end _iter_framed_commands
+
+
+def _decode_data(data, name):
+    """Return the records for the capture bytes."""
+    records = []
+    commands = _iter_framed_commands(data) if is_framed_capture(data) else _iter_raw_commands(data)
+    for offset, timestamp, command, response, written in commands:
+        base = {'file': name, 'offset': offset, 'time': timestamp, 'command': command.decode('utf-8', 'replace')}
+        if command == Command.SESSION or command == Command.SESSION_RING_ALERT:
+            try:
+                session = LEXER.lex(response, Command.SESSION_RECEIVE)
+            except ValueError:
+                continue
+            record = dict(base, type='session', mo_transferred=session.mo_transferred)
+            record.update(session._asdict())
+            records.append(record)
+
+        elif command == Command.READ_BINARY:
+            try:
+                msg_len, content, msg_check, calc_check = parse_read_binary(response)
+            except IridiumError:
+                continue
+            records.append(dict(base, type='mt_message', length=msg_len, checksum_ok=msg_check == calc_check,
+                                payload=content.hex()))
+
+        elif command.startswith(Command.WRITE_BINARY) and isinstance(written, bytes) and len(written) >= 2:
+            content = written[:-2]
+            ok_idx = response.rfind(Command.OK)
+            try:
+                write_ok = parse_write_binary(response[:ok_idx] if ok_idx >= 0 else response)
+            except IridiumError:
+                write_ok = None
+            records.append(dict(base, type='mo_message', length=len(content),
+                                checksum_ok=checksum(content) == written[-2:], write_ok=write_ok,
+                                payload=content.hex()))
+    return records
+# end _decode_data
+
+
+def decode_capture(filename):
+    """Return the records of a raw or framed capture file.
+
+    Args:
+        filename (str): Capture file name.
+
+    Returns:
+        records (list): Dictionaries with the `RECORD_FIELDS` keys that apply to the record type.
+    """
+    with open(filename, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return _decode_data(data, filename)
+# end decode_capture
+
+
+def _decode_file(filename):
+    """Process pool worker. Return the filename and the records or an error record."""
+    try:
+        return filename, decode_capture(filename), False
+    except Exception as err:
+        return filename, [{'file': filename, 'offset': 0, 'type': 'error', 'error': str(err)}], True
+
+
+def find_captures(paths, pattern='*'):
+    """Return the sorted capture file names in the given files and directories (recursive).
+
+    Sidecar index files are skipped.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    filenames = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                filenames.extend(os.path.join(root, name) for name in files
+                                 if fnmatch.fnmatch(name, pattern) and not name.endswith(INDEX_EXTENSION))
+        else:
+            filenames.append(path)
+    return sorted(filenames)
+# end find_captures
+
+
+def iter_decoded(filenames, processes=None, chunksize=1):
+    """Decode the files with a process pool and yield (filename, records, failed) as each file finishes.
+
+    Args:
+        filenames (list): Capture file names.
+        processes (int)[None]: Number of processes. None uses the number of CPUs. 1 decodes in this process.
+        chunksize (int)[1]: Number of files given to a process at once. Use more for many small files.
+    """
+    if processes == 1 or len(filenames) <= 1:
+        for filename in filenames:
+            yield _decode_file(filename)
+        return
+
+    with multiprocessing.Pool(processes) as pool:
+        for result in pool.imap_unordered(_decode_file, filenames, chunksize):
+            yield result
+# end iter_decoded
+
+
+def _record_row(record):
+    """Return the CSV row values for a record."""
+    return ['' if record.get(field) is None else record[field] for field in RECORD_FIELDS]
+
+
+def decode_batch(paths, output, fmt=None, processes=None, pattern='*', chunksize=1):
+    """Decode the captures in parallel and stream the records to a JSONL or CSV file.
+
+    Args:
+        paths (list/str): Capture files and directories.
+        output (str/file): Output file name or text file object.
+        fmt (str)[None]: 'jsonl' or 'csv'. Default is from the output file extension or 'jsonl'.
+        processes (int)[None]: Number of processes. None uses the number of CPUs.
+        pattern (str)['*']: File name pattern for the files in the directories.
+        chunksize (int)[1]: Number of files given to a process at once.
+
+    Returns:
+        result (BatchResult): Number of files, records and failures and the time it took.
+    """
+    if fmt is None:
+        fmt = 'csv' if isinstance(output, str) and output.lower().endswith('.csv') else 'jsonl'
+    if fmt not in ('jsonl', 'csv'):
+        raise ValueError("The format must be 'jsonl' or 'csv'!")
+
+    start = time.perf_counter()
+    filenames = find_captures(paths, pattern)
+    file = open(output, 'w', newline='') if isinstance(output, str) else output
+    try:
+        if fmt == 'csv':
+            writer = csv.writer(file)
+            writer.writerow(RECORD_FIELDS)
+        else:
+            writer = None
+
+        records = failures = 0
+        for filename, file_records, failed in iter_decoded(filenames, processes, chunksize):
+            if writer is not None:
+                writer.writerows(_record_row(record) for record in file_records)
+            else:
+                file.writelines(json.dumps(record) + '\n' for record in file_records)
+            records += len(file_records)
+            failures += failed
+    finally:
+        if file is not output:
+            file.close()
+    return BatchResult(len(filenames), records, failures, time.perf_counter() - start)
+# end decode_batch
+
+
+def main(argv=None):
+    """Command line interface for `decode_batch`."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Decode modem captures in parallel into JSONL or CSV records.")
+    parser.add_argument('paths', nargs='+', help="Capture files and directories")
+    parser.add_argument('-o', '--output', default='-', help="Output file. '-' writes to stdout.")
+    parser.add_argument('-f', '--format', choices=('jsonl', 'csv'), default=None,
+                        help="Output format. Default is from the output file extension or jsonl.")
+    parser.add_argument('-j', '--processes', type=int, default=None, help="Number of processes. Default is the CPUs")
+    parser.add_argument('-p', '--pattern', default='*', help="File name pattern in the directories")
+    parser.add_argument('-c', '--chunksize', type=int, default=1, help="Files given to a process at once")
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output == '-' else args.output
+    result = decode_batch(args.paths, output, args.format, args.processes, args.pattern, args.chunksize)
+    print("Decoded {} files ({} failed) into {} records in {:.3f} sec ({:.1f} files/s, {:.0f} records/s)".format(
+        result.files, result.failures, result.records, result.seconds, result.files_per_sec,
+        result.records_per_sec), file=sys.stderr)
+    return 0 if result.failures == 0 else 1
+# end main
+
+
+if __name__ == "__main__":
+    sys.exit(main())
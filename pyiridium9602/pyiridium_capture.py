@@ -0,0 +1,212 @@
+"""
+    pyiridium_capture
+    SeaLandAire Technologies
+    @author: jengel
+
+Record the serial port traffic of a communicator with timestamps. Set `IridiumCommunicator.capture` to a
+`CaptureWriter` and every `read_serial` and `write_serial` is recorded as a frame with the direction and a monotonic
+timestamp. The frames are queued and written to the file by a background thread, so the thread that reads the serial
+port never waits for the disk. The file can be rotated when it gets too large.
+
+The file starts with a header (magic, version, wall clock time of timestamp 0). Each frame is an 11 byte header
+(timestamp in ns, direction, length) followed by the data. `run_serial_log_file` reads these captures and can replay
+them with the recorded timing.
+
+Example:
+
+    .. code-block:: python
+
+        from pyiridium9602 import IridiumCommunicator, CaptureWriter, run_serial_log_file
+
+        iridium_port = IridiumCommunicator("/dev/ttyUSB0")
+        iridium_port.capture = CaptureWriter("modem.cap", max_bytes=50000000, backup_count=5)
+        iridium_port.connect()
+        ...
+        iridium_port.close()
+        iridium_port.capture.close()
+
+        # Replay at the recorded speed
+        run_serial_log_file("modem.cap", IridiumCommunicator(), speed=1)
+"""
+import os
+import time
+import struct
+import threading
+import collections
+
+
+__all__ = ['CAPTURE_MAGIC', 'CAPTURE_READ', 'CAPTURE_WRITE', 'CaptureFrame', 'CaptureWriter', 'is_framed_capture',
+           'capture_start_time', 'iter_frames']
+
+
+CAPTURE_MAGIC = b'PYIRCAP\x00'
+CAPTURE_VERSION = 1
+
+CAPTURE_READ = 0  # Bytes read from the modem
+CAPTURE_WRITE = 1  # Bytes written to the modem
+
+# Magic, version, wall clock time of timestamp 0
+_FILE_HEADER = struct.Struct('<8sHd')
+
+# Timestamp in ns, direction, data length
+_FRAME = struct.Struct('<QBH')
+_MAX_FRAME_DATA = 0xFFFF
+
+
+CaptureFrame = collections.namedtuple('CaptureFrame', 'timestamp direction start end')
+
+
+class CaptureWriter(object):
+    """Write timestamped serial frames to a capture file from a background thread.
+
+    Args:
+        filename (str): Capture file name.
+        max_bytes (int)[0]: Rotate the file when it is larger than this many bytes. 0 never rotates.
+        backup_count (int)[5]: Number of rotated files to keep like 'modem.cap.1' (newest) to 'modem.cap.5'.
+        flush_interval (float)[0.05]: Maximum time in seconds a frame waits before it is written.
+    """
+
+    def __init__(self, filename, max_bytes=0, backup_count=5, flush_interval=0.05):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+
+        self.frames = 0  # Frames written
+        self.size = 0  # Size of the current file
+
+        self._start = time.monotonic_ns()
+        self._start_time = time.time()
+        self._pending = collections.deque()  # (timestamp, direction, data). Appending does not need a lock.
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._file = self._open()
+
+        self._thread = threading.Thread(target=self._run, name="CaptureWriter")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def record(self, direction, data):
+        """Queue the data as a frame. This never waits for the disk.
+
+        Args:
+            direction (int): CAPTURE_READ or CAPTURE_WRITE
+            data (bytes): Data that was read or written.
+        """
+        if data and not self._closed:
+            self._pending.append((time.monotonic_ns() - self._start, direction, bytes(data)))
+
+    def record_read(self, data):
+        """Queue the bytes that were read from the modem."""
+        self.record(CAPTURE_READ, data)
+
+    def record_write(self, data):
+        """Queue the bytes that were written to the modem."""
+        self.record(CAPTURE_WRITE, data)
+
+    def _open(self):
+        """Open a new capture file and write the header."""
+        file = open(self.filename, 'wb')
+        file.write(_FILE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, self._start_time))
+        self.size = _FILE_HEADER.size
+        return file
+
+    def _rotate(self):
+        """Move the current file to the first backup and open a new file. The oldest backup is removed."""
+        self._file.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = "{}.{}".format(self.filename, i)
+                if os.path.exists(src):
+                    os.replace(src, "{}.{}".format(self.filename, i + 1))
+            os.replace(self.filename, self.filename + ".1")
+        self._file = self._open()
+    # end _rotate
+
+    def flush(self):
+        """Write all of the queued frames to the file."""
+        with self._write_lock:
+            if self._file is None:
+                return
+            pack = _FRAME.pack
+            pending = self._pending
+            while pending:
+                parts = []
+                while pending:
+                    timestamp, direction, data = pending.popleft()
+                    for i in range(0, len(data), _MAX_FRAME_DATA):
+                        chunk = data[i: i + _MAX_FRAME_DATA]
+                        parts.append(pack(timestamp, direction, len(chunk)))
+                        parts.append(chunk)
+                        self.size += _FRAME.size + len(chunk)
+                        self.frames += 1
+                    if self.max_bytes and self.size >= self.max_bytes:
+                        break
+                self._file.write(b''.join(parts))
+                if self.max_bytes and self.size >= self.max_bytes:
+                    self._rotate()
+            self._file.flush()
+    # end flush
+
+    def _run(self):
+        """Write the queued frames until the writer is closed."""
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self.flush()
+
+    def close(self):
+        """Write the queued frames and close the file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        with self._write_lock:
+            self._file.close()
+            self._file = None
+    # end close
+# end class CaptureWriter
+
+
+def is_framed_capture(data):
+    """Return True if the capture bytes start with the framed capture header."""
+    return data[:len(CAPTURE_MAGIC)] == CAPTURE_MAGIC
+
+
+def capture_start_time(data):
+    """Return the wall clock time (time.time()) of timestamp 0 in a framed capture."""
+    return _FILE_HEADER.unpack_from(data)[2]
+
+
+def iter_frames(data, start=0, end=None):
+    """Yield a CaptureFrame for each frame in a framed capture.
+
+    The timestamp is in seconds. The start and end are the offsets of the frame data, so the data is not copied. A frame
+    that was cut off at the end of the capture is skipped.
+
+    Args:
+        data (bytes/mmap): Framed capture bytes.
+        start (int)[0]: Offset of a frame header. Default is the first frame.
+        end (int)[None]: Offset to stop at. Default is the end of the data.
+    """
+    if end is None:
+        end = len(data)
+    pos = max(start, _FILE_HEADER.size)
+    unpack_from = _FRAME.unpack_from
+    header_size = _FRAME.size
+    while pos + header_size <= end:
+        timestamp, direction, length = unpack_from(data, pos)
+        pos += header_size
+        if pos + length > end:
+            break
+        yield CaptureFrame(timestamp / 1e9, direction, pos, pos + length)
+        pos += length
+# end iter_frames
@@ -0,0 +1,124 @@
+"""
+    pyiridium_checksum
+    SeaLandAire Technologies
+    @author: jengel
+
+SBD message checksums. The checksum is the least significant 2 bytes of the sum of the message bytes, sent big endian.
+
+`Checksum` is updated as bytes arrive, so a read binary response is validated as soon as its last byte is received.
+`checksum_batch` and `verify_checksums` check many messages at once for log analysis. They use NumPy if it is installed.
+
+Example:
+
+    .. code-block:: python
+
+        from pyiridium9602 import Checksum, checksum, verify_checksums
+
+        check = Checksum()
+        check.update(b'Hello ')
+        check.update(b'World')
+        assert check.digest() == checksum(b'Hello World') == b'\\x04\\x1c'
+
+        valid = verify_checksums(payloads, checksums)  # [True, False, ...]
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+__all__ = ['checksum', 'Checksum', 'checksum_batch', 'verify_checksums']
+
+
+def checksum(data):
+    """Return the 2 checksum bytes for the message data."""
+    return (sum(data) & 0xFFFF).to_bytes(2, 'big')
+
+
+class Checksum(object):
+    """Incremental SBD checksum.
+
+    Args:
+        data (bytes)[b'']: Initial message bytes.
+    """
+    __slots__ = ('total',)
+
+    def __init__(self, data=b''):
+        self.total = sum(data)
+
+    def __int__(self):
+        return self.total & 0xFFFF
+
+    def __eq__(self, other):
+        if isinstance(other, Checksum):
+            return int(self) == int(other)
+        return self.digest() == other
+
+    def __repr__(self):
+        return "Checksum({!r})".format(self.digest())
+
+    def update(self, data):
+        """Add more message bytes to the checksum."""
+        self.total += sum(data)
+        return self
+
+    def digest(self):
+        """Return the 2 checksum bytes."""
+        return (self.total & 0xFFFF).to_bytes(2, 'big')
+# end class Checksum
+
+
+def _checksum_sums(payloads):
+    """Return the 16 bit checksum values for a list of messages as a NumPy array."""
+    lengths = numpy.fromiter(map(len, payloads), dtype=numpy.int64, count=len(payloads))
+    data = numpy.frombuffer(b''.join(payloads), dtype=numpy.uint8)
+    sums = numpy.zeros(len(payloads), dtype=numpy.uint64)
+    if len(data) == 0:
+        return sums.astype(numpy.uint16)
+
+    # reduceat sums from each offset to the next offset. Empty messages are skipped, so the offsets always increase.
+    offsets = numpy.cumsum(lengths) - lengths
+    filled = lengths > 0
+    sums[filled] = numpy.add.reduceat(data, offsets[filled], dtype=numpy.uint64)
+    return sums.astype(numpy.uint16)
+# end _checksum_sums
+
+
+def checksum_batch(payloads):
+    """Return the 2 checksum bytes for each message.
+
+    Args:
+        payloads (list): Message bytes.
+
+    Returns:
+        checksums (list): 2 checksum bytes for each message.
+    """
+    if numpy is None or len(payloads) == 0:
+        return [checksum(p) for p in payloads]
+
+    raw = _checksum_sums(payloads).astype('>u2').tobytes()
+    return [raw[i: i+2] for i in range(0, len(raw), 2)]
+# end checksum_batch
+
+
+def verify_checksums(payloads, checksums):
+    """Return if each message matches its checksum.
+
+    Args:
+        payloads (list): Message bytes.
+        checksums (list): 2 checksum bytes that were received with each message.
+
+    Returns:
+        valid (list): True for each message that matches its checksum.
+    """
+    if len(payloads) != len(checksums):
+        raise ValueError("Each message needs a checksum!")
+    if numpy is None or len(payloads) == 0:
+        return [checksum(p) == c for p, c in zip(payloads, checksums)]
+
+    received = b''.join(checksums)
+    if len(received) != 2 * len(checksums):
+        # Some checksums do not have 2 bytes, so they cannot be lined up with the messages
+        return [checksum(p) == c for p, c in zip(payloads, checksums)]
+    return (_checksum_sums(payloads) == numpy.frombuffer(received, dtype='>u2')).tolist()
+# end verify_checksums
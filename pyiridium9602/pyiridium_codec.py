@@ -0,0 +1,207 @@
+"""
+    pyiridium_codec
+    SeaLandAire Technologies
+    @author: jengel
+
+Compress SBD messages. Each message starts with a one byte header. The low 4 bits are the codec and the high 4 bits are
+the preset dictionary id (0 for no dictionary). Messages that do not get smaller are sent raw.
+
+Preset dictionaries are trained from captured messages with `train_dictionary`. Both ends must have the same
+dictionaries for the same ids. A new dictionary can be added with a new id while the old one is still decoded.
+
+zstd is used if the optional `zstandard` package is installed.
+
+Example:
+
+    .. code-block:: python
+
+        from pyiridium9602 import IridiumCommunicator, MessageCodec, train_dictionary
+
+        codec = MessageCodec(dictionaries={1: train_dictionary(captured_messages)})
+
+        iridium_port = IridiumCommunicator("/dev/ttyUSB0")
+        iridium_port.codec = codec  # Messages are encoded before they are sent and decoded when they are received
+"""
+import zlib
+import lzma
+import collections
+
+from pyiridium9602.pyiridium import IridiumError
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+__all__ = ['CODEC_RAW', 'CODEC_ZLIB', 'CODEC_LZMA', 'CODEC_ZSTD', 'MessageCodec', 'train_dictionary']
+
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1  # Raw deflate stream without the zlib header and checksum
+CODEC_LZMA = 2  # Raw LZMA2 stream without the xz container. Preset dictionaries are not supported
+CODEC_ZSTD = 3  # Requires the zstandard package
+
+# SBD messages are small. A large dictionary window only costs memory and setup time for every message.
+LZMA_FILTERS = [{'id': lzma.FILTER_LZMA2, 'preset': 9 | lzma.PRESET_EXTREME, 'dict_size': 1 << 16}]
+
+
+class MessageCodec(object):
+    """Encode and decode SBD messages with a one byte codec header.
+
+    `encode` tries each codec and keeps the smallest result. The raw message is used if no codec makes it smaller.
+    `decode` supports every codec and dictionary that it knows about.
+
+    Args:
+        codecs (tuple)[None]: Codec ids to try when encoding. Defaults to zlib and zstd if it is installed.
+        dictionaries (dict)[None]: Preset dictionaries {id (1 - 15): bytes}.
+        dictionary_id (int)[None]: Dictionary used to encode. Defaults to the largest id in `dictionaries`.
+        level (int)[9]: Compression level for zlib and zstd.
+    """
+
+    def __init__(self, codecs=None, dictionaries=None, dictionary_id=None, level=9):
+        if codecs is None:
+            codecs = (CODEC_ZLIB, CODEC_ZSTD) if zstandard is not None else (CODEC_ZLIB,)
+        if CODEC_ZSTD in codecs and zstandard is None:
+            raise IridiumError("The zstandard package is required for the zstd codec!")
+
+        self.codecs = tuple(codecs)
+        self.level = level
+        self.dictionaries = {}
+        self._zstd_dicts = {}
+        for dict_id, data in (dictionaries or {}).items():
+            self.add_dictionary(dict_id, data)
+
+        if dictionary_id is None:
+            dictionary_id = max(self.dictionaries, default=0)
+        self.dictionary_id = dictionary_id
+    # end Constructor
+
+    def add_dictionary(self, dict_id, data):
+        """Add a preset dictionary that can be used to encode and decode messages.
+
+        Raises:
+            IridiumError: If the dictionary id is not 1 - 15.
+        """
+        if not 0 < dict_id < 16:
+            raise IridiumError("The dictionary id must be 1 - 15!")
+        self.dictionaries[dict_id] = bytes(data)
+        if zstandard is not None:
+            self._zstd_dicts[dict_id] = zstandard.ZstdCompressionDict(bytes(data),
+                                                                       dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+    # end add_dictionary
+
+    def compress(self, codec, data, dict_id=0):
+        """Return the data compressed with the given codec and dictionary without the header."""
+        zdict = self.dictionaries.get(dict_id)
+        if codec == CODEC_ZLIB:
+            if zdict:
+                compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, zdict)
+            else:
+                compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, 9)
+            return compressor.compress(data) + compressor.flush()
+        elif codec == CODEC_LZMA:
+            return lzma.compress(data, lzma.FORMAT_RAW, filters=LZMA_FILTERS)
+        elif codec == CODEC_ZSTD:
+            compressor = zstandard.ZstdCompressor(level=self.level, dict_data=self._zstd_dicts.get(dict_id),
+                                                  write_checksum=False, write_content_size=False,
+                                                  write_dict_id=False)
+            return compressor.compress(data)
+        raise IridiumError("Unknown codec {}!".format(codec))
+    # end compress
+
+    def decompress(self, codec, data, dict_id=0):
+        """Return the decompressed data for the given codec and dictionary."""
+        if dict_id and dict_id not in self.dictionaries:
+            raise IridiumError("Unknown dictionary {}!".format(dict_id))
+        zdict = self.dictionaries.get(dict_id)
+
+        try:
+            if codec == CODEC_ZLIB:
+                if zdict:
+                    decompressor = zlib.decompressobj(-15, zdict=zdict)
+                else:
+                    decompressor = zlib.decompressobj(-15)
+                return decompressor.decompress(data) + decompressor.flush()
+            elif codec == CODEC_LZMA:
+                return lzma.decompress(data, lzma.FORMAT_RAW, filters=LZMA_FILTERS)
+            elif codec == CODEC_ZSTD and zstandard is not None:
+                decompressor = zstandard.ZstdDecompressor(dict_data=self._zstd_dicts.get(dict_id))
+                return decompressor.decompressobj().decompress(data)
+        except (zlib.error, lzma.LZMAError) as err:
+            raise IridiumError("Could not decompress the message! " + str(err)) from err
+        except Exception as err:
+            if zstandard is not None and isinstance(err, zstandard.ZstdError):
+                raise IridiumError("Could not decompress the message! " + str(err)) from err
+            raise
+        raise IridiumError("Unknown codec {}!".format(codec))
+    # end decompress
+
+    def encode(self, data):
+        """Return the smallest encoding of the data with the one byte header."""
+        best_header, best = CODEC_RAW, data
+        for codec in self.codecs:
+            dict_id = self.dictionary_id if codec != CODEC_LZMA else 0
+            compressed = self.compress(codec, data, dict_id)
+            if len(compressed) < len(best):
+                best_header, best = (dict_id << 4) | codec, compressed
+        return bytes([best_header]) + best
+    # end encode
+
+    def decode(self, data):
+        """Return the original message from the encoded data.
+
+        Raises:
+            IridiumError: If the message is empty or uses an unknown codec or dictionary.
+        """
+        if len(data) == 0:
+            raise IridiumError("The message does not have a codec header!")
+        header = data[0]
+        if header & 0x0F == CODEC_RAW:
+            return bytes(data[1:])
+        return self.decompress(header & 0x0F, bytes(data[1:]), header >> 4)
+    # end decode
+# end class MessageCodec
+
+
+def train_dictionary(samples, size=1024, min_length=4, max_length=32):
+    """Build a preset dictionary from captured messages.
+
+    Substrings that appear in many messages are added until the dictionary is full. The most useful substrings are
+    placed at the end of the dictionary, so they are the closest matches for the compressor.
+
+    Args:
+        samples (list): Captured message bytes.
+        size (int)[1024]: Maximum dictionary size in bytes. Deflate only uses the last 32 KiB.
+        min_length (int)[4]: Shortest substring to consider.
+        max_length (int)[32]: Longest substring to consider.
+
+    Returns:
+        dictionary (bytes): Preset dictionary.
+    """
+    # Count how many messages contain each substring
+    counts = collections.Counter()
+    lengths = [n for n in (4, 6, 8, 12, 16, 24, 32) if min_length <= n <= max_length] or [min_length]
+    for sample in samples:
+        sample = bytes(sample)
+        seen = set()
+        for n in lengths:
+            seen.update(sample[i: i+n] for i in range(len(sample) - n + 1))
+        counts.update(seen)
+
+    # Estimate the bytes saved by each substring and greedily keep the best substrings that are not already covered
+    scored = sorted(((count - 1) * len(sub), sub) for sub, count in counts.items() if count > 1)
+    chosen = []
+    total = 0
+    for score, sub in reversed(scored):
+        if total + len(sub) > size:
+            continue
+        if any(sub in other for other in chosen):
+            continue
+        chosen.append(sub)
+        total += len(sub)
+        if total >= size - min_length:
+            break
+
+    return b''.join(reversed(chosen))
+# end train_dictionary
@@ -0,0 +1,322 @@
+"""
+    pyiridium_farm
+    SeaLandAire Technologies
+    @author: jengel
+
+Emulate many iridium modems in one asyncio process for load testing. Each modem is an `EmulatedModem`, the same modem
+state machine that the `IridiumServer` runs. It has its own serial number, MOMSN and MTMSN counters and MT queue. The
+`EmulatorFarm` serves every modem from one event loop on a pseudo terminal or an in-memory port, so hundreds of modems
+run on one core without a thread for each modem.
+
+Example:
+
+    .. code-block:: python
+
+        from pyiridium9602 import EmulatorFarm
+
+        farm = EmulatorFarm(transport='pty')
+        modems = farm.add_modems(200)
+        farm.start_thread()
+        print([modem.port for modem in modems])  # Connect the gateway software to these ports
+
+        farm.send_mt(modems[0], b'mt message')
+        ...
+        print(farm.stats().commands_per_sec)
+        farm.close()
+
+Command line:
+
+    python -m pyiridium9602.pyiridium_farm 200 --transport pty
+"""
+import os
+import sys
+import time
+import asyncio
+import threading
+import collections
+
+from pyiridium9602.pyiridium import IridiumError
+from pyiridium9602.pyiridium_server import EmulatedModem
+from pyiridium9602.pyiridium_loopback import memory_pair
+
+
+__all__ = ['FarmStats', 'EmulatorFarm', 'main']
+
+
+class FarmStats(collections.namedtuple('FarmStats', 'modems commands seconds')):
+    """Aggregate statistics of an `EmulatorFarm`.
+
+    Attributes:
+        modems (int): Number of modems.
+        commands (int): Number of commands that all of the modems answered.
+        seconds (float): Time since the farm started.
+    """
+    __slots__ = ()
+
+    @property
+    def commands_per_sec(self):
+        return self.commands / self.seconds if self.seconds > 0 else 0.0
+# end class FarmStats
+
+
+class _Channel(object):
+    """Connect a modem to a pseudo terminal master or an in-memory port on the event loop."""
+
+    def __init__(self, modem, transport):
+        self.modem = modem
+        self.fd = None
+        self.memory_port = None
+        self._pending = bytearray()
+        self._loop = None
+        self._closed = False
+
+        if transport == 'memory':
+            self.memory_port, self.port = memory_pair('farm-' + modem.serial_number, modem.serial_number)
+        elif transport == 'pty':
+            import pty
+            import tty
+
+            self.fd, self._slave = pty.openpty()
+            tty.setraw(self.fd)
+            tty.setraw(self._slave)
+            os.set_blocking(self.fd, False)
+            self.port = os.ttyname(self._slave)
+        else:
+            raise IridiumError("Unknown farm transport {}! Use 'memory' or 'pty'.".format(repr(transport)))
+        modem.write = self.write
+
+    def fileno(self):
+        return self.fd if self.fd is not None else self.memory_port.fileno()
+
+    def attach(self, loop):
+        self._loop = loop
+        self.modem.call_later = loop.call_later
+        loop.add_reader(self.fileno(), self.read_ready)
+
+    def read_ready(self):
+        if self.fd is None:
+            data = self.memory_port.read(self.memory_port.in_waiting)
+        else:
+            try:
+                data = os.read(self.fd, 4096)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                data = b''  # No client has the pseudo terminal open
+        if data:
+            self.modem.feed(data)
+
+    def write(self, data):
+        if self._closed:
+            return  # Delayed session response after the farm closed
+        if self.fd is None:
+            self.memory_port.write(data)
+            return
+
+        if not self._pending:
+            try:
+                written = os.write(self.fd, data)
+            except (BlockingIOError, InterruptedError):
+                written = 0
+            if written == len(data):
+                return
+            data = data[written:]
+            if self._loop is not None:
+                self._loop.add_writer(self.fd, self.write_ready)
+        self._pending += data
+    # end write
+
+    def write_ready(self):
+        try:
+            written = os.write(self.fd, self._pending)
+        except (BlockingIOError, InterruptedError):
+            return
+        del self._pending[:written]
+        if not self._pending:
+            self._loop.remove_writer(self.fd)
+
+    def close(self):
+        self._closed = True
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.remove_reader(self.fileno())
+            if self.fd is not None:
+                self._loop.remove_writer(self.fd)
+        if self.fd is None:
+            self.memory_port.close()
+        else:
+            os.close(self.fd)
+            os.close(self._slave)
+# end class _Channel
+
+
+class EmulatorFarm(object):
+    """Serve many `EmulatedModem` objects from one asyncio event loop.
+
+    Each modem is on its own pseudo terminal ('pty') or in-memory port ('memory'). `EmulatedModem.port` is the port that
+    the client uses: the pseudo terminal name or a `MemoryPort`.
+
+    Args:
+        transport (str)['memory']: 'memory' or 'pty'.
+        options (dict)[None]: Modem options like {'ring_alerts': False}.
+        modem_class (type)[EmulatedModem]: Class of the modems. Override `write_iridium` to forward MO messages.
+        link_model (function)[None]: Function that takes a serial number and returns the modem's `LinkModel` like
+            `lambda sn: LinkModel.realistic(int(sn), time_scale=0.01)`.
+    """
+
+    def __init__(self, transport='memory', options=None, modem_class=EmulatedModem, link_model=None):
+        self.transport = transport
+        self.options = options
+        self.modem_class = modem_class
+        self.link_model = link_model
+        self.modems = []
+        self.loop = None
+        self.farm_thread = None
+        self._channels = {}  # {modem: _Channel}
+        self._start_time = None
+
+    def __len__(self):
+        return len(self.modems)
+
+    def add_modem(self, serial_number=None):
+        """Create a modem and its port. The modem is served right away if the farm is running.
+
+        Args:
+            serial_number (str)[None]: Serial number (IMEI). Default is numbered from 300234010000000.
+
+        Returns:
+            modem (EmulatedModem): Modem with a `port` attribute for the client.
+        """
+        if serial_number is None:
+            serial_number = str(300234010000000 + len(self.modems))
+        modem = self.modem_class(serial_number, options=self.options)
+        if self.link_model is not None:
+            modem.link = self.link_model(serial_number)
+        channel = _Channel(modem, self.transport)
+        modem.port = channel.port
+        self._channels[modem] = channel
+        self.modems.append(modem)
+        if self.loop is not None:
+            self._call(channel.attach, self.loop)
+        return modem
+    # end add_modem
+
+    def add_modems(self, count):
+        """Create count modems and return them in a list."""
+        return [self.add_modem() for _ in range(count)]
+
+    def _call(self, func, *args):
+        """Call the function on the farm's event loop."""
+        if self.farm_thread is not None and threading.current_thread() is not self.farm_thread:
+            self.loop.call_soon_threadsafe(func, *args)
+        else:
+            func(*args)
+
+    def attach(self, loop=None):
+        """Serve the modems on the event loop. Use `start_thread` instead to run the loop in a thread."""
+        self.loop = loop or asyncio.get_event_loop()
+        self._start_time = time.perf_counter()
+        for channel in self._channels.values():
+            channel.attach(self.loop)
+    # end attach
+
+    def start_thread(self):
+        """Run the farm in an event loop on a new thread."""
+        if self.farm_thread is not None:
+            return
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            self.attach(loop)
+            loop.call_soon(started.set)
+            loop.run_forever()
+            loop.close()
+
+        self.farm_thread = threading.Thread(target=run)
+        self.farm_thread.daemon = True
+        self.farm_thread.start()
+        started.wait()
+    # end start_thread
+
+    def send_mt(self, modem, message):
+        """Queue an MT message for a modem. This can be called from any thread."""
+        if self.loop is None:
+            modem.queue_mt(message)
+        else:
+            self._call(modem.queue_mt, message)
+
+    def stats(self):
+        """Return the `FarmStats` of all of the modems."""
+        seconds = 0.0 if self._start_time is None else time.perf_counter() - self._start_time
+        return FarmStats(len(self.modems), sum(modem.commands for modem in self.modems), seconds)
+
+    def reset_stats(self):
+        """Reset the command counters and the start time."""
+        for modem in self.modems:
+            modem.commands = 0
+        self._start_time = time.perf_counter()
+
+    def close(self):
+        """Stop serving and close all of the ports."""
+        if self.farm_thread is not None:
+            done = threading.Event()
+
+            def stop():
+                self._close_channels()
+                self.loop.stop()
+                done.set()
+            self.loop.call_soon_threadsafe(stop)
+            done.wait()
+            self.farm_thread.join()
+            self.farm_thread = None
+        else:
+            self._close_channels()
+        self.loop = None
+    # end close
+
+    def _close_channels(self):
+        for channel in self._channels.values():
+            channel.close()
+        self._channels.clear()
+# end class EmulatorFarm
+
+
+def main(argv=None):
+    """Serve modems on pseudo terminals and print the aggregate command rate until Ctrl+C."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Emulate many iridium modems for load testing.")
+    parser.add_argument('count', type=int, help="Number of modems")
+    parser.add_argument('-t', '--transport', default='pty', choices=('pty',), help="Port type")
+    parser.add_argument('-i', '--interval', type=float, default=5, help="Seconds between the rate reports")
+    parser.add_argument('--no-ring', action='store_true', help="Turn off ring alerts")
+    args = parser.parse_args(argv)
+
+    farm = EmulatorFarm(args.transport, {'ring_alerts': False} if args.no_ring else None)
+    for modem in farm.add_modems(args.count):
+        print(modem.serial_number, modem.port)
+    sys.stdout.flush()
+
+    async def report():
+        farm.attach()
+        while True:
+            await asyncio.sleep(args.interval)
+            stats = farm.stats()
+            print("{} modems {} commands {:.0f} commands/s".format(stats.modems, stats.commands,
+                                                                   stats.commands_per_sec))
+            sys.stdout.flush()
+            farm.reset_stats()
+
+    try:
+        asyncio.run(report())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        farm.close()
+    return 0
+# end main
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""
+    pyiridium_fragment
+    SeaLandAire Technologies
+    @author: jengel
+
+Send and receive payloads that are larger than one SBD message. Large payloads are split into segments with a 3 byte
+header (message id, segment index, segment count) and each segment is sent with its own session. Received segments are
+reassembled in a bounded table and the full payload is given to the application once.
+
+Note:
+    Both ends must use the fragment layer. Every message gets the header even if it fits in one segment.
+
+Example:
+
+    .. code-block:: python
+
+        from pyiridium9602 import IridiumCommunicator, FragmentLayer
+
+        iridium_port = IridiumCommunicator("/dev/ttyUSB0")
+        iridium_port.connect()
+
+        layer = FragmentLayer(iridium_port, message_received=lambda data: print("Received:", len(data), "bytes"))
+        layer.send(bytes(2000))  # 6 sessions
+"""
+import time
+import random
+import struct
+import threading
+import collections
+
+from pyiridium9602.pyiridium import IridiumError
+
+
+__all__ = ['MO_LIMIT', 'MT_LIMIT', 'FRAGMENT_HEADER', 'split_message', 'Reassembler', 'FragmentLayer']
+
+
+MO_LIMIT = 340  # Largest mobile originated message in bytes
+MT_LIMIT = 270  # Largest mobile terminated message in bytes
+
+FRAGMENT_HEADER = struct.Struct('>BBB')  # Message id, segment index, segment count
+
+
+def split_message(msg_id, data, limit=MO_LIMIT):
+    """Split the data into segments that fit in one SBD message.
+
+    Args:
+        msg_id (int): Message id 0 - 255 that is shared by all of the segments.
+        data (bytes): Payload to split.
+        limit (int)[MO_LIMIT]: Largest SBD message in bytes including the header.
+
+    Returns:
+        segments (list): List of segment bytes with the header.
+
+    Raises:
+        IridiumError: If the payload needs more than 255 segments.
+    """
+    size = limit - FRAGMENT_HEADER.size
+    count = max((len(data) + size - 1) // size, 1)
+    if count > 255:
+        raise IridiumError("The message is too large! It needs {} segments and the limit is 255.".format(count))
+
+    return [FRAGMENT_HEADER.pack(msg_id & 0xFF, i, count) + data[i*size: (i+1)*size] for i in range(count)]
+# end split_message
+
+
+class Reassembler(object):
+    """Bounded table that collects segments until every segment of a message has been received.
+
+    A message is dropped if it does not complete within the timeout or if the table is full and a new message arrives.
+    The oldest message is dropped first. Dropped messages are given to the `message_failed` callback. Segments that
+    are received again while the message is incomplete are ignored. The ids of the last completed messages are kept
+    for the timeout, so segments that are delivered again by SBD retries after the message completed are ignored too
+    and each message is given to the `message_received` callback once.
+
+    Args:
+        message_received (function)[None]: Called with the reassembled payload bytes.
+        message_failed (function)[None]: Called with the message id, a dict of {index: segment data} that were
+            received and the segment count when an incomplete message is dropped.
+        timeout (float)[600]: Seconds to wait for the rest of the segments after the first segment of a message.
+        max_pending (int)[16]: Maximum number of incomplete messages that are kept.
+        max_completed (int)[64]: Maximum number of completed (message id, segment count) pairs that are remembered.
+            Keep this below 256, so a message id that the sender reuses is not mistaken for a repeat.
+
+    Attributes:
+        duplicates (int): Number of segments that were ignored because their message already completed.
+    """
+
+    def __init__(self, message_received=None, message_failed=None, timeout=600, max_pending=16, max_completed=64):
+        self.message_received = message_received
+        self.message_failed = message_failed
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.max_completed = max_completed
+        self.duplicates = 0
+
+        self._lock = threading.Lock()
+        self._pending = collections.OrderedDict()  # {msg_id: (first_time, count, {index: data})}
+        self._completed = collections.OrderedDict()  # {(msg_id, count): completed time} oldest first
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, segment, now=None):
+        """Add a received segment and deliver the payload if it completed a message.
+
+        Args:
+            segment (bytes): Segment bytes with the header.
+            now (float)[None]: Current time from `time.monotonic()`.
+
+        Returns:
+            data (bytes): Reassembled payload or None if the message is not complete or it already completed.
+        """
+        if len(segment) < FRAGMENT_HEADER.size:
+            raise IridiumError("The segment is too short to have a header!")
+        msg_id, index, count = FRAGMENT_HEADER.unpack_from(segment)
+        if count == 0 or index >= count:
+            raise IridiumError("Invalid segment header! Index {} of {}".format(index, count))
+        if now is None:
+            now = time.monotonic()
+
+        failed = self._expire(now)
+        data = None
+        with self._lock:
+            if (msg_id, count) in self._completed:
+                # A repeat of a message that was already delivered
+                self.duplicates += 1
+                return None
+
+            entry = self._pending.get(msg_id)
+            if entry is not None and entry[1] != count:
+                # The message id was reused by a new message
+                failed.append((msg_id, entry))
+                del self._pending[msg_id]
+                entry = None
+
+            if entry is None:
+                if count == 1:
+                    data = bytes(segment[FRAGMENT_HEADER.size:])
+                    self._complete(msg_id, count, now)
+                else:
+                    if len(self._pending) >= self.max_pending:
+                        old_id, old_entry = self._pending.popitem(last=False)
+                        failed.append((old_id, old_entry))
+                    entry = self._pending[msg_id] = (now, count, {})
+
+            if entry is not None:
+                parts = entry[2]
+                parts.setdefault(index, bytes(segment[FRAGMENT_HEADER.size:]))
+                if len(parts) == count:
+                    del self._pending[msg_id]
+                    data = b''.join(parts[i] for i in range(count))
+                    self._complete(msg_id, count, now)
+
+        self._report_failed(failed)
+        if data is not None and self.message_received is not None:
+            self.message_received(data)
+        return data
+    # end add
+
+    def expire(self, now=None):
+        """Drop the incomplete messages that are older than the timeout."""
+        if now is None:
+            now = time.monotonic()
+        self._report_failed(self._expire(now))
+
+    def _complete(self, msg_id, count, now):
+        """Remember a completed message, forgetting the oldest one when there are too many."""
+        self._completed[(msg_id, count)] = now
+        if len(self._completed) > self.max_completed:
+            self._completed.popitem(last=False)
+
+    def _expire(self, now):
+        """Remove and return the expired entries."""
+        failed = []
+        with self._lock:
+            while self._completed and now - next(iter(self._completed.values())) >= self.timeout:
+                self._completed.popitem(last=False)
+            while self._pending:
+                msg_id, entry = next(iter(self._pending.items()))
+                if now - entry[0] < self.timeout:
+                    break
+                del self._pending[msg_id]
+                failed.append((msg_id, entry))
+        return failed
+
+    def _report_failed(self, failed):
+        """Give the dropped messages to the message failed callback."""
+        if self.message_failed is not None:
+            for msg_id, (_, count, parts) in failed:
+                self.message_failed(msg_id, parts, count)
+# end class Reassembler
+
+
+class FragmentLayer(object):
+    """Send and receive large payloads through an `IridiumCommunicator`.
+
+    The layer takes over the communicator's `Signal.message_received` callback. Received segments are reassembled and
+    the full payload is given to the `message_received` callback, which is the previous Signal callback by default.
+
+    Note:
+        The modem has one MO buffer, so each segment is written and sent with its own session using
+        `IridiumCommunicator.exchange`. Messages that are received during these sessions are reassembled too.
+
+    Args:
+        communicator (IridiumCommunicator): Connected communicator that is listening.
+        message_received (function)[None]: Called with each reassembled payload.
+        message_failed (function)[None]: Called with the message id, a dict of the received {index: segment data} and
+            the segment count when an incomplete message is dropped.
+        timeout (float)[600]: Seconds to wait for the rest of the segments of a received message.
+        max_pending (int)[16]: Maximum number of incomplete received messages.
+        limit (int)[MO_LIMIT]: Largest message that is sent in bytes including the header.
+    """
+
+    def __init__(self, communicator, message_received=None, message_failed=None, timeout=600, max_pending=16,
+                 limit=MO_LIMIT):
+        super().__init__()
+        self.communicator = communicator
+        self.limit = limit
+        self._msg_id = random.randrange(256)  # A restarted sender does not reuse the ids of the last run
+        self._id_lock = threading.Lock()
+
+        if message_received is None:
+            message_received = communicator.signal.message_received
+        self.reassembler = Reassembler(message_received, message_failed, timeout, max_pending)
+        communicator.signal.message_received = self.segment_received
+    # end Constructor
+
+    def next_id(self):
+        """Return the next message id."""
+        with self._id_lock:
+            self._msg_id = (self._msg_id + 1) & 0xFF
+            return self._msg_id
+
+    def segment_received(self, segment):
+        """Signal callback for every received SBD message."""
+        try:
+            self.reassembler.add(segment)
+        except IridiumError as err:
+            self.communicator.signal.notification("Error", "Could not reassemble the message!", str(err))
+
+    def send(self, data, retries=2, wait_time=120):
+        """Split the payload into segments and send each segment with its own session.
+
+        Args:
+            data (bytes/str): Payload to send.
+            retries (int)[2]: Number of times a segment is sent again if the session did not transfer it.
+            wait_time (float)[120]: Time in seconds to wait for each session.
+
+        Returns:
+            results (list): `ExchangeResult` of the session that transferred each segment.
+
+        Raises:
+            IridiumError: If a segment could not be transferred.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        results = []
+        for segment in split_message(self.next_id(), data, self.limit):
+            for _ in range(retries + 1):
+                result = self.communicator.exchange(segment, wait_time)
+                if result.mo_transferred:
+                    break
+            else:
+                raise IridiumError("Segment {} of {} was not transferred!".format(len(results) + 1,
+                                                                                   segment[2]))
+            results.append(result)
+        return results
+    # end send
+# end class FragmentLayer
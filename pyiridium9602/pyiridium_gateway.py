@@ -0,0 +1,600 @@
+"""
+    pyiridium_gateway
+    SeaLandAire Technologies
+    @author: jengel
+
+Local stand-in for the Iridium gateway that connects the modem emulators to a TCP endpoint with DirectIP-like framing.
+Every MO message that an `IridiumServer` or an `EmulatedModem` accepts is forwarded to the MO address. MT messages are
+accepted on the MT address and queued in the modem with the message's IMEI. With the `IridiumCommunicator` talking to
+the emulator, this runs the whole pipeline on one computer without an Iridium account.
+
+Framing follows DirectIP: a protocol revision byte, a 2 byte big endian length of the rest of the message and
+information elements (IE) of an id byte, a 2 byte big endian length and the contents.
+
+  * MO: MO header IE (CDR reference, IMEI, session status, MOMSN, MTMSN, session time) and MO payload IE.
+  * MT: MT header IE (client message id, IMEI, disposition flags) and MT payload IE.
+  * MT confirmation: client message id, IMEI, auto id reference and MT message status (queue position or error).
+
+Example:
+
+    .. code-block:: python
+
+        from pyiridium9602 import DirectIPGateway, EmulatorFarm
+
+        farm = EmulatorFarm('pty')
+        farm.add_modems(10)
+        gateway = DirectIPGateway(mo_address=('127.0.0.1', 10801), mt_address=('127.0.0.1', 10800))
+        gateway.add_farm(farm)
+        farm.start_thread()
+        gateway.start_thread()
+
+Command line:
+
+    python -m pyiridium9602.pyiridium_gateway 10 --mo 127.0.0.1:10801 --mt 127.0.0.1:10800
+"""
+import sys
+import time
+import struct
+import asyncio
+import threading
+import collections
+
+from pyiridium9602.pyiridium import IridiumError
+
+
+__all__ = ['PROTOCOL_REVISION', 'IE_MO_HEADER', 'IE_MO_PAYLOAD', 'IE_MT_HEADER', 'IE_MT_PAYLOAD',
+           'IE_MT_CONFIRMATION', 'MT_FLUSH_QUEUE', 'MT_STATUS_CODES', 'MOMessage', 'MTMessage', 'MTConfirmation',
+           'GatewayStats', 'encode_mo', 'encode_mt', 'encode_confirmation', 'decode_directip', 'read_directip',
+           'send_directip', 'DirectIPGateway', 'main']
+
+
+PROTOCOL_REVISION = 1
+
+IE_MO_HEADER = 0x01
+IE_MO_PAYLOAD = 0x02
+IE_MT_HEADER = 0x41
+IE_MT_PAYLOAD = 0x42
+IE_MT_CONFIRMATION = 0x44
+
+MT_FLUSH_QUEUE = 0x0001  # MT disposition flag that removes the queued MT messages first
+
+# Maximum number of MT messages the gateway queues for a modem
+MT_QUEUE_LIMIT = 50
+
+MT_STATUS_CODES = {-1: "Invalid IMEI",
+                   -2: "Unknown IMEI",
+                   -3: "Payload size exceeded maximum allowed",
+                   -4: "Payload expected, but none received",
+                   -5: "MT message queue full",
+                   -6: "MT resources unavailable",
+                   -7: "Violation of MT DirectIP protocol",
+                   }
+
+_MESSAGE = struct.Struct('>BH')
+_IE = struct.Struct('>BH')
+_MO_HEADER = struct.Struct('>I15sBHHI')
+_MT_HEADER = struct.Struct('>4s15sH')
+_MT_CONFIRMATION = struct.Struct('>4s15sIh')
+
+
+class MOMessage(collections.namedtuple('MOMessage', 'imei payload cdr_reference session_status momsn mtmsn '
+                                                    'session_time')):
+    """Decoded MO message.
+
+    Attributes:
+        imei (str): Modem serial number.
+        payload (bytes): Message contents.
+        cdr_reference (int): Call detail record number of the session.
+        session_status (int): 0 for a successful session.
+        momsn (int): MO message serial number.
+        mtmsn (int): MT message serial number.
+        session_time (int): Session time in seconds since 1970.
+    """
+    __slots__ = ()
+
+
+class MTMessage(collections.namedtuple('MTMessage', 'imei payload client_id flags')):
+    """Decoded MT message.
+
+    Attributes:
+        imei (str): Modem serial number.
+        payload (bytes): Message contents.
+        client_id (bytes): 4 byte id chosen by the sender and returned in the confirmation.
+        flags (int): MT disposition flags like MT_FLUSH_QUEUE.
+    """
+    __slots__ = ()
+
+
+class MTConfirmation(collections.namedtuple('MTConfirmation', 'imei client_id auto_id status')):
+    """Decoded MT confirmation.
+
+    Attributes:
+        imei (str): Modem serial number.
+        client_id (bytes): 4 byte id of the MT message.
+        auto_id (int): Id the gateway gave the MT message or 0 if it was not queued.
+        status (int): Queue position (1 - 50), 0 for a flush without payload or an error in MT_STATUS_CODES.
+    """
+    __slots__ = ()
+
+    @property
+    def success(self):
+        return self.status >= 0
+# end class MTConfirmation
+
+
+class GatewayStats(collections.namedtuple('GatewayStats', 'mo_forwarded mo_dropped mt_queued mt_rejected seconds')):
+    """Counters of a `DirectIPGateway`.
+
+    Attributes:
+        mo_forwarded (int): MO messages written to the MO address.
+        mo_dropped (int): MO messages that could not be forwarded.
+        mt_queued (int): MT messages queued in a modem.
+        mt_rejected (int): MT messages with an error confirmation.
+        seconds (float): Time since the gateway started.
+    """
+    __slots__ = ()
+
+    @property
+    def mo_per_sec(self):
+        return self.mo_forwarded / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def mt_per_sec(self):
+        return self.mt_queued / self.seconds if self.seconds > 0 else 0.0
+# end class GatewayStats
+
+
+def _frame(*elements):
+    """Return a message with the given (IE id, contents) information elements."""
+    body = b''.join(_IE.pack(ie_id, len(contents)) + contents for ie_id, contents in elements)
+    return _MESSAGE.pack(PROTOCOL_REVISION, len(body)) + body
+
+
+def _imei(imei):
+    imei = imei.encode('utf-8') if isinstance(imei, str) else bytes(imei)
+    if len(imei) != 15:
+        raise IridiumError("The IMEI must be 15 characters!")
+    return imei
+
+
+def encode_mo(imei, payload, momsn=0, mtmsn=0, session_status=0, cdr_reference=0, session_time=None):
+    """Return the framed MO message."""
+    if session_time is None:
+        session_time = int(time.time())
+    header = _MO_HEADER.pack(cdr_reference & 0xffffffff, _imei(imei), session_status, momsn, mtmsn, session_time)
+    return _frame((IE_MO_HEADER, header), (IE_MO_PAYLOAD, bytes(payload)))
+
+
+def encode_mt(imei, payload, client_id=b'\0\0\0\0', flags=0):
+    """Return the framed MT message. The payload IE is left out if the payload is None."""
+    elements = [(IE_MT_HEADER, _MT_HEADER.pack(client_id, _imei(imei), flags))]
+    if payload is not None:
+        elements.append((IE_MT_PAYLOAD, bytes(payload)))
+    return _frame(*elements)
+
+
+def encode_confirmation(imei, client_id, auto_id, status):
+    """Return the framed MT confirmation."""
+    return _frame((IE_MT_CONFIRMATION, _MT_CONFIRMATION.pack(client_id, _imei(imei), auto_id, status)))
+
+
+def decode_directip(data):
+    """Decode a framed message.
+
+    Returns:
+        message (MOMessage/MTMessage/MTConfirmation): Decoded message.
+
+    Raises:
+        IridiumError: If the protocol revision, the lengths or the information elements are invalid.
+    """
+    if len(data) < _MESSAGE.size:
+        raise IridiumError("The message is too short!")
+    revision, length = _MESSAGE.unpack_from(data)
+    if revision != PROTOCOL_REVISION or length != len(data) - _MESSAGE.size:
+        raise IridiumError("Invalid protocol revision or message length!")
+
+    elements = {}
+    idx = _MESSAGE.size
+    while idx < len(data):
+        if idx + _IE.size > len(data):
+            raise IridiumError("Incomplete information element!")
+        ie_id, ie_len = _IE.unpack_from(data, idx)
+        idx += _IE.size
+        elements[ie_id] = bytes(data[idx: idx + ie_len])
+        idx += ie_len
+    if idx != len(data):
+        raise IridiumError("Incomplete information element!")
+
+    try:
+        if IE_MO_HEADER in elements:
+            cdr, imei, status, momsn, mtmsn, session_time = _MO_HEADER.unpack(elements[IE_MO_HEADER])
+            return MOMessage(imei.decode('utf-8'), elements.get(IE_MO_PAYLOAD, b''), cdr, status, momsn, mtmsn,
+                             session_time)
+        elif IE_MT_HEADER in elements:
+            client_id, imei, flags = _MT_HEADER.unpack(elements[IE_MT_HEADER])
+            return MTMessage(imei.decode('utf-8', 'replace'), elements.get(IE_MT_PAYLOAD), client_id, flags)
+        elif IE_MT_CONFIRMATION in elements:
+            client_id, imei, auto_id, status = _MT_CONFIRMATION.unpack(elements[IE_MT_CONFIRMATION])
+            return MTConfirmation(imei.decode('utf-8'), client_id, auto_id, status)
+    except struct.error as err:
+        raise IridiumError("Invalid information element length!") from err
+    raise IridiumError("No MO header, MT header or MT confirmation information element!")
+# end decode_directip
+
+
+async def read_directip(reader):
+    """Read and decode one framed message from an asyncio stream.
+
+    Returns:
+        message (MOMessage/MTMessage/MTConfirmation): Decoded message or None at the end of the stream.
+    """
+    try:
+        header = await reader.readexactly(_MESSAGE.size)
+    except asyncio.IncompleteReadError:
+        return None
+    body = await reader.readexactly(_MESSAGE.unpack(header)[1])
+    return decode_directip(header + body)
+# end read_directip
+
+
+async def send_directip(address, imei, payload, client_id=b'\0\0\0\0', flags=0):
+    """Connect to the gateway's MT address, send one MT message and return the `MTConfirmation`."""
+    reader, writer = await asyncio.open_connection(*address)
+    try:
+        writer.write(encode_mt(imei, payload, client_id, flags))
+        await writer.drain()
+        return await read_directip(reader)
+    finally:
+        writer.close()
+# end send_directip
+
+
+def _mo_contents(data):
+    """Return the contents of `write_iridium` data (message length as text, contents, 2 bytes of checksum)."""
+    for digits in (1, 2, 3):
+        if data[:digits].isdigit() and int(data[:digits]) == len(data) - digits - 2:
+            return bytes(data[digits:-2])
+    raise IridiumError("Invalid write_iridium data!")
+
+
+class DirectIPGateway(object):
+    """Gateway stand-in that forwards MO messages to a TCP endpoint and queues MT messages from TCP clients.
+
+    MO messages are written in order on one connection that is kept open (persistent) or on a new connection for each
+    message like the real gateway. If the MO endpoint is not reachable the messages wait and the connection is retried
+    every `retry_interval` seconds.
+
+    Args:
+        mo_address (tuple)[None]: (host, port) that receives the MO messages. None only counts the MO messages.
+        mt_address (tuple)[('127.0.0.1', 10800)]: (host, port) to accept MT messages on. Port 0 picks a free port and
+            `mt_address` is updated when the gateway starts. None does not accept MT messages.
+        persistent (bool)[True]: Keep the MO connection open instead of connecting for each message.
+        retry_interval (float)[1]: Seconds between the MO connection attempts.
+    """
+
+    def __init__(self, mo_address=None, mt_address=('127.0.0.1', 10800), persistent=True, retry_interval=1.0):
+        self.mo_address = mo_address
+        self.mt_address = mt_address
+        self.persistent = persistent
+        self.retry_interval = retry_interval
+        self.loop = None
+        self.gateway_thread = None
+
+        self._modems = {}  # {imei: function(payload, flush) -> queue position or error status}
+        self._cdr_reference = 0
+        self._auto_id = 0
+        self._mo_queue = None
+        self._mo_backlog = collections.deque()  # MO messages before the loop started
+        self._mo_task = None
+        self._mo_writer = None
+        self._mt_server = None
+        self._mt_writers = set()
+        self._counts = collections.Counter()
+        self._start_time = None
+    # end Constructor
+
+    def add_modem(self, imei, queue_mt):
+        """Register the function that queues MT messages for the modem.
+
+        Args:
+            imei (str): 15 character modem serial number.
+            queue_mt (function): Function that takes the payload (bytes or None) and the flush flag and returns the
+                queue position or an error status.
+        """
+        self._modems[str(imei)] = queue_mt
+
+    def add_server(self, server, imei=None):
+        """Connect an `IridiumServer`. Its MO messages are forwarded and its MT messages are queued by IMEI.
+
+        Args:
+            server (IridiumServer): Emulator. Its `write_iridium` is replaced.
+            imei (str)[None]: Serial number. Default is the server's serial number padded to 15 digits, which is
+                also set as the server's serial number.
+        """
+        if imei is None:
+            imei = str(server._serial_number).zfill(15)
+        server._serial_number = imei
+
+        def write_iridium(data):
+            self.forward_mo(imei, _mo_contents(data), server.modem.mo_msn, server.modem.mt_msn)
+
+        def queue_mt(payload, flush):
+            if flush:
+                server._write_queue.clear()
+            if payload is None:
+                return 0
+            if len(server._write_queue) >= MT_QUEUE_LIMIT:
+                return -5
+            server.write_serial(payload)
+            return len(server._write_queue)
+
+        server.write_iridium = write_iridium
+        self.add_modem(imei, queue_mt)
+    # end add_server
+
+    def add_farm(self, farm):
+        """Connect the modems of an `EmulatorFarm`. Modems that are added to the farm later are not connected."""
+        for modem in farm.modems:
+            self._add_farm_modem(farm, modem)
+
+    def _add_farm_modem(self, farm, modem):
+        def write_iridium(data):
+            self.forward_mo(modem.serial_number, _mo_contents(data), modem.mo_msn, modem.mt_msn)
+
+        def queue_mt(payload, flush):
+            if flush:
+                farm._call(modem.mt_queue.clear)
+            if payload is None:
+                return 0
+            position = (0 if flush else len(modem.mt_queue)) + 1
+            if position > MT_QUEUE_LIMIT:
+                return -5
+            farm.send_mt(modem, payload)
+            return position
+
+        modem.write_iridium = write_iridium
+        self.add_modem(modem.serial_number, queue_mt)
+    # end _add_farm_modem
+
+    def forward_mo(self, imei, payload, momsn=0, mtmsn=0, session_status=0):
+        """Frame an MO message and queue it for the MO address. This can be called from any thread."""
+        self._cdr_reference += 1
+        data = encode_mo(imei, payload, momsn, mtmsn, session_status, self._cdr_reference)
+        if self.loop is None:
+            self._mo_backlog.append(data)
+        elif self.gateway_thread is not None and threading.current_thread() is not self.gateway_thread:
+            self.loop.call_soon_threadsafe(self._mo_queue.put_nowait, data)
+        else:
+            self._mo_queue.put_nowait(data)
+    # end forward_mo
+
+    async def start(self):
+        """Start forwarding MO messages and accepting MT messages on the running event loop."""
+        self.loop = asyncio.get_event_loop()
+        self._start_time = time.perf_counter()
+        self._mo_queue = asyncio.Queue()
+        while self._mo_backlog:
+            self._mo_queue.put_nowait(self._mo_backlog.popleft())
+        self._mo_task = self.loop.create_task(self._forward_mo())
+
+        if self.mt_address is not None:
+            self._mt_server = await asyncio.start_server(self._handle_mt, *self.mt_address)
+            self.mt_address = self._mt_server.sockets[0].getsockname()[:2]
+    # end start
+
+    def start_thread(self):
+        """Run the gateway in an event loop on a new thread."""
+        if self.gateway_thread is not None:
+            return
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+        errors = []
+
+        def run():
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self.start())
+            except Exception as err:
+                errors.append(err)
+                return
+            finally:
+                started.set()
+            loop.run_forever()
+            loop.close()
+
+        self.gateway_thread = threading.Thread(target=run)
+        self.gateway_thread.daemon = True
+        self.gateway_thread.start()
+        started.wait()
+        if errors:
+            self.gateway_thread = None
+            raise IridiumError("Could not start the gateway!") from errors[0]
+    # end start_thread
+
+    async def _connect_mo(self):
+        """Return a writer to the MO address and retry until it connects."""
+        while True:
+            try:
+                return (await asyncio.open_connection(*self.mo_address))[1]
+            except OSError:
+                await asyncio.sleep(self.retry_interval)
+
+    async def _forward_mo(self):
+        """Write the queued MO messages to the MO address in order."""
+        writer = None
+        while True:
+            data = await self._mo_queue.get()
+            messages = [data]
+            while not self._mo_queue.empty():
+                messages.append(self._mo_queue.get_nowait())  # Write everything that is waiting at once
+
+            if self.mo_address is None:
+                self._counts['mo_dropped'] += len(messages)
+                continue
+            while True:
+                if writer is None:
+                    writer = self._mo_writer = await self._connect_mo()
+                try:
+                    if self.persistent:
+                        writer.write(b''.join(messages))
+                        await writer.drain()
+                    else:
+                        for idx, data in enumerate(messages):
+                            if idx > 0:
+                                writer = self._mo_writer = await self._connect_mo()
+                            writer.write(data)
+                            await writer.drain()
+                            writer.close()
+                            writer = self._mo_writer = None
+                            messages[idx] = None
+                    break
+                except OSError:
+                    writer = None
+                    messages = [data for data in messages if data is not None]
+                    await asyncio.sleep(self.retry_interval)
+            self._counts['mo_forwarded'] += len(messages)
+    # end _forward_mo
+
+    async def _handle_mt(self, reader, writer):
+        """Queue the MT messages from a connection and reply with a confirmation for each."""
+        self._mt_writers.add(writer)
+        try:
+            while True:
+                try:
+                    message = await read_directip(reader)
+                except IridiumError:
+                    message = MTMessage('0' * 15, None, b'\0\0\0\0', 0)  # Reply with a protocol violation
+                    status = -7
+                else:
+                    if message is None:
+                        break
+                    status = self.queue_mt(message)
+
+                auto_id = 0
+                if status > 0:
+                    self._auto_id += 1
+                    auto_id = self._auto_id
+                imei = message.imei if len(message.imei.encode('utf-8')) == 15 else '0' * 15
+                writer.write(encode_confirmation(imei, message.client_id, auto_id, status))
+                await writer.drain()
+                if status == -7:
+                    break
+        except (OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._mt_writers.discard(writer)
+            writer.close()
+    # end _handle_mt
+
+    def queue_mt(self, message):
+        """Queue a decoded MT message in its modem.
+
+        Returns:
+            status (int): Queue position (1 - 50), 0 for a flush without payload or an error in MT_STATUS_CODES.
+        """
+        if not isinstance(message, MTMessage):
+            status = -7
+        elif len(message.imei) != 15 or not message.imei.isdigit():
+            status = -1
+        elif message.imei not in self._modems:
+            status = -2
+        elif message.payload is not None and len(message.payload) > 270:
+            status = -3
+        elif message.payload is None and not message.flags & MT_FLUSH_QUEUE:
+            status = -4
+        else:
+            status = self._modems[message.imei](message.payload, bool(message.flags & MT_FLUSH_QUEUE))
+
+        self._counts['mt_queued' if status > 0 else 'mt_rejected'] += status != 0
+        return status
+    # end queue_mt
+
+    def stats(self):
+        """Return the `GatewayStats` counters."""
+        seconds = 0.0 if self._start_time is None else time.perf_counter() - self._start_time
+        return GatewayStats(self._counts['mo_forwarded'], self._counts['mo_dropped'], self._counts['mt_queued'],
+                            self._counts['mt_rejected'], seconds)
+
+    def reset_stats(self):
+        """Reset the counters and the start time."""
+        self._counts.clear()
+        self._start_time = time.perf_counter()
+
+    async def stop(self):
+        """Stop forwarding and close the connections on the running event loop."""
+        if self._mo_task is not None:
+            self._mo_task.cancel()
+            self._mo_task = None
+        if self._mo_writer is not None:
+            self._mo_writer.close()
+            self._mo_writer = None
+        if self._mt_server is not None:
+            self._mt_server.close()
+            for writer in list(self._mt_writers):
+                writer.close()
+            await self._mt_server.wait_closed()
+            self._mt_server = None
+    # end stop
+
+    def close(self):
+        """Stop the gateway thread. Use `stop` instead if the gateway runs on your event loop."""
+        if self.gateway_thread is not None:
+            asyncio.run_coroutine_threadsafe(self.stop(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.gateway_thread.join()
+            self.gateway_thread = None
+        self.loop = None
+    # end close
+# end class DirectIPGateway
+
+
+def _address(text):
+    host, _, port = text.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def main(argv=None):
+    """Serve emulated modems on pseudo terminals behind a gateway until Ctrl+C."""
+    import argparse
+    from pyiridium9602.pyiridium_farm import EmulatorFarm
+
+    parser = argparse.ArgumentParser(description="Emulate iridium modems behind a DirectIP-like TCP gateway.")
+    parser.add_argument('count', type=int, help="Number of modems")
+    parser.add_argument('--mo', type=_address, default=None, help="host:port that receives the MO messages")
+    parser.add_argument('--mt', type=_address, default=('127.0.0.1', 10800),
+                        help="host:port to accept MT messages on (default 127.0.0.1:10800)")
+    parser.add_argument('--per-message', action='store_true', help="Connect to the MO address for each message")
+    parser.add_argument('-i', '--interval', type=float, default=5, help="Seconds between the rate reports")
+    args = parser.parse_args(argv)
+
+    farm = EmulatorFarm('pty')
+    for modem in farm.add_modems(args.count):
+        print(modem.serial_number, modem.port)
+    gateway = DirectIPGateway(args.mo, args.mt, not args.per_message)
+    gateway.add_farm(farm)
+
+    async def report():
+        farm.attach()
+        await gateway.start()
+        print("Accepting MT messages on {}:{}".format(*gateway.mt_address))
+        sys.stdout.flush()
+        while True:
+            await asyncio.sleep(args.interval)
+            stats = gateway.stats()
+            print("{:.0f} MO/s forwarded, {:.0f} MT/s queued, {} MO dropped, {} MT rejected".format(
+                stats.mo_per_sec, stats.mt_per_sec, stats.mo_dropped, stats.mt_rejected))
+            sys.stdout.flush()
+            gateway.reset_stats()
+
+    try:
+        asyncio.run(report())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        farm.close()
+    return 0
+# end main
+
+
+if __name__ == "__main__":
+    sys.exit(main())
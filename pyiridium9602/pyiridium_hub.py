@@ -0,0 +1,207 @@
+"""
+    pyiridium_hub
+    SeaLandAire Technologies
+    @author: jengel
+
+Serve many iridium modems from a single thread. The `IridiumHub` registers the serial port of every communicator in one
+`selectors` loop and processes a communicator's data when its serial port is readable. The number of threads stays the
+same no matter how many modems are connected.
+
+Example:
+
+    .. code-block:: python
+
+        from pyiridium9602 import IridiumCommunicator, IridiumHub
+
+        hub = IridiumHub()
+        hub.start()
+
+        modems = [IridiumCommunicator(port) for port in ("/dev/ttyUSB0", "/dev/ttyUSB1")]
+        for modem in modems:
+            hub.register(modem)
+            modem.connect()
+
+        for modem in modems:
+            print("Signal Quality:", modem.acquire_signal_quality())
+
+        hub.close()
+"""
+import os
+import selectors
+import threading
+
+from pyiridium9602.pyiridium import IridiumError
+
+
+__all__ = ['IridiumHub']
+
+
+class IridiumHub(object):
+    """Listen for the responses of many `IridiumCommunicator` objects with one thread.
+
+    A registered communicator is marked as listening, so `connect()` does not create a listen thread for it. Queued
+    commands wake the hub thread which writes them right away. Closing a communicator removes it from the hub.
+
+    Note:
+        The serial ports must have a file descriptor (Linux/macOS).
+
+    Args:
+        timeout (float)[1]: Maximum time in seconds the hub thread waits for data before checking if it should stop.
+    """
+
+    def __init__(self, timeout=1):
+        super().__init__()
+        self.timeout = timeout
+
+        self._lock = threading.RLock()
+        self._selector = selectors.DefaultSelector()
+        self._communicators = {}  # {communicator: fd}
+        self._woken = set()  # Communicators that queued commands
+        self._woken_lock = threading.Lock()
+        self._active = threading.Event()
+        self.hub_thread = None
+
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+        self._selector.register(self._wakeup_read, selectors.EVENT_READ)
+    # end Constructor
+
+    def __len__(self):
+        return len(self._communicators)
+
+    @property
+    def communicators(self):
+        """Return a list of the registered communicators."""
+        with self._lock:
+            return list(self._communicators)
+
+    def register(self, communicator):
+        """Add a communicator to the hub. The serial port is opened if it is not open.
+
+        Args:
+            communicator (IridiumCommunicator): Communicator to read and write for.
+
+        Raises:
+            IridiumError: If the communicator is already listening or the serial port cannot be selected.
+        """
+        if communicator.is_listening():
+            raise IridiumError("There is already a thread listening!")
+
+        try:
+            if not communicator.serialport.isOpen():
+                communicator.serialport.open()
+        except Exception as err:
+            raise IridiumError("The serial port would not open!") from err
+
+        fd = communicator.serial_fileno()
+        if fd is None:
+            raise IridiumError("The serial port does not have a file descriptor to use with the hub!")
+
+        with self._lock:
+            self._selector.register(fd, selectors.EVENT_READ, communicator)
+            self._communicators[communicator] = fd
+            communicator.hub = self
+            communicator.set_listening(True)
+        self.wakeup(communicator)  # Write any commands that were queued before registering
+    # end register
+
+    def unregister(self, communicator):
+        """Remove a communicator from the hub. This is called when the communicator stops listening."""
+        with self._lock:
+            fd = self._communicators.pop(communicator, None)
+            if fd is not None:
+                try:
+                    self._selector.unregister(fd)
+                except (KeyError, ValueError):
+                    pass
+            if communicator.hub is self:
+                communicator.hub = None
+    # end unregister
+
+    def wakeup(self, communicator=None):
+        """Wake up the hub thread to process the given communicator's queued commands."""
+        if communicator is not None:
+            with self._woken_lock:
+                self._woken.add(communicator)
+        try:
+            os.write(self._wakeup_write, b'\0')
+        except OSError:
+            pass  # The pipe is full or closed, so the thread is already being woken up
+    # end wakeup
+
+    def is_running(self):
+        """Return if the hub thread is running."""
+        return self._active.is_set()
+
+    def start(self):
+        """Start the hub thread."""
+        if self.hub_thread is None:
+            self._active.set()
+            self.hub_thread = threading.Thread(target=self.run)
+            self.hub_thread.daemon = True  # Close at program exit. Otherwise the program will remain open.
+            self.hub_thread.start()
+    # end start
+
+    def stop(self):
+        """Stop the hub thread. The communicators stay registered."""
+        self._active.clear()
+        self.wakeup()
+        if self.hub_thread is not None and self.hub_thread is not threading.current_thread():
+            self.hub_thread.join()
+        self.hub_thread = None
+    # end stop
+
+    def close(self):
+        """Close all of the registered communicators and stop the hub thread."""
+        for communicator in self.communicators:
+            communicator.close()
+        self.stop()
+        self._selector.close()
+        os.close(self._wakeup_read)
+        os.close(self._wakeup_write)
+    # end close
+
+    def run(self):
+        """Wait for serial ports to be readable and process the data. (This method should be called in a separate
+        thread).
+        """
+        self._active.set()
+        while self.is_running():
+            try:
+                events = self._selector.select(self.timeout)
+            except (OSError, ValueError):
+                events = []  # A serial port was closed while waiting
+
+            with self._lock:
+                for key, _ in events:
+                    if key.fd == self._wakeup_read:
+                        try:
+                            os.read(self._wakeup_read, 512)
+                        except OSError:
+                            pass
+                        continue
+
+                    communicator = key.data
+                    if communicator in self._communicators:
+                        self.process(communicator, communicator.read_serial())
+
+                with self._woken_lock:
+                    woken, self._woken = self._woken, set()
+                for communicator in woken:
+                    if communicator in self._communicators:
+                        self.process(communicator)
+    # end run
+
+    def process(self, communicator, data=b''):
+        """Process the data and queued commands for a single communicator."""
+        if not communicator.is_port_connected():
+            communicator.close()
+            return
+
+        try:
+            communicator.process_io(data)
+        except Exception as err:
+            communicator.signal.notification("Error", "The hub could not process the data!", str(err))
+    # end process
+# end class IridiumHub
@@ -0,0 +1,347 @@
+"""
+    pyiridium_index
+    SeaLandAire Technologies
+    @author: jengel
+
+Sidecar offset index for serial capture files. The capture is walked once with `iter_capture`. The offsets of every
+command, the +SBDIX session results and the offsets of the read binary messages are saved next to the capture in a
+'.idx' file. The index is used to replay the Nth session, a range of MO message serial numbers or one command type
+without replaying the capture from the start. The capture can also be split at command boundaries to process the parts
+in parallel.
+
+Example:
+
+    .. code-block:: python
+
+        from pyiridium9602 import CaptureIndex, Command, IridiumCommunicator, ReplayEngine
+
+        index = CaptureIndex.open("field_unit.log")  # Builds and saves "field_unit.log.idx" if it is missing or stale
+        print(len(index), "commands,", len(index.sessions()), "sessions")
+
+        # Replay the sessions that sent MOMSN 120 to 130
+        engine = ReplayEngine(IridiumCommunicator())
+        start, end = index.span(index.find_momsn(120, 130))
+        engine.replay_file("field_unit.log", start, end)
+
+        # Read the messages without replaying
+        for entry in index.find_command(Command.READ_BINARY):
+            print(index.payload(entry))
+
+        # Split into 4 parts that start at a command
+        parts = index.split(4)  # [(start, end), ...]
+"""
+import os
+import mmap
+import struct
+import collections
+
+from pyiridium9602.pyiridium import Command, IridiumError
+from pyiridium9602.pyiridium_lexer import SessionResult, LEXER
+from pyiridium9602.pyiridium_replay import SEGMENT_COMMAND, SEGMENT_DATA, iter_capture, read_binary_content
+
+
+__all__ = ['INDEX_EXTENSION', 'IndexEntry', 'CaptureIndex']
+
+
+INDEX_EXTENSION = '.idx'
+
+# Magic, version, capture size, capture modification time (ns), number of commands, number of entries
+_HEADER = struct.Struct('<8sHQqII')
+_MAGIC = b'PYIRIDX\x00'
+_VERSION = 2
+
+# Start, length, command id, 6 session values (mo_status is -1 without a session), payload offset from the start and
+# payload length. Captures with many write binary lengths or SBDWT texts have many distinct commands, so the command id
+# is 4 bytes.
+_ENTRY = struct.Struct('<QIIhHhHHHIH')
+
+# (min, max) of the session values that fit in the entry
+_SESSION_RANGES = ((0, 0x7FFF), (0, 0xFFFF), (0, 0x7FFF), (0, 0xFFFF), (0, 0xFFFF), (0, 0xFFFF))
+
+
+class IndexEntry(collections.namedtuple('IndexEntry', 'start end command session payload_start payload_end')):
+    """Command in a capture.
+
+    Attributes:
+        start (int): Offset of the written command.
+        end (int): Offset after the OK of the response.
+        command (bytes): Command like b'AT+SBDIX'.
+        session (SessionResult): +SBDIX result or None if the command is not a session or it failed.
+        payload_start (int): Offset of the read binary message or -1.
+        payload_end (int): Offset after the read binary message or -1.
+    """
+    __slots__ = ()
+# end class IndexEntry
+
+
+def _session_entry(data, start, end, command):
+    """Return the IndexEntry values for a command response."""
+    session = None
+    payload_start = payload_end = -1
+    if command == Command.SESSION or command == Command.SESSION_RING_ALERT:
+        try:
+            session = LEXER.lex(data[start: end], Command.SESSION_RECEIVE)
+        except ValueError:
+            pass
+        if session is not None and not _session_fits(session):
+            session = None  # Corrupt values that are not a real session result
+    elif command == Command.READ_BINARY:
+        content = read_binary_content(data, start, end)
+        if content is not None:
+            payload_start, payload_end = content
+    return session, payload_start, payload_end
+# end _session_entry
+
+
+def _session_fits(session):
+    """Return if all of the session values fit in an index entry."""
+    return all(low <= value <= high for value, (low, high) in zip(session, _SESSION_RANGES))
+
+
+class CaptureIndex(object):
+    """Offsets of the commands in a serial capture.
+
+    Args:
+        entries (list)[None]: IndexEntry for each command in capture order.
+        filename (str)[None]: Capture file name used to read payloads.
+    """
+
+    def __init__(self, entries=None, filename=None):
+        self.entries = entries or []
+        self.filename = filename
+        self._sessions = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __getitem__(self, item):
+        return self.entries[item]
+
+    @classmethod
+    def build(cls, data, filename=None):
+        """Walk the capture bytes once and return the index.
+
+        Args:
+            data (bytes/mmap): Capture bytes.
+            filename (str)[None]: Capture file name used to read payloads.
+        """
+        entries = []
+        command = None
+        start = end = response_start = 0
+        for kind, seg_command, seg_start, seg_end in iter_capture(data):
+            if kind == SEGMENT_COMMAND or kind == SEGMENT_DATA:
+                if command is not None:
+                    entries.append(IndexEntry(start, end, command, *_session_entry(data, response_start, end, command)))
+                    command = None
+                if kind == SEGMENT_COMMAND:
+                    command, start, response_start = seg_command, seg_start, seg_end
+            end = seg_end
+        if command is not None:
+            entries.append(IndexEntry(start, end, command, *_session_entry(data, response_start, end, command)))
+        return cls(entries, filename)
+    # end build
+
+    @classmethod
+    def open(cls, filename, index_filename=None, rebuild=False):
+        """Load the sidecar index of the capture file. The index is built and saved if it is missing or the capture
+        changed since it was built.
+
+        Args:
+            filename (str): Capture file name.
+            index_filename (str)[None]: Sidecar file name. Default is the capture file name with '.idx' added.
+            rebuild (bool)[False]: If True always build the index.
+        """
+        if index_filename is None:
+            index_filename = filename + INDEX_EXTENSION
+
+        if not rebuild:
+            try:
+                return cls.load(index_filename, filename)
+            except (OSError, IridiumError):
+                pass
+
+        with open(filename, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                index = cls([], filename)
+            else:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    index = cls.build(data, filename)
+        index.save(index_filename)
+        return index
+    # end open
+
+    @classmethod
+    def load(cls, index_filename, filename):
+        """Load a sidecar index.
+
+        Raises:
+            IridiumError: If the index file is not valid or the capture changed since the index was built.
+        """
+        with open(index_filename, 'rb') as file:
+            raw = file.read()
+
+        try:
+            magic, version, size, mtime, num_commands, num_entries = _HEADER.unpack_from(raw)
+        except struct.error as err:
+            raise IridiumError("The capture index is not valid!") from err
+        if magic != _MAGIC or version != _VERSION:
+            raise IridiumError("The capture index is not valid!")
+        stat = os.stat(filename)
+        if size != stat.st_size or mtime != stat.st_mtime_ns:
+            raise IridiumError("The capture changed since the index was built!")
+
+        # Command table
+        pos = _HEADER.size
+        commands = []
+        for _ in range(num_commands):
+            length = int.from_bytes(raw[pos: pos + 2], 'little')
+            commands.append(raw[pos + 2: pos + 2 + length])
+            pos += 2 + length
+        if pos > len(raw) or len(raw) - pos != num_entries * _ENTRY.size:
+            raise IridiumError("The capture index is not valid!")
+
+        entries = []
+        try:
+            for start, length, cmd_id, *session, payload_offset, payload_length in _ENTRY.iter_unpack(raw[pos:]):
+                payload_start = payload_end = -1
+                if payload_offset:
+                    payload_start = start + payload_offset
+                    payload_end = payload_start + payload_length
+                entries.append(IndexEntry(start, start + length, commands[cmd_id],
+                                          None if session[0] < 0 else SessionResult._make(session),
+                                          payload_start, payload_end))
+        except IndexError as err:
+            raise IridiumError("The capture index is not valid!") from err
+        return cls(entries, filename)
+    # end load
+
+    def save(self, index_filename=None):
+        """Save the sidecar index for the capture file.
+
+        The index is written to a temporary file that replaces the sidecar file, so a failed save never leaves a
+        truncated index.
+
+        Raises:
+            IridiumError: If an entry has a value that does not fit in the index (a command longer than 65535 bytes,
+                a session value out of range or an offset that is too large). Nothing is written.
+        """
+        if index_filename is None:
+            index_filename = self.filename + INDEX_EXTENSION
+        stat = os.stat(self.filename)
+
+        commands = {}
+        records = []
+        no_session = (-1, 0, 0, 0, 0, 0)
+        for i, entry in enumerate(self.entries):
+            cmd_id = commands.setdefault(entry.command, len(commands))
+            payload_offset = payload_length = 0
+            if entry.payload_start >= 0:
+                payload_offset = entry.payload_start - entry.start
+                payload_length = entry.payload_end - entry.payload_start
+            if len(entry.command) > 0xFFFF or (entry.session is not None and not _session_fits(entry.session)):
+                raise IridiumError("Entry {} does not fit in the capture index! {!r}".format(i, entry))
+            try:
+                records.append(_ENTRY.pack(entry.start, entry.end - entry.start, cmd_id,
+                                           *(entry.session or no_session), payload_offset, payload_length))
+            except struct.error as err:
+                raise IridiumError("Entry {} does not fit in the capture index! {!r}".format(i, entry)) from err
+
+        table = b''.join(len(command).to_bytes(2, 'little') + command for command in commands)
+        tmp_filename = index_filename + '.tmp'
+        try:
+            with open(tmp_filename, 'wb') as file:
+                file.write(_HEADER.pack(_MAGIC, _VERSION, stat.st_size, stat.st_mtime_ns, len(commands), len(records)))
+                file.write(table)
+                file.write(b''.join(records))
+            os.replace(tmp_filename, index_filename)
+        except BaseException:
+            try:
+                os.remove(tmp_filename)
+            except OSError:
+                pass
+            raise
+    # end save
+
+    def sessions(self):
+        """Return the entries of the sessions that have a result in capture order."""
+        if self._sessions is None:
+            self._sessions = [entry for entry in self.entries if entry.session is not None]
+        return self._sessions
+
+    def session(self, n):
+        """Return the entry of the Nth session (0 based)."""
+        return self.sessions()[n]
+
+    def find_momsn(self, first, last=None):
+        """Return the session entries with a MO message serial number from first to last (inclusive)."""
+        if last is None:
+            last = first
+        return [entry for entry in self.sessions() if first <= entry.session.mo_msn <= last]
+
+    def find_command(self, command):
+        """Return the entries for the command. Commands that end with '=' like `Command.WRITE_BINARY` match by prefix.
+        """
+        if isinstance(command, str):
+            command = command.encode("utf-8")
+        if command.endswith(b'='):
+            return [entry for entry in self.entries if entry.command.startswith(command)]
+        return [entry for entry in self.entries if entry.command == command]
+
+    @staticmethod
+    def span(entries):
+        """Return the (start, end) offsets from the first entry to the last entry."""
+        if not entries:
+            raise IridiumError("There are no entries to replay!")
+        return entries[0].start, entries[-1].end
+
+    def payload(self, entry, data=None):
+        """Return the read binary message of the entry.
+
+        Args:
+            entry (IndexEntry): Read binary entry.
+            data (bytes/mmap)[None]: Capture bytes. Default reads the message from the capture file.
+        """
+        if entry.payload_start < 0:
+            raise IridiumError("The entry does not have a read binary message!")
+        if data is not None:
+            return data[entry.payload_start: entry.payload_end]
+        with open(self.filename, 'rb') as file:
+            file.seek(entry.payload_start)
+            return file.read(entry.payload_end - entry.payload_start)
+
+    def split(self, parts, size=None):
+        """Split the capture into parts that start at a command boundary.
+
+        Args:
+            parts (int): Number of parts. Fewer parts are returned if there are not enough commands.
+            size (int)[None]: Capture size. Default is the size of the capture file.
+
+        Returns:
+            ranges (list): (start, end) offsets that cover the whole capture.
+        """
+        if size is None:
+            size = os.path.getsize(self.filename)
+        if parts <= 1 or len(self.entries) < 2:
+            return [(0, size)]
+
+        ranges = []
+        start = 0
+        target = size / parts
+        i = 0
+        for n in range(1, parts):
+            # First command that starts at or after the ideal boundary
+            boundary = n * target
+            while i < len(self.entries) and self.entries[i].start < boundary:
+                i += 1
+            if i >= len(self.entries):
+                break
+            if self.entries[i].start > start:
+                ranges.append((start, self.entries[i].start))
+                start = self.entries[i].start
+        ranges.append((start, size))
+        return ranges
+    # end split
+# end class CaptureIndex
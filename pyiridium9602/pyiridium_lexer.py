@@ -0,0 +1,214 @@
+"""
+    pyiridium_lexer
+    SeaLandAire Technologies
+    @author: jengel
+
+Tokenize modem response lines like b'+SBDIX: 0, 12, 1, 5, 42, 0' straight from bytes without decoding them to str.
+Responses with several values are returned as `__slots__` records that are still tuples, so they can be unpacked like
+before. Modems repeat some responses (b'+CSQ:5', b'+CRIS: 0,0') a lot, so those records are cached by their response
+line.
+
+Example:
+
+    .. code-block:: python
+
+        from pyiridium9602 import lex_response, lex_responses
+
+        session = lex_response(b'AT+SBDIX\\r+SBDIX: 0, 12, 1, 5, 42, 0\\r\\n\\r\\nOK\\r\\n', b'+SBDIX:')
+        print(session.mo_msn, session.mt_length)  # 12 42
+        mo_status, mo_msn, mt_status, mt_msn, mt_length, mt_queued = session
+
+        # Every response line in a capture in one pass
+        for tag, record, offset in lex_responses(capture):
+            print(offset, tag, record)
+"""
+import re
+import collections
+
+
+__all__ = ['SessionResult', 'RingResult', 'ResponseLexer', 'LEXER', 'lex_response', 'lex_responses']
+
+
+class SessionResult(collections.namedtuple('SessionResult',
+                                           'mo_status mo_msn mt_status mt_msn mt_length mt_queued')):
+    """+SBDIX session response.
+
+    Attributes:
+        mo_status (int): Outgoing status
+        mo_msn (int): Outgoing message serial number
+        mt_status (int): Incoming status
+        mt_msn (int): Incoming message serial number
+        mt_length (int): Incoming message length
+        mt_queued (int): Number of incoming messages queued
+    """
+    __slots__ = ()
+
+    @property
+    def mo_transferred(self):
+        """Return True if the MO message, if any, was transferred."""
+        return 0 <= self.mo_status <= 4
+# end class SessionResult
+
+
+class RingResult(collections.namedtuple('RingResult', 'tri sri')):
+    """+CRIS check ring response.
+
+    Attributes:
+        tri (int): Telephone ring indication status
+        sri (int): SBD ring indication status
+    """
+    __slots__ = ()
+# end class RingResult
+
+
+_new_record = tuple.__new__
+
+
+def lex_session(value):
+    """Return the SessionResult for the comma separated values.
+
+    Raises:
+        ValueError: If there are not 6 integer values.
+    """
+    # Unpacking raises a ValueError for the wrong number of values. tuple.__new__ skips the namedtuple __new__.
+    mo_status, mo_msn, mt_status, mt_msn, mt_length, mt_queued = value.split(b',')
+    return _new_record(SessionResult, (int(mo_status), int(mo_msn), int(mt_status), int(mt_msn), int(mt_length),
+                                       int(mt_queued)))
+
+
+def lex_ring(value):
+    """Return the RingResult for the comma separated values.
+
+    Raises:
+        ValueError: If there are not 2 integer values.
+    """
+    tri, sri = value.split(b',')
+    return _new_record(RingResult, (int(tri), int(sri)))
+
+
+def lex_system_time(value):
+    """Return the system time from the hex value."""
+    value = value.strip()
+    if len(value) < 8:
+        raise ValueError("The system time needs 8 hex digits!")
+    return int(value, 16)
+
+
+class ResponseLexer(object):
+    """Tokenize the response lines of the modem into records.
+
+    A response line is a tag like b'+CSQ:' and the values up to the end of the line. The converter for the tag turns
+    the value bytes into a record. The records of tags whose responses repeat can be cached by the response bytes.
+    These records must be immutable.
+
+    Args:
+        cache_size (int)[1024]: Maximum number of cached records for each tag. The cache is cleared when it is full.
+    """
+
+    def __init__(self, cache_size=1024):
+        self.cache_size = cache_size
+        self._converters = {}  # {tag: (converter, cache dict or None)}
+        self._pattern = None
+        self.register(b'+SBDIX:', lex_session)
+        self.register(b'+CSQ:', int, cache=True)
+        self.register(b'+CRIS:', lex_ring, cache=True)
+        self.register(b'-MSSTM:', lex_system_time)
+
+    def register(self, tag, converter, cache=False):
+        """Register a converter for a response tag.
+
+        Args:
+            tag (bytes/str): Response tag with the colon like b'+SBDIX:'.
+            converter (function): Function that takes the value bytes after the tag and returns the record. The value
+                may have whitespace around it like b' 0,1\r'.
+            cache (bool)[False]: If True the records are cached by their response. Use this for responses that
+                repeat like the signal quality.
+        """
+        if isinstance(tag, str):
+            tag = tag.encode("utf-8")
+        self._converters[tag] = (converter, {} if cache else None)
+
+        # Longer tags first, so b'+CSQF:' is not matched as b'+CSQ'
+        tags = b'|'.join(re.escape(t) for t in sorted(self._converters, key=len, reverse=True))
+        self._pattern = re.compile(b'(' + tags + b')([^\r\n]*)')
+    # end register
+
+    def _store(self, cache, key, record):
+        """Cache the record clearing the cache if it is full."""
+        if len(cache) >= self.cache_size:
+            cache.clear()
+        cache[key] = record
+
+    def lex(self, data, tag):
+        """Return the record for the first response line with the given tag.
+
+        Raises:
+            ValueError: If the tag was not found or the values could not be converted.
+        """
+        converter, cache = self._converters[tag]
+        cacheable = cache is not None and type(data) is bytes
+        if cacheable:
+            # The whole response repeats, so the line does not need to be found
+            record = cache.get(data)
+            if record is not None:
+                return record
+
+        start = data.find(tag)
+        if start < 0:
+            raise ValueError("{!r} was not found!".format(tag))
+
+        # The value ends at the end of the line. The converters ignore the b'\r' like int() does.
+        start += len(tag)
+        end = data.find(b'\n', start)
+        if end < 0:
+            end = len(data)
+
+        record = converter(data[start: end])
+        if cacheable:
+            self._store(cache, data, record)
+        return record
+    # end lex
+
+    def lex_all(self, data, start=0, end=None):
+        """Yield (tag, record, offset) for every known response line in the data in one pass.
+
+        Lines that cannot be converted are skipped.
+        """
+        if end is None:
+            end = len(data)
+        converters = self._converters
+        for match in self._pattern.finditer(data, start, end):
+            tag, value = match.groups()
+            converter, cache = converters[tag]
+            try:
+                if cache is None:
+                    record = converter(value)
+                else:
+                    line = match.group(0)
+                    record = cache.get(line)
+                    if record is None:
+                        record = converter(value)
+                        self._store(cache, line, record)
+            except ValueError:
+                continue
+            yield tag, record, match.start()
+    # end lex_all
+# end class ResponseLexer
+
+
+# Default lexer used by the parse functions
+LEXER = ResponseLexer()
+
+
+def lex_response(data, tag):
+    """Return the record for the first response line with the given tag using the default lexer.
+
+    Raises:
+        ValueError: If the tag was not found or the values could not be converted.
+    """
+    return LEXER.lex(data, tag)
+
+
+def lex_responses(data, start=0, end=None):
+    """Yield (tag, record, offset) for every known response line in the data using the default lexer."""
+    return LEXER.lex_all(data, start, end)
@@ -0,0 +1,246 @@
+"""
+    pyiridium_link
+    SeaLandAire Technologies
+    @author: jengel
+
+Satellite link and serial line model for the modem emulators. Set `IridiumServer.link` or `EmulatedModem.link` to a
+`LinkModel` to give the sessions a latency, the signal quality a trace over time, the sessions MO and MT failures and
+the serial line corrupted or dropped bytes.
+
+Each part of the model has its own random generator that is seeded from the model's seed, so a run can be repeated
+exactly and changing one part does not change the random values of the others.
+
+Example:
+
+    .. code-block:: python
+
+        from pyiridium9602 import IridiumServer, LinkModel, lognormal_latency
+
+        server = IridiumServer("/dev/pts/3")
+        server.link = LinkModel(seed=42, session_latency=lognormal_latency(8, 0.6, 2, 60),
+                                mo_failures={18: 0.05, 32: 0.01}, mt_error_rate=0.01)
+
+        server.link = LinkModel.realistic(seed=42, time_scale=0.01)  # 100x faster for benchmarks
+"""
+import math
+import time
+import random
+import collections
+
+from pyiridium9602.pyiridium import MO_STATUS
+
+
+__all__ = ['LINK_FAILURES', 'SessionOutcome', 'fixed_latency', 'uniform_latency', 'lognormal_latency',
+           'random_walk_csq', 'LinkModel']
+
+
+# MO status codes of session failures that a link usually causes
+LINK_FAILURES = (10, 13, 17, 18, 32, 35)
+
+
+class SessionOutcome(collections.namedtuple('SessionOutcome', 'latency mo_status mt_error')):
+    """Outcome of a session drawn from a `LinkModel`.
+
+    Attributes:
+        latency (float): Time in seconds before the session response.
+        mo_status (int): MO status failure code or None if the session succeeded.
+        mt_error (bool): If True the MT status is 2 (mailbox check or receive error).
+    """
+    __slots__ = ()
+
+    @property
+    def success(self):
+        return self.mo_status is None
+# end class SessionOutcome
+
+
+def fixed_latency(seconds):
+    """Return a session latency function that always returns the given seconds."""
+    return lambda rng: seconds
+
+
+def uniform_latency(low, high):
+    """Return a session latency function with a uniform distribution."""
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal_latency(median, sigma=0.5, minimum=0, maximum=None):
+    """Return a session latency function with a log-normal distribution.
+
+    Real sessions take seconds to tens of seconds and have a long tail, which a log-normal distribution models well.
+
+    Args:
+        median (float): Median latency in seconds.
+        sigma (float)[0.5]: Standard deviation of the log of the latency.
+        minimum (float)[0]: Minimum latency in seconds.
+        maximum (float)[None]: Maximum latency in seconds.
+    """
+    mu = math.log(median)
+
+    def latency(rng):
+        value = max(minimum, rng.lognormvariate(mu, sigma))
+        return value if maximum is None else min(maximum, value)
+    return latency
+# end lognormal_latency
+
+
+def random_walk_csq(seed=0, steps=360, start=5, change=0.3):
+    """Return a signal quality trace (0 - 5) that moves up or down by one at random.
+
+    Args:
+        seed (int)[0]: Random seed.
+        steps (int)[360]: Number of values in the trace.
+        start (int)[5]: First value.
+        change (float)[0.3]: Probability that the value changes at each step.
+    """
+    rng = random.Random('{}:csq_trace'.format(seed))
+    trace = [start]
+    for _ in range(steps - 1):
+        value = trace[-1]
+        if rng.random() < change:
+            value = min(5, max(0, value + rng.choice((-1, 1))))
+        trace.append(value)
+    return trace
+# end random_walk_csq
+
+
+class LinkModel(object):
+    """Seeded model of the satellite link and the serial line.
+
+    Times are in link seconds. `time_scale` converts them to real seconds, so a benchmark can run the same link 100
+    times faster with `time_scale=0.01`.
+
+    Args:
+        seed (int)[0]: Random seed for every part of the model.
+        session_latency (float/function)[0]: Session latency in seconds or a function that takes a `random.Random`
+            and returns the latency like `lognormal_latency`.
+        csq (int/list/function)[5]: Signal quality. A list is a trace with one value every `csq_interval` seconds that
+            repeats. A function takes the link time in seconds and returns the signal quality.
+        csq_interval (float)[10]: Seconds between the values of a signal quality trace.
+        mo_failures (dict)[None]: Probability of each MO status failure code for a session like {18: 0.05}.
+        mt_error_rate (float)[0]: Probability of MT status 2 in a session that did not fail.
+        corrupt_rate (float)[0]: Probability that a byte on the serial line is corrupted.
+        drop_rate (float)[0]: Probability that a byte on the serial line is dropped.
+        time_scale (float)[1]: Real seconds for each link second.
+
+    Note:
+        A session with a signal quality of 0 fails with MO status 32 (no network service).
+    """
+
+    def __init__(self, seed=0, session_latency=0, csq=5, csq_interval=10.0, mo_failures=None, mt_error_rate=0.0,
+                 corrupt_rate=0.0, drop_rate=0.0, time_scale=1.0):
+        for code in (mo_failures or {}):
+            if code not in MO_STATUS or code < 5:
+                raise ValueError("{} is not an MO status failure code!".format(code))
+        if sum((mo_failures or {}).values()) > 1:
+            raise ValueError("The MO failure probabilities must not add up to more than 1!")
+
+        self.seed = seed
+        self.session_latency = session_latency
+        self.csq = csq
+        self.csq_interval = csq_interval
+        self.mo_failures = sorted((mo_failures or {}).items())
+        self.mt_error_rate = mt_error_rate
+        self.corrupt_rate = corrupt_rate
+        self.drop_rate = drop_rate
+        self.time_scale = time_scale
+        self.counts = collections.Counter()
+        self.reset()
+    # end Constructor
+
+    @classmethod
+    def realistic(cls, seed=0, time_scale=1.0, corrupt_rate=0.0, drop_rate=0.0):
+        """Return a model with session latencies of seconds to tens of seconds, a changing signal quality and a few
+        percent of failed sessions.
+        """
+        return cls(seed, lognormal_latency(8, 0.6, 2, 60), random_walk_csq(seed), 10.0,
+                   {10: 0.01, 13: 0.01, 17: 0.01, 18: 0.03, 32: 0.01, 35: 0.005}, 0.01, corrupt_rate, drop_rate,
+                   time_scale)
+
+    def reset(self):
+        """Restart the link time and the random generators, so the same values are drawn again."""
+        self._start = time.monotonic()
+        self._session_rng = random.Random('{}:session'.format(self.seed))
+        self._serial_rngs = {'transmit': random.Random('{}:transmit'.format(self.seed)),
+                             'receive': random.Random('{}:receive'.format(self.seed))}
+        self.counts.clear()
+
+    def link_time(self):
+        """Return the link seconds since the model was created or reset."""
+        return (time.monotonic() - self._start) / self.time_scale
+
+    def signal_quality(self, link_time=None):
+        """Return the signal quality at the link time (default now)."""
+        if link_time is None:
+            link_time = self.link_time()
+        if callable(self.csq):
+            return self.csq(link_time)
+        elif isinstance(self.csq, (list, tuple)):
+            return self.csq[int(link_time / self.csq_interval) % len(self.csq)]
+        return self.csq
+    # end signal_quality
+
+    def session(self, link_time=None):
+        """Draw the outcome of a session.
+
+        Returns:
+            outcome (SessionOutcome): Latency in real seconds, MO status failure code or None and the MT error flag.
+        """
+        rng = self._session_rng
+        latency = self.session_latency(rng) if callable(self.session_latency) else self.session_latency
+        draw = rng.random()
+        mt_draw = rng.random()  # Always drawn, so the sequence does not depend on the outcome
+
+        mo_status = None
+        if self.signal_quality(link_time) <= 0:
+            mo_status = 32  # No network service
+        else:
+            total = 0
+            for code, probability in self.mo_failures:
+                total += probability
+                if draw < total:
+                    mo_status = code
+                    break
+        mt_error = mo_status is not None or mt_draw < self.mt_error_rate
+
+        self.counts['sessions'] += 1
+        self.counts['failures'] += mo_status is not None
+        self.counts['mt_errors'] += mt_error
+        return SessionOutcome(latency * self.time_scale, mo_status, mt_error)
+    # end session
+
+    def _line(self, data, direction):
+        """Return the data with corrupted and dropped bytes."""
+        if not data or (self.corrupt_rate <= 0 and self.drop_rate <= 0):
+            return data
+        rng = self._serial_rngs[direction]
+        rate = self.corrupt_rate + self.drop_rate
+        out = bytearray(data)
+        drops = []
+
+        # Jump between the affected bytes with a geometric distribution instead of a draw for every byte
+        log_keep = math.log(1 - rate) if rate < 1 else None
+        idx = -1
+        while True:
+            idx += 1 if log_keep is None else 1 + int(math.log(1 - rng.random()) / log_keep)
+            if idx >= len(out):
+                break
+            if rng.random() * rate < self.drop_rate:
+                drops.append(idx)
+            else:
+                out[idx] ^= 1 << rng.randrange(8)
+                self.counts['corrupted'] += 1
+        for idx in reversed(drops):
+            del out[idx]
+        self.counts['dropped'] += len(drops)
+        return bytes(out)
+    # end _line
+
+    def transmit(self, data):
+        """Return the bytes the modem writes as the client receives them."""
+        return self._line(data, 'transmit')
+
+    def receive(self, data):
+        """Return the bytes the client writes as the modem receives them."""
+        return self._line(data, 'receive')
+# end class LinkModel
@@ -0,0 +1,329 @@
+"""
+    pyiridium_loopback
+    SeaLandAire Technologies
+    @author: jengel
+
+Loopback transports that connect an `IridiumCommunicator` to an `IridiumServer` without serial ports or a null modem
+cable.
+
+  * `MemoryPort`: In-memory serial port. `memory_pair` returns two ports that are connected like a null modem cable.
+  * `PtyLoopback`: Two bridged pseudo terminals with real `serial.Serial` ports on each end (Linux/macOS only).
+  * `back_to_back`: Connect a server and a communicator over either transport in one call.
+
+Example:
+
+    .. code-block:: python
+
+        from pyiridium9602 import back_to_back
+
+        with back_to_back() as loop:
+            loop.server.write_serial(b'hello')  # Ring the communicator
+            print(loop.communicator.acquire_signal_quality())
+"""
+import os
+import time
+import select
+import threading
+
+import serial
+
+from pyiridium9602.pyiridium import IridiumError, IridiumCommunicator
+from pyiridium9602.pyiridium_server import IridiumServer
+
+
+__all__ = ['MemoryPort', 'memory_pair', 'open_pty', 'bridge', 'PtyLoopback', 'Loopback', 'back_to_back']
+
+
+class MemoryPort(object):
+    """In-memory serial port with the subset of the `serial.Serial` interface that the communicator uses.
+
+    The bytes that are written are added to the read buffer of the connected peer. `fileno` returns the read end of a
+    pipe that is readable while bytes are waiting, so the port works with the select listen loop, the `IridiumHub` and
+    asyncio.
+
+    Args:
+        port (str)['loop']: Port name.
+        peer (MemoryPort)[None]: Port that receives the written bytes. Use `memory_pair` to connect two ports.
+        timeout (float)[None]: Read timeout in seconds. None waits forever and 0 does not wait.
+    """
+    def __init__(self, port='loop', peer=None, timeout=None):
+        self.port = port
+        self.peer = peer
+        self.timeout = timeout
+        self.write_timeout = None
+        self.baudrate = 19200
+        self.is_open = True
+
+        self._buffer = bytearray()
+        self._cond = threading.Condition()
+        self._ready_read = None
+        self._ready_write = None
+
+    @property
+    def name(self):
+        return self.port
+
+    def isOpen(self):
+        return self.is_open
+
+    def open(self):
+        self.is_open = True
+
+    def close(self):
+        with self._cond:
+            self.is_open = False
+            self._cond.notify_all()
+            if self._ready_read is not None:
+                os.close(self._ready_read)
+                os.close(self._ready_write)
+                self._ready_read = self._ready_write = None
+    # end close
+
+    def fileno(self):
+        """Return a file descriptor that is readable while bytes are waiting."""
+        with self._cond:
+            if not self.is_open:
+                raise serial.SerialException("Attempting to use a port that is not open")
+            if self._ready_read is None:
+                self._ready_read, self._ready_write = os.pipe()
+                if self._buffer:
+                    os.write(self._ready_write, b'\0')
+            return self._ready_read
+    # end fileno
+
+    @property
+    def in_waiting(self):
+        return len(self._buffer)
+
+    def _receive(self, data):
+        """Add bytes from the peer to the read buffer."""
+        with self._cond:
+            if not self.is_open:
+                return  # Like a cable to a closed port
+            was_empty = not self._buffer
+            self._buffer += data  # Before the pipe is readable, so in_waiting is never 0 after a select
+            if was_empty and self._ready_write is not None:
+                os.write(self._ready_write, b'\0')
+            self._cond.notify_all()
+    # end _receive
+
+    def _take(self, size):
+        """Remove and return bytes from the read buffer. The lock must be held."""
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        if data and not self._buffer and self._ready_read is not None:
+            os.read(self._ready_read, 1)
+        return data
+
+    def _wait(self, ready):
+        """Wait until ready() is True or the timeout. The lock must be held."""
+        if not self.is_open:
+            raise serial.SerialException("Attempting to use a port that is not open")
+        end = None if self.timeout is None else time.monotonic() + self.timeout
+        while not ready():
+            remaining = None if end is None else end - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            self._cond.wait(remaining)
+            if not self.is_open:
+                raise serial.SerialException("The port was closed while reading")
+    # end _wait
+
+    def read(self, size=1):
+        """Read size bytes. Fewer bytes are returned if the timeout passes."""
+        with self._cond:
+            self._wait(lambda: len(self._buffer) >= size)
+            return self._take(size)
+
+    def readline(self):
+        """Read until b'\\n'. Fewer bytes are returned if the timeout passes."""
+        with self._cond:
+            self._wait(lambda: b'\n' in self._buffer)
+            idx = self._buffer.find(b'\n')
+            return self._take(idx + 1 if idx >= 0 else len(self._buffer))
+
+    def write(self, data):
+        """Send the bytes to the peer and return the number of bytes written."""
+        if not self.is_open:
+            raise serial.SerialException("Attempting to use a port that is not open")
+        data = bytes(data)
+        if self.peer is not None:
+            self.peer._receive(data)
+        return len(data)
+    # end write
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        with self._cond:
+            if self._buffer:
+                self._take(len(self._buffer))
+
+    def reset_output_buffer(self):
+        pass
+# end class MemoryPort
+
+
+def memory_pair(name1='loop0', name2='loop1'):
+    """Return two in-memory serial ports that are connected to each other."""
+    port1 = MemoryPort(name1)
+    port2 = MemoryPort(name2, port1)
+    port1.peer = port2
+    return port1, port2
+
+
+def open_pty():
+    """Return the master file descriptor, the slave file descriptor and the slave port name for a raw pseudo terminal.
+    """
+    import pty
+    import tty
+
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    return master, slave, os.ttyname(slave)
+# end open_pty
+
+
+def bridge(master1, master2, stop_fd=None):
+    """Forward all data between two pseudo terminal masters like a null modem cable.
+
+    This runs until a master is closed or stop_fd is readable.
+    """
+    fds = [master1, master2] if stop_fd is None else [master1, master2, stop_fd]
+    while True:
+        try:
+            readable, _, _ = select.select(fds, [], [])
+        except (OSError, ValueError):
+            return
+        for fd in readable:
+            if fd == stop_fd:
+                return
+            try:
+                data = os.read(fd, 4096)
+                os.write(master2 if fd == master1 else master1, data)
+            except OSError:
+                return
+# end bridge
+
+
+class PtyLoopback(object):
+    """Two pseudo terminals bridged by a thread with an open `serial.Serial` on each end (Linux/macOS only).
+
+    Attributes:
+        port1 (serial.Serial): First end.
+        port2 (serial.Serial): Second end.
+    """
+    def __init__(self):
+        self.master1, self.slave1, self.name1 = open_pty()
+        self.master2, self.slave2, self.name2 = open_pty()
+        self._stop_read, self._stop_write = os.pipe()
+        self.thread = threading.Thread(target=bridge, args=(self.master1, self.master2, self._stop_read))
+        self.thread.daemon = True
+        self.thread.start()
+
+        self.port1 = serial.Serial(self.name1)
+        self.port2 = serial.Serial(self.name2)
+
+    def close(self):
+        """Close the ports, stop the bridge thread and close the pseudo terminals."""
+        if self.thread is None:
+            return
+        for port in (self.port1, self.port2):
+            try:
+                port.close()
+            except Exception:
+                pass
+        os.write(self._stop_write, b'\0')
+        self.thread.join()
+        self.thread = None
+        for fd in (self.master1, self.slave1, self.master2, self.slave2, self._stop_read, self._stop_write):
+            os.close(fd)
+    # end close
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+# end class PtyLoopback
+
+
+class Loopback(object):
+    """A server and a communicator that are connected back-to-back. Use `back_to_back` to create one.
+
+    Attributes:
+        server (IridiumServer): Emulated modem.
+        communicator (IridiumCommunicator): Communicator that talks to the server.
+        transport (str): 'memory' or 'pty'.
+    """
+    def __init__(self, server, communicator, transport, pty_loopback=None):
+        self.server = server
+        self.communicator = communicator
+        self.transport = transport
+        self.pty_loopback = pty_loopback
+
+    def close(self):
+        """Close the communicator, the server and the transport."""
+        self.communicator.close()
+        self.server.close()
+        if self.pty_loopback is not None:
+            self.pty_loopback.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+# end class Loopback
+
+
+def back_to_back(transport='memory', server=None, communicator=None, options=None, connect=True, quiet=True):
+    """Connect an `IridiumServer` and an `IridiumCommunicator` over a loopback transport.
+
+    Args:
+        transport (str)['memory']: 'memory' for `memory_pair` or 'pty' for a `PtyLoopback`.
+        server (IridiumServer)[None]: Server to use. A new `IridiumServer` is created by default.
+        communicator (IridiumCommunicator)[None]: Communicator to use. A new `IridiumCommunicator` is created by
+            default.
+        options (dict)[None]: Options for the new server and communicator like {'ring_alerts': False}.
+        connect (bool)[True]: Connect the server and the communicator. The server is connected first.
+        quiet (bool)[True]: Ignore the notification signal of the new server and communicator.
+
+    Returns:
+        loopback (Loopback): Server and communicator. Close it or use it as a context manager.
+
+    Raises:
+        IridiumError: If the transport is unknown or the communicator could not connect.
+    """
+    if transport == 'memory':
+        port1, port2 = memory_pair()
+        pty_loopback = None
+    elif transport == 'pty':
+        pty_loopback = PtyLoopback()
+        port1, port2 = pty_loopback.port1, pty_loopback.port2
+    else:
+        raise IridiumError("Unknown loopback transport {}! Use 'memory' or 'pty'.".format(repr(transport)))
+
+    if server is None:
+        server = IridiumServer(options=options)
+        if quiet:
+            server.signal.notification = lambda *args: None
+    if communicator is None:
+        communicator = IridiumCommunicator(options=options)
+        if quiet:
+            communicator.signal.notification = lambda *args: None
+    server.serialport = port1
+    communicator.serialport = port2
+
+    loopback = Loopback(server, communicator, transport, pty_loopback)
+    if connect:
+        try:
+            server.connect()
+            communicator.connect()
+        except Exception:
+            loopback.close()
+            raise
+    return loopback
+# end back_to_back
@@ -0,0 +1,271 @@
+"""
+    pyiridium_metrics
+    SeaLandAire Technologies
+    @author: jengel
+
+Low overhead counters and histograms for the `IridiumCommunicator`. Every communicator has a `CommunicatorMetrics` in
+its `metrics` attribute (set it to None to turn the metrics off). Recording an event only increments integers in lists
+and attributes that were created up front. The latency buckets are fixed, so nothing grows while the communicator runs.
+Commands with a value like b'AT+SBDWT=text' share the histogram of the command up to the b'=' and at most
+`MAX_COMMANDS` histograms are created. The other commands are recorded under b'other'.
+
+  * Round trip latency of each command (written to OK) in a histogram with the failures.
+  * Bytes read and written, reads, readline calls and writes.
+  * Session (SBDIX) outcomes by MO status and MT status.
+  * Checksum failures of received (MT) and sent (MO) messages.
+  * Queue depths and dropped entries of the outbox and the received message queue.
+
+`IridiumCommunicator.metrics_snapshot()` returns the values as a dictionary and `prometheus_text` formats snapshots in
+the Prometheus text exposition format, so many modems can be graphed with labels like the IMEI.
+
+Example:
+
+    .. code-block:: python
+
+        from pyiridium9602 import prometheus_text
+
+        snapshot = iridium_port.metrics_snapshot()
+        print(snapshot['commands']['AT+CSQ']['count'], snapshot['sessions']['mo_status'])
+
+        text = prometheus_text([({'imei': port.imei}, port.metrics_snapshot()) for port in ports])
+"""
+import time
+import bisect
+
+
+__all__ = ['LATENCY_BUCKETS', 'Histogram', 'command_family', 'CommunicatorMetrics', 'prometheus_text']
+
+
+# Upper bounds in seconds of the command latency buckets. Sessions take seconds to tens of seconds.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0,
+                   120.0)
+
+
+class Histogram(object):
+    """Histogram with fixed bucket upper bounds.
+
+    Args:
+        bounds (tuple)[LATENCY_BUCKETS]: Sorted bucket upper bounds. Values above the last bound are counted in the
+            +Inf bucket.
+    """
+    __slots__ = ('bounds', 'counts', 'count', 'sum', 'failures')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Not cumulative. The last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.failures = 0
+
+    def observe(self, value, success=True):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if not success:
+            self.failures += 1
+
+    def cumulative(self):
+        """Return a list of (upper bound, cumulative count) with float('inf') for the last bucket."""
+        total = 0
+        buckets = []
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+    def reset(self):
+        self.counts[:] = [0] * len(self.counts)
+        self.count = 0
+        self.sum = 0.0
+        self.failures = 0
+# end class Histogram
+
+
+def command_family(command):
+    """Return the command up to and including the b'=' or the command if it has no value."""
+    idx = command.find(b'=')
+    return command if idx < 0 else command[:idx + 1]
+
+
+class CommunicatorMetrics(object):
+    """Counters and histograms of one communicator.
+
+    Attributes:
+        bytes_read (int): Bytes read from the serial port.
+        bytes_written (int): Bytes written to the serial port.
+        reads (int): Number of serial port reads.
+        readline_calls (int): Number of reads that fell back to readline because no bytes were waiting.
+        writes (int): Number of serial port writes.
+        mo_status (list): Session count for each MO status. The last item counts the statuses above the list.
+        mt_status (list): Session count for each MT status. The last item counts the statuses above the list.
+        mt_queued (int): MT messages waiting at the gateway in the last session.
+        mt_checksum_failures (int): Received messages with a wrong length or checksum.
+        mo_checksum_failures (int): Write binary messages that the modem rejected (checksum or timeout).
+        messages_received (int): Received messages that were given to `Signal.message_received`.
+        messages_dropped (int): Received messages that were dropped because the message queue was full.
+        commands (dict): {command: Histogram} of the command latencies by `command_family`.
+    """
+
+    MO_STATUS_SIZE = 64
+    MT_STATUS_SIZE = 4
+
+    # Maximum number of command histograms. The commands after that are recorded under OTHER_COMMANDS
+    MAX_COMMANDS = 32
+    OTHER_COMMANDS = b'other'
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.commands = {}
+        self.mo_status = [0] * self.MO_STATUS_SIZE
+        self.mt_status = [0] * self.MT_STATUS_SIZE
+        self.reset()
+
+    def reset(self):
+        """Set all of the values to 0. The histograms are kept."""
+        self.start_time = time.monotonic()
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.reads = 0
+        self.readline_calls = 0
+        self.writes = 0
+        self.mo_status[:] = [0] * self.MO_STATUS_SIZE
+        self.mt_status[:] = [0] * self.MT_STATUS_SIZE
+        self.mt_queued = 0
+        self.mt_checksum_failures = 0
+        self.mo_checksum_failures = 0
+        self.messages_received = 0
+        self.messages_dropped = 0
+        for histogram in self.commands.values():
+            histogram.reset()
+    # end reset
+
+    def observe_command(self, command, seconds, success=True):
+        """Record the round trip time of a command. The histogram is created the first time the command family is
+        seen.
+        """
+        histogram = self.commands.get(command)
+        if histogram is None:
+            family = command_family(command)
+            histogram = self.commands.get(family)
+            if histogram is None:
+                if len(self.commands) >= self.MAX_COMMANDS:
+                    family = self.OTHER_COMMANDS
+                    histogram = self.commands.get(family)
+                if histogram is None:
+                    histogram = self.commands[family] = Histogram(self.bounds)
+        histogram.observe(seconds, success)
+    # end observe_command
+
+    def observe_session(self, mo_status, mt_status, mt_queued):
+        """Record the outcome of a session."""
+        self.mo_status[mo_status if mo_status < self.MO_STATUS_SIZE else -1] += 1
+        self.mt_status[mt_status if mt_status < self.MT_STATUS_SIZE else -1] += 1
+        self.mt_queued = mt_queued
+
+    def snapshot(self):
+        """Return the values in a dictionary.
+
+        The 'commands' histograms are {name: {'count', 'failures', 'sum', 'buckets'}} with the cumulative
+        [(upper bound, count)] buckets. The 'sessions' statuses are {status: count} for the statuses that were seen.
+        """
+        commands = {}
+        for command, histogram in list(self.commands.items()):
+            name = command.decode('utf-8', 'replace') if isinstance(command, bytes) else str(command)
+            commands[name] = {'count': histogram.count, 'failures': histogram.failures, 'sum': histogram.sum,
+                              'buckets': histogram.cumulative()}
+        return {'uptime': time.monotonic() - self.start_time,
+                'bytes_read': self.bytes_read,
+                'bytes_written': self.bytes_written,
+                'reads': self.reads,
+                'readline_calls': self.readline_calls,
+                'writes': self.writes,
+                'commands': commands,
+                'sessions': {'mo_status': {code: count for code, count in enumerate(self.mo_status) if count},
+                             'mt_status': {code: count for code, count in enumerate(self.mt_status) if count},
+                             'mt_queued': self.mt_queued},
+                'checksum_failures': {'mt': self.mt_checksum_failures, 'mo': self.mo_checksum_failures},
+                'messages': {'received': self.messages_received, 'dropped': self.messages_dropped},
+                'queues': {},
+                }
+    # end snapshot
+# end class CommunicatorMetrics
+
+
+def _labels(labels, extra=None):
+    items = list(labels.items())
+    if extra:
+        items.extend(extra)
+    if not items:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"')
+                                           .replace('\n', '\\n')) for key, value in items) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# (name, type, help, function(snapshot) -> [(extra labels, value)])
+_METRICS = (
+    ('bytes_read_total', 'counter', "Bytes read from the serial port.", lambda s: [((), s['bytes_read'])]),
+    ('bytes_written_total', 'counter', "Bytes written to the serial port.", lambda s: [((), s['bytes_written'])]),
+    ('reads_total', 'counter', "Serial port reads.", lambda s: [((), s['reads'])]),
+    ('readline_calls_total', 'counter', "Serial port reads that used readline.", lambda s: [((), s['readline_calls'])]),
+    ('writes_total', 'counter', "Serial port writes.", lambda s: [((), s['writes'])]),
+    ('command_failures_total', 'counter', "Commands that did not finish successfully.",
+     lambda s: [((('command', name),), value['failures']) for name, value in sorted(s['commands'].items())]),
+    ('sessions_total', 'counter', "SBDIX sessions by MO status.",
+     lambda s: [((('mo_status', code),), count) for code, count in sorted(s['sessions']['mo_status'].items())]),
+    ('session_mt_total', 'counter', "SBDIX sessions by MT status.",
+     lambda s: [((('mt_status', code),), count) for code, count in sorted(s['sessions']['mt_status'].items())]),
+    ('mt_queued', 'gauge', "MT messages waiting at the gateway in the last session.",
+     lambda s: [((), s['sessions']['mt_queued'])]),
+    ('checksum_failures_total', 'counter', "Messages with a checksum failure by direction.",
+     lambda s: [((('direction', key),), value) for key, value in sorted(s['checksum_failures'].items())]),
+    ('messages_received_total', 'counter', "Received messages.", lambda s: [((), s['messages']['received'])]),
+    ('messages_dropped_total', 'counter', "Received messages dropped because the message queue was full.",
+     lambda s: [((), s['messages']['dropped'])]),
+    ('queue_depth', 'gauge', "Items waiting in a queue.",
+     lambda s: [((('queue', key),), value['depth']) for key, value in sorted(s['queues'].items())]),
+    ('queue_high_water', 'gauge', "Largest queue depth.",
+     lambda s: [((('queue', key),), value['high_water']) for key, value in sorted(s['queues'].items())
+                if 'high_water' in value]),
+    ('queue_dropped_total', 'counter', "Queue entries that were rejected or expired.",
+     lambda s: [((('queue', key),), value['dropped']) for key, value in sorted(s['queues'].items())]),
+)
+
+
+def prometheus_text(snapshots, prefix='pyiridium'):
+    """Return snapshots in the Prometheus text exposition format.
+
+    Args:
+        snapshots (dict/list): A snapshot from `IridiumCommunicator.metrics_snapshot` or a list of (labels, snapshot)
+            for many communicators like [({'imei': '300234010000000'}, snapshot)].
+        prefix (str)['pyiridium']: Metric name prefix.
+    """
+    if isinstance(snapshots, dict):
+        snapshots = [({}, snapshots)]
+
+    lines = []
+    for name, kind, text, values in _METRICS:
+        name = prefix + '_' + name
+        lines.append('# HELP {} {}'.format(name, text))
+        lines.append('# TYPE {} {}'.format(name, kind))
+        for labels, snapshot in snapshots:
+            for extra, value in values(snapshot):
+                lines.append('{}{} {}'.format(name, _labels(labels, extra), _number(value)))
+
+    name = prefix + '_command_latency_seconds'
+    lines.append('# HELP {} Command round trip time from the write to the OK.'.format(name))
+    lines.append('# TYPE {} histogram'.format(name))
+    for labels, snapshot in snapshots:
+        for command, value in sorted(snapshot['commands'].items()):
+            extra = (('command', command),)
+            for bound, count in value['buckets']:
+                lines.append('{}_bucket{} {}'.format(name, _labels(labels, extra + (('le', _number(bound)),)), count))
+            lines.append('{}_sum{} {}'.format(name, _labels(labels, extra), _number(value['sum'])))
+            lines.append('{}_count{} {}'.format(name, _labels(labels, extra), value['count']))
+    return '\n'.join(lines) + '\n'
+# end prometheus_text
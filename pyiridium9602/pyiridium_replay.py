@@ -0,0 +1,325 @@
+"""
+    pyiridium_replay
+    SeaLandAire Technologies
+    @author: jengel
+
+Replay serial captures through an `IridiumCommunicator`. The capture file is memory mapped and walked with offsets, so
+the file is never copied and the time is linear in the file size. The read binary and write binary contents are skipped
+by their length, so b'AT' or b'OK' bytes in a message do not split the commands.
+
+A raw capture has the written commands and the read responses in order, like
+b'AT+CSQ\\rAT+CSQ\\r\\r\\n+CSQ:5\\r\\n\\r\\nOK\\r\\n'. Framed captures from the `CaptureWriter` mark the direction of each
+frame, so the commands do not need to be found. They can be replayed with their recorded timing.
+
+Example:
+
+    .. code-block:: python
+
+        from pyiridium9602 import IridiumCommunicator, ReplayEngine
+
+        iridium_port = IridiumCommunicator()
+        iridium_port.signal.message_received = lambda msg: print("Message Received:", msg)
+
+        result = ReplayEngine(iridium_port).replay_file("field_unit.log")
+        print("{:.1f} MB/s".format(result.mb_per_sec))
+"""
+import os
+import mmap
+import time
+import collections
+
+from pyiridium9602.pyiridium import Command
+from pyiridium9602.pyiridium_checksum import checksum
+from pyiridium9602.pyiridium_capture import CAPTURE_WRITE, is_framed_capture, iter_frames
+
+
+__all__ = ['SEGMENT_DATA', 'SEGMENT_COMMAND', 'SEGMENT_RESPONSE', 'SEGMENT_WRITTEN', 'CaptureSegment',
+           'read_binary_content', 'iter_capture', 'ReplayResult', 'ReplayEngine']
+
+
+SEGMENT_DATA = 0  # Bytes read outside of a command (unsolicited)
+SEGMENT_COMMAND = 1  # Command written to the modem with the b'\r'
+SEGMENT_RESPONSE = 2  # Bytes read for the command up to and including the OK
+SEGMENT_WRITTEN = 3  # Write binary message and checksum written to the modem
+
+
+CaptureSegment = collections.namedtuple('CaptureSegment', 'kind command start end')
+
+
+def read_binary_content(data, start, end):
+    """Return the (start, end) offsets of the message contents in a read binary response.
+
+    Args:
+        data (bytes/mmap): Capture bytes.
+        start (int): Offset of the response after the written command.
+        end (int): Offset to stop looking at.
+
+    Returns:
+        content (tuple/None): Offsets of the message contents or None if the response was cut off.
+    """
+    ok_idx = data.find(Command.OK, start, end)
+    echo = data.find(Command.READ_BINARY_RECEIVE, start, end if ok_idx < 0 else ok_idx + len(Command.OK))
+    if echo >= 0:
+        start = echo + len(Command.READ_BINARY_RECEIVE)
+    if start + 2 > end:
+        return None
+    content_end = start + 2 + int.from_bytes(data[start: start + 2], "big")
+    if content_end + 2 > end:
+        return None
+    return start + 2, content_end
+# end read_binary_content
+
+
+def _written_message(data, command, start, end):
+    """Return the (start, end) of the write binary message after READY or None if it is not in the capture.
+
+    The message is only skipped if its checksum matches, so captures that do not have the written bytes are walked like
+    any other response.
+    """
+    try:
+        msg_len = int(command[len(Command.WRITE_BINARY):])
+    except ValueError:
+        return None
+    ok_idx = data.find(Command.OK, start, end)
+    ready = data.find(Command.READY, start, end if ok_idx < 0 else ok_idx)
+    if ready < 0:
+        return None
+
+    msg_start = ready + len(Command.READY)
+    if data[msg_start: msg_start + 2] == b'\r\n':
+        msg_start += 2
+    msg_end = msg_start + msg_len
+    if msg_end + 2 > end or checksum(data[msg_start: msg_end]) != data[msg_end: msg_end + 2]:
+        return None
+    return msg_start, msg_end + 2
+# end _written_message
+
+
+def iter_capture(data, start=0, end=None):
+    """Yield the CaptureSegments of a serial capture in order.
+
+    Each command yields a SEGMENT_COMMAND followed by its SEGMENT_RESPONSE and SEGMENT_WRITTEN segments. The bytes
+    before a command are a SEGMENT_DATA segment. Commands are only found between responses, so b'AT' or b'OK' in a
+    binary message are never mistaken for a command.
+
+    Args:
+        data (bytes/mmap): Capture bytes. Anything with `find` and slicing works.
+        start (int)[0]: Offset to start at.
+        end (int)[None]: Offset to stop at. Default is the end of the data.
+    """
+    if end is None:
+        end = len(data)
+    last_newline = data.rfind(b'\n', start, end)
+    pos = start
+    while pos < end:
+        at_idx = data.find(Command.PING, pos, end)
+        cr_idx = -1 if at_idx < 0 else data.find(b'\r', at_idx, end)
+        if cr_idx < 0:
+            break
+
+        # Commands are written with \r. Command echoes end with \r\r\n.
+        if data.find(b'\n', at_idx, cr_idx + 3) >= 0 or last_newline <= cr_idx + 2:
+            # Not a written command
+            yield CaptureSegment(SEGMENT_DATA, None, pos, cr_idx)
+            pos = cr_idx
+            continue
+
+        ok_idx = data.find(Command.OK, cr_idx + 1, end)
+        if ok_idx < 0:
+            break
+
+        if pos < at_idx:
+            yield CaptureSegment(SEGMENT_DATA, None, pos, at_idx)
+        command = data[at_idx: cr_idx]
+        yield CaptureSegment(SEGMENT_COMMAND, command, at_idx, cr_idx + 1)
+        pos = cr_idx + 1
+
+        if command == Command.READ_BINARY:
+            # The OK is after the message contents and checksum
+            content = read_binary_content(data, pos, end)
+            ok_idx = -1 if content is None else data.find(Command.OK, content[1] + 2, end)
+            if ok_idx < 0:
+                yield CaptureSegment(SEGMENT_RESPONSE, command, pos, end)
+                return
+
+        elif command.startswith(Command.WRITE_BINARY):
+            written = _written_message(data, command, pos, end)
+            if written is not None:
+                yield CaptureSegment(SEGMENT_RESPONSE, command, pos, written[0])
+                yield CaptureSegment(SEGMENT_WRITTEN, command, written[0], written[1])
+                pos = written[1]
+                ok_idx = data.find(Command.OK, pos, end)
+                if ok_idx < 0:
+                    yield CaptureSegment(SEGMENT_RESPONSE, command, pos, end)
+                    return
+
+        yield CaptureSegment(SEGMENT_RESPONSE, command, pos, ok_idx + len(Command.OK))
+        pos = ok_idx + len(Command.OK)
+
+    if pos < end:
+        yield CaptureSegment(SEGMENT_DATA, None, pos, end)
+# end iter_capture
+
+
+class ReplayResult(collections.namedtuple('ReplayResult', 'size commands seconds')):
+    """Result of a replay.
+
+    Attributes:
+        size (int): Number of capture bytes replayed.
+        commands (int): Number of commands replayed.
+        seconds (float): Time the replay took.
+    """
+    __slots__ = ()
+
+    @property
+    def mb_per_sec(self):
+        """Return the replay throughput in MB (1e6 bytes) per second."""
+        return self.size / self.seconds / 1e6 if self.seconds > 0 else 0.0
+# end class ReplayResult
+
+
+class ReplayEngine(object):
+    """Feed a serial capture to a communicator like the listen thread would read it.
+
+    The communicator does not read or write its serial port or queue commands while the capture is replayed.
+
+    Args:
+        communicator (IridiumCommunicator): Communicator that processes the capture.
+        print_serial (function)[None]: Function that displays the replayed bytes. A blank line is printed after each
+            command when this is given.
+        chunk_size (int)[4096]: Maximum number of bytes given to `check_io` at once.
+        speed (float)[None]: Replay framed captures with their recorded timing. 1 is real time and 2 is twice as fast.
+            None replays as fast as possible. Raw captures do not have timestamps.
+    """
+
+    def __init__(self, communicator, print_serial=None, chunk_size=4096, speed=None):
+        self.communicator = communicator
+        self.print_serial = print_serial
+        self.chunk_size = chunk_size
+        self.speed = speed
+
+    def prevent_io(self):
+        """Prevent the communicator from reading and writing the serial port and queueing commands."""
+        self.communicator.read_serial = lambda *args, **kwargs: b''
+        self.communicator.write_serial = lambda *args, **kwargs: None
+        self.communicator.queue_command = lambda *args, **kwargs: None
+
+    def feed(self, data, start, end):
+        """Give the data to the communicator's `check_io` in chunks."""
+        check_io = self.communicator.check_io
+        chunk_size = self.chunk_size
+        for i in range(start, end, chunk_size):
+            check_io(data[i: min(i + chunk_size, end)])
+
+    def replay(self, data, start=0, end=None):
+        """Replay the capture bytes. Framed captures from the `CaptureWriter` are replayed with `replay_frames`.
+
+        Args:
+            data (bytes/mmap): Capture bytes.
+            start (int)[0]: Offset to start at.
+            end (int)[None]: Offset to stop at. Default is the end of the data.
+
+        Returns:
+            result (ReplayResult): Number of bytes and commands replayed and the time it took.
+        """
+        if is_framed_capture(data):
+            return self.replay_frames(data, start, end)
+        if end is None:
+            end = len(data)
+        communicator = self.communicator
+        print_serial = self.print_serial
+        self.prevent_io()
+
+        commands = 0
+        start_time = time.perf_counter()
+        for kind, command, seg_start, seg_end in iter_capture(data, start, end):
+            if kind == SEGMENT_COMMAND:
+                if commands and print_serial is not None:
+                    print()  # Separate commands printed
+                commands += 1
+                communicator._previous_command = command
+            if print_serial is not None:
+                print_serial(data[seg_start: seg_end])
+            if kind != SEGMENT_COMMAND and kind != SEGMENT_WRITTEN:
+                self.feed(data, seg_start, seg_end)
+        if commands and print_serial is not None:
+            print()
+
+        return ReplayResult(end - start, commands, time.perf_counter() - start_time)
+    # end replay
+
+    def replay_frames(self, data, start=0, end=None):
+        """Replay a framed capture. The read frames are given to `check_io`. A written command sets the pending command
+        and the write binary message after it is skipped.
+
+        Args:
+            data (bytes/mmap): Framed capture bytes.
+            start (int)[0]: Offset of a frame header. Default is the first frame.
+            end (int)[None]: Offset to stop at. Default is the end of the data.
+
+        Returns:
+            result (ReplayResult): Number of bytes and commands replayed and the time it took.
+        """
+        if end is None:
+            end = len(data)
+        communicator = self.communicator
+        print_serial = self.print_serial
+        speed = self.speed
+        self.prevent_io()
+
+        commands = 0
+        writing_message = False  # The next write is the write binary message
+        start_time = time.perf_counter()
+        first = None
+        for timestamp, direction, frame_start, frame_end in iter_frames(data, start, end):
+            if speed:
+                # Wait until the frame is due
+                if first is None:
+                    first = timestamp
+                delay = (timestamp - first) / speed - (time.perf_counter() - start_time)
+                if delay > 0:
+                    time.sleep(delay)
+
+            if direction == CAPTURE_WRITE:
+                written = data[frame_start: frame_end]
+                if writing_message:
+                    writing_message = False
+                elif written.startswith(Command.PING) and written.endswith(b'\r'):
+                    if commands and print_serial is not None:
+                        print()  # Separate commands printed
+                    commands += 1
+                    communicator._previous_command = written[:-1]
+                    writing_message = written.startswith(Command.WRITE_BINARY)
+                if print_serial is not None:
+                    print_serial(written)
+            else:
+                if print_serial is not None:
+                    print_serial(data[frame_start: frame_end])
+                self.feed(data, frame_start, frame_end)
+        if commands and print_serial is not None:
+            print()
+
+        return ReplayResult(end - start, commands, time.perf_counter() - start_time)
+    # end replay_frames
+
+    def replay_file(self, filename, start=0, end=None):
+        """Memory map the capture file and replay it.
+
+        Args:
+            filename (str): Capture file name.
+            start (int)[0]: Offset to start at. Use a command offset from the `CaptureIndex` to seek.
+            end (int)[None]: Offset to stop at. Default is the end of the file.
+
+        Returns:
+            result (ReplayResult): Number of bytes and commands replayed and the time it took.
+        """
+        with open(filename, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return self.replay(b'')
+
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if hasattr(data, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    data.madvise(mmap.MADV_SEQUENTIAL)
+                return self.replay(data, start, end)
+    # end replay_file
+# end class ReplayEngine
@@ -0,0 +1,301 @@
+"""
+    pyiridium_schema
+    SeaLandAire Technologies
+    @author: jengel
+
+Compact binary telemetry records. A message type declares its fields once and is compiled to a `struct.Struct`. Small
+enums, booleans and bit fields are packed together into one integer. The first byte of every payload is the type id,
+so a received payload is routed to the right decoder.
+
+Fields are given as (name, kind) pairs. The kind is a `struct` format code ('b', 'B', 'h', 'H', 'i', 'I', 'q', 'Q',
+'e', 'f', 'd' or '10s') or a `Bool`, `Enum` or `Bits` object.
+
+Example:
+
+    .. code-block:: python
+
+        from pyiridium9602 import SchemaRegistry, Bool, Enum
+
+        registry = SchemaRegistry()
+        registry.register(1, 'position', [('lat', 'f'), ('lon', 'f'), ('speed', 'H'),
+                                          ('mode', Enum(['normal', 'low_power', 'fault'])), ('gps_fix', Bool())])
+
+        payload = registry.encode('position', {'lat': 27.95, 'lon': -82.45, 'speed': 12, 'mode': 'normal',
+                                               'gps_fix': True})
+        record = registry.decode(payload)  # position(lat=27.9500007, lon=-82.4499969, speed=12, ...)
+"""
+import struct
+import collections
+
+from pyiridium9602.pyiridium import IridiumError
+
+
+__all__ = ['Bool', 'Enum', 'Bits', 'MessageSchema', 'SchemaRegistry']
+
+
+BATCH_FLAG = 0x80  # Type id bit for a payload that contains several records of the same type
+
+
+class Bits(object):
+    """Unsigned integer field that is packed into the given number of bits."""
+
+    def __init__(self, bits):
+        if not 0 < bits <= 64:
+            raise IridiumError("A bit field must be 1 - 64 bits!")
+        self.bits = bits
+
+    def to_int(self, value):
+        value = int(value)
+        if not 0 <= value < (1 << self.bits):
+            raise IridiumError("The value {} does not fit in {} bits!".format(value, self.bits))
+        return value
+
+    def from_int(self, value):
+        return value
+# end class Bits
+
+
+class Bool(Bits):
+    """Boolean field that is packed into 1 bit."""
+
+    def __init__(self):
+        super().__init__(1)
+
+    def to_int(self, value):
+        return 1 if value else 0
+
+    def from_int(self, value):
+        return bool(value)
+# end class Bool
+
+
+class Enum(Bits):
+    """Field that is one of a list of values. The value's index is packed into the fewest bits."""
+
+    def __init__(self, values):
+        self.values = tuple(values)
+        if len(self.values) == 0:
+            raise IridiumError("An enum field needs values!")
+        self._index = {value: i for i, value in enumerate(self.values)}
+        super().__init__(max((len(self.values) - 1).bit_length(), 1))
+
+    def to_int(self, value):
+        try:
+            return self._index[value]
+        except KeyError:
+            raise IridiumError("{!r} is not one of {}".format(value, self.values)) from None
+
+    def from_int(self, value):
+        try:
+            return self.values[value]
+        except IndexError:
+            raise IridiumError("Enum index {} is out of range!".format(value)) from None
+# end class Enum
+
+
+class MessageSchema(object):
+    """Compiled message type with a cached `struct.Struct`.
+
+    The payload is the type id byte, the struct fields in order, and then one little endian integer with all of the
+    bit fields. Decoded records are named tuples.
+
+    Args:
+        type_id (int): Type id 0 - 127 that is the first byte of the payload.
+        name (str): Message type name. This is also the name of the record named tuple.
+        fields (list): List of (name, kind) pairs.
+    """
+
+    BIT_CONTAINERS = ((8, 'B'), (16, 'H'), (32, 'I'), (64, 'Q'))
+
+    def __init__(self, type_id, name, fields):
+        if not 0 <= type_id < BATCH_FLAG:
+            raise IridiumError("The type id must be 0 - 127!")
+        self.type_id = type_id
+        self.name = name
+        self.fields = list(fields)
+        self.names = [field_name for field_name, _ in self.fields]
+        self.record = collections.namedtuple(name, self.names)
+
+        # Split the struct fields and the bit fields
+        fmt = ''
+        self._struct_index = []  # Record index of each struct field
+        self._bit_fields = []  # (record index, shift, kind)
+        self._unpack_bits = []  # (record index, shift, mask, from_int)
+        shift = 0
+        for i, (field_name, kind) in enumerate(self.fields):
+            if isinstance(kind, Bits):
+                self._bit_fields.append((i, shift, kind))
+                self._unpack_bits.append((i, shift, (1 << kind.bits) - 1, kind.from_int))
+                shift += kind.bits
+            else:
+                fmt += kind
+                self._struct_index.append(i)
+
+        if shift > 64:
+            raise IridiumError("The bit fields of {} need {} bits and the limit is 64!".format(name, shift))
+        self.bits = shift
+        if shift > 0:
+            fmt += next(code for size, code in self.BIT_CONTAINERS if shift <= size)
+
+        self.body = struct.Struct('<' + fmt)  # Record without the type id
+        self.struct = struct.Struct('<B' + fmt)
+        self.size = self.struct.size
+        self._simple = shift == 0 and self._struct_index == list(range(len(self.fields)))
+    # end Constructor
+
+    def __repr__(self):
+        return "MessageSchema({}, {!r}, {} bytes)".format(self.type_id, self.name, self.size)
+
+    def values(self, record):
+        """Return the struct values for a record (dict, named tuple or sequence)."""
+        if isinstance(record, dict):
+            try:
+                record = [record[field_name] for field_name in self.names]
+            except KeyError as err:
+                raise IridiumError("The {} record is missing the {} field!".format(self.name, err)) from None
+        elif len(record) != len(self.names):
+            raise IridiumError("The {} record needs {} fields!".format(self.name, len(self.names)))
+        if self._simple:
+            return record
+
+        values = [record[i] for i in self._struct_index]
+        if self._bit_fields:
+            packed = 0
+            for i, shift, kind in self._bit_fields:
+                packed |= kind.to_int(record[i]) << shift
+            values.append(packed)
+        return values
+    # end values
+
+    def make_record(self, values):
+        """Return the record named tuple for the unpacked struct values."""
+        if self._simple:
+            return self.record._make(values)
+
+        record = [None] * len(self.names)
+        for i, value in zip(self._struct_index, values):
+            record[i] = value
+        if self._bit_fields:
+            packed = values[-1]
+            for i, shift, mask, from_int in self._unpack_bits:
+                record[i] = from_int((packed >> shift) & mask)
+        return self.record._make(record)
+    # end make_record
+
+    def encode(self, record):
+        """Return the payload bytes for one record."""
+        try:
+            return self.struct.pack(self.type_id, *self.values(record))
+        except struct.error as err:
+            raise IridiumError("Could not encode the {} record! {}".format(self.name, err)) from err
+
+    def decode(self, payload):
+        """Return the record from the payload bytes."""
+        try:
+            values = self.struct.unpack(payload)
+        except struct.error as err:
+            raise IridiumError("Could not decode the {} record! {}".format(self.name, err)) from err
+        return self.make_record(values[1:])
+
+    def encode_batch(self, records):
+        """Return one payload with all of the records. The payload is the type id with the batch flag and then the
+        records without their type id.
+        """
+        pack = self.body.pack
+        try:
+            return bytes([self.type_id | BATCH_FLAG]) + b''.join([pack(*self.values(record)) for record in records])
+        except struct.error as err:
+            raise IridiumError("Could not encode the {} records! {}".format(self.name, err)) from err
+
+    def decode_batch(self, payload):
+        """Return the list of records from a batch payload."""
+        body = memoryview(payload)[1:]
+        if len(body) % self.body.size != 0:
+            raise IridiumError("The {} batch is not a whole number of records!".format(self.name))
+        make_record = self.make_record
+        return [make_record(values) for values in self.body.iter_unpack(body)]
+
+    def batch_capacity(self, limit=340):
+        """Return the number of records that fit in one batch payload of the given size."""
+        return (limit - 1) // self.body.size
+# end class MessageSchema
+
+
+class SchemaRegistry(object):
+    """Registry of the message types that routes payloads to the right decoder with the type id byte."""
+
+    def __init__(self):
+        self._by_id = {}
+        self._by_name = {}
+
+    def __contains__(self, key):
+        return key in self._by_id or key in self._by_name
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def register(self, type_id, name, fields):
+        """Compile and register a message type.
+
+        Args:
+            type_id (int): Type id 0 - 127 that is the first byte of the payload.
+            name (str): Message type name.
+            fields (list): List of (name, kind) pairs.
+
+        Returns:
+            schema (MessageSchema): Compiled message type.
+
+        Raises:
+            IridiumError: If the type id or name is already registered or the fields are invalid.
+        """
+        if type_id in self._by_id or name in self._by_name:
+            raise IridiumError("The message type {} {!r} is already registered!".format(type_id, name))
+        try:
+            schema = MessageSchema(type_id, name, fields)
+        except struct.error as err:
+            raise IridiumError("Invalid fields for {!r}! {}".format(name, err)) from err
+        self._by_id[type_id] = schema
+        self._by_name[name] = schema
+        return schema
+    # end register
+
+    def get(self, key):
+        """Return the schema for a type id or name.
+
+        Raises:
+            IridiumError: If the message type is not registered.
+        """
+        schema = self._by_id.get(key) if isinstance(key, int) else self._by_name.get(key)
+        if schema is None:
+            raise IridiumError("Unknown message type {!r}!".format(key))
+        return schema
+
+    def schema_for(self, payload):
+        """Return the schema for a payload and if the payload is a batch."""
+        if len(payload) == 0:
+            raise IridiumError("The payload does not have a type id!")
+        header = payload[0]
+        return self.get(header & ~BATCH_FLAG), bool(header & BATCH_FLAG)
+
+    def encode(self, key, record):
+        """Return the payload bytes for one record of the given message type."""
+        return self.get(key).encode(record)
+
+    def encode_batch(self, key, records):
+        """Return one payload with all of the records of the given message type."""
+        return self.get(key).encode_batch(records)
+
+    def decode(self, payload):
+        """Return the record for a payload. A batch payload returns a list of records."""
+        schema, batch = self.schema_for(payload)
+        if batch:
+            return schema.decode_batch(payload)
+        return schema.decode(payload)
+
+    def decode_batch(self, payload):
+        """Return the list of records for a payload."""
+        schema, batch = self.schema_for(payload)
+        if batch:
+            return schema.decode_batch(payload)
+        return [schema.decode(payload)]
+# end class SchemaRegistry
@@ -3,7 +3,9 @@
     SeaLandAire Technologies
     @author: jengel
 
-Iridium satellite communications server emulator.
+Iridium satellite communications server emulator. The `EmulatedModem` state machine answers the modem commands. The
+`IridiumServer` runs it on a serial port with a listening thread and the `EmulatorFarm` runs many of them on one event
+loop.
 
 Note:
     Not everything in this server works correctly. The below code is a simple test emulator for what I have observed 
@@ -11,14 +13,311 @@ Note:
 """
 import collections
 import random
+import threading
 import time
 import datetime
 
-from pyiridium9602.pyiridium import Command, MO_STATUS, MT_STATUS, IridiumError, Signal, IridiumCommunicator
+from pyiridium9602.pyiridium import Command, IridiumError, IridiumCommunicator
+from pyiridium9602.pyiridium_checksum import checksum
+
+
+OK = Command.OK + b'\r\n'
+
+
+class EmulatedModem(object):
+    """Modem state machine without I/O. Bytes from the serial port are given to `feed` and the responses are given to
+    the `write` function.
+
+    The `IridiumServer` and the `EmulatorFarm` both run this state machine, so they answer the commands the same way. A
+    write binary message is collected from the following bytes without blocking.
+
+    Set `link` to a `LinkModel` for session latency, session failures and serial line errors. The session latency needs
+    `call_later` (set by the `EmulatorFarm` to the event loop's `call_later` and by the `IridiumServer` to a timer).
+    The modem does not answer other commands until the delayed session response is written, like a real modem.
+
+    Args:
+        serial_number (str)['300234010000000']: Serial number (IMEI).
+        write (function)[None]: Function that is called with the response bytes.
+        options (dict)[None]: Options 'echo' and 'ring_alerts'.
+    """
+
+    DEFAULT_OPTIONS = {'echo': True,
+                       'ring_alerts': True,
+                       'flow_control': False,
+                       }
+
+    # Maximum number of MT messages waiting for the client to read
+    MT_QUEUE_SIZE = 100
+
+    def __init__(self, serial_number='300234010000000', write=None, options=None):
+        self.serial_number = str(serial_number)
+        self.write = write
+        self.options = self.DEFAULT_OPTIONS.copy()
+        if isinstance(options, dict):
+            self.options.update(options)
+
+        self.signal_quality = 5
+        self.mo_msn = 0
+        self.mt_msn = 0
+        self.mo_status = 0
+        self.mt_queue = collections.deque(maxlen=self.MT_QUEUE_SIZE)
+        self.mo_messages = collections.deque(maxlen=self.MT_QUEUE_SIZE)
+        self.commands = 0
+        self.link = None  # LinkModel
+        self.call_later = None  # function(delay, callback, *args)
+
+        self._buffer = bytearray()
+        self._busy = False  # Waiting for the session latency
+        self._mo_pending = None  # MO message waiting for a successful session when there is a link model
+        self._binary_length = None  # Bytes expected for the write binary message (length + 2 checksum bytes)
+        self._last_command = None
+        self._handlers = {Command.PING: self._ok,
+                          Command.ECHO_ON: self._echo_on,
+                          Command.ECHO_OFF: self._echo_off,
+                          Command.FLOW_CONTROL_ON: self._flow_control_on,
+                          Command.FLOW_CONTROL_OFF: self._flow_control_off,
+                          Command.RING_ALERTS_ON: self._ring_alerts_on,
+                          Command.RING_ALERTS_OFF: self._ring_alerts_off,
+                          Command.RETURN_ECHO: self._return_echo,
+                          Command.RETURN_IDENTIFICATION: self._return_identification,
+                          Command.SYSTEM_TIME: self._system_time,
+                          Command.SIGNAL_QUALITY: self._signal_quality,
+                          Command.SERIAL_NUMBER: self._serial_number,
+                          Command.CLEAR_MO_BUFFER: self._clear_buffer,
+                          Command.CLEAR_MT_BUFFER: self._clear_buffer,
+                          Command.CLEAR_BOTH_BUFFERS: self._clear_buffer,
+                          Command.CHECK_RING: self._check_ring,
+                          Command.SESSION: self._session,
+                          Command.SESSION_RING_ALERT: self._session,
+                          Command.READ_BINARY: self._read_binary,
+                          }
+    # end Constructor
+
+    def _echo(self, cmd):
+        return cmd + b'\r\r\n' if self.options['echo'] else b''
+
+    def _ok(self, cmd):
+        return self._echo(cmd) + OK
+
+    def _echo_on(self, cmd):
+        self.options['echo'] = True
+        return self._ok(cmd)
+
+    def _echo_off(self, cmd):
+        self.options['echo'] = False
+        return OK
+
+    def _flow_control_on(self, cmd):
+        self.options['flow_control'] = True
+        return self._ok(cmd)
+
+    def _flow_control_off(self, cmd):
+        self.options['flow_control'] = False
+        return self._ok(cmd)
+
+    def _ring_alerts_on(self, cmd):
+        self.options['ring_alerts'] = True
+        return self._ok(cmd)
+
+    def _ring_alerts_off(self, cmd):
+        self.options['ring_alerts'] = False
+        return self._ok(cmd)
+
+    def _return_echo(self, cmd):
+        return b''.join((self._echo(cmd), str(int(self.options['echo'])).encode('utf-8'), b'\r\n\r\n', OK))
+
+    def _return_identification(self, cmd):
+        return self._echo(cmd) + b'4\r\n\r\n' + OK  # 4 for Iridium 9602 Family
+
+    def _system_time(self, cmd):
+        ticks = int((datetime.datetime.utcnow() - IridiumCommunicator.IRIDIUM_EPOCH).total_seconds() * 1000 / 90)
+        return b''.join((self._echo(cmd), b'-MSSTM: ', '{:08x}'.format(ticks).encode('utf-8'), b'\r\n\r\n', OK))
+
+    def _signal_quality(self, cmd):
+        signal_quality = self.signal_quality if self.link is None else self.link.signal_quality()
+        return b''.join((self._echo(cmd), b'+CSQ:', str(signal_quality).encode('utf-8'), b'\r\n\r\n', OK))
+
+    def _serial_number(self, cmd):
+        return b''.join((self._echo(cmd), self.serial_number.encode('utf-8'), b'\r\n\r\n', OK))
+
+    def _clear_buffer(self, cmd):
+        return self._echo(cmd) + b'0\r\n\r\n' + OK
+
+    def _check_ring(self, cmd):
+        return b''.join((self._echo(cmd), b'+CRIS: 0,', str(len(self.mt_queue)).encode('utf-8'), b'\r\n\r\n', OK))
+
+    def _session(self, cmd):
+        if self.link is not None:
+            return self._link_session(cmd)
+
+        mt_len = len(self.mt_queue[0]) if self.mt_queue else 0
+        values = (self.mo_status, self.mo_msn, int(bool(self.mt_queue)), self.mt_msn, mt_len,
+                  max(len(self.mt_queue) - 1, 0))
+        self.mo_msn = (self.mo_msn + 1) & 0xffff
+        self.mt_msn = (self.mt_msn + 1) & 0xffff
+        self.mo_status = 0
+        return b''.join((self._echo(cmd), b'+SBDIX: ', ','.join(map(str, values)).encode('utf-8'), b'\r\n\r\n', OK))
+    # end _session
+
+    def _link_session(self, cmd):
+        outcome = self.link.session()
+        if not outcome.success:
+            # The MO message stays in the buffer for the next session and the mailbox check failed
+            values = (outcome.mo_status, self.mo_msn, 2, self.mt_msn, 0, 0)
+        else:
+            if self._mo_pending is not None:
+                self._deliver(*self._mo_pending)
+                self._mo_pending = None
+            if outcome.mt_error or not self.mt_queue:
+                values = (self.mo_status, self.mo_msn, 2 if outcome.mt_error else 0, self.mt_msn, 0, 0)
+            else:
+                values = (self.mo_status, self.mo_msn, 1, self.mt_msn, len(self.mt_queue[0]), len(self.mt_queue) - 1)
+            self.mo_msn = (self.mo_msn + 1) & 0xffff
+            self.mt_msn = (self.mt_msn + 1) & 0xffff
+            self.mo_status = 0
+
+        response = b''.join((b'+SBDIX: ', ','.join(map(str, values)).encode('utf-8'), b'\r\n\r\n', OK))
+        if outcome.latency > 0 and self.call_later is not None:
+            self._busy = True
+            self.call_later(outcome.latency, self._finish_session, response)
+            return self._echo(cmd)
+        return self._echo(cmd) + response
+    # end _link_session
+
+    def _finish_session(self, response):
+        """Write the delayed session response and answer the commands that arrived during the session."""
+        self._busy = False
+        self._send(response)
+        self.feed(b'')
+
+    def _read_binary(self, cmd):
+        # An empty MT buffer is read as a message with a length of 0
+        msg = self.mt_queue.popleft() if self.mt_queue else b''
+        return b''.join((Command.READ_BINARY_RECEIVE, len(msg).to_bytes(2, 'big'), msg, checksum(msg), b'\r\n\r\n',
+                         OK))
+
+    def _write_binary(self, cmd):
+        echo = self._echo(cmd)
+        try:
+            length = int(cmd[len(Command.WRITE_BINARY):].strip())
+        except ValueError:
+            length = -1
+        if not 0 < length <= 340:
+            self.mo_status = 14  # Invalid segment size
+            return echo + b'\r\n14\r\n\r\n' + OK
+        self._binary_length = length + 2
+        return echo + Command.READY + b'\r\n'
+    # end _write_binary
+
+    def _write_binary_data(self, data):
+        """Return the response to the write binary message and checksum."""
+        contents, msg_check = data[:-2], data[-2:]
+        if msg_check != checksum(contents):
+            self.mo_status = 18  # Connection lost (RF drop). There is no checksum failure status
+            return b'\r\n18\r\n\r\n' + OK
+        data = b''.join((str(len(contents)).encode('utf-8'), contents, msg_check))
+        if self.link is None:
+            self._deliver(contents, data)
+        else:
+            self._mo_pending = (contents, data)  # Sent by the next successful session
+        self.mo_status = 1  # Success
+        return b'\r\n0\r\n\r\n' + OK
+    # end _write_binary_data
+
+    def _deliver(self, contents, data):
+        self.mo_messages.append(contents)
+        self.write_iridium(data)
+
+    def write_iridium(self, data):
+        """Called after a complete write binary message was received. Override to forward the messages.
+
+        Args:
+            data (bytes): Message length as text, contents, 2 bytes of checksum like `IridiumServer.write_iridium`.
+        """
+        pass
+
+    def handle(self, cmd):
+        """Return the response to a command without the b'\\r'."""
+        self.commands += 1
+        if cmd == Command.REPEAT_LAST_COMMAND:
+            cmd = self._last_command or Command.PING
+        else:
+            self._last_command = cmd
+
+        handler = self._handlers.get(cmd)
+        if handler is not None:
+            return handler(cmd)
+        elif cmd.startswith(Command.WRITE_BINARY):
+            return self._write_binary(cmd)
+        elif cmd.startswith(Command.PING):
+            return self._ok(cmd)  # Command with no action
+        return b''
+    # end handle
+
+    def feed(self, data):
+        """Process bytes from the serial port and write the responses."""
+        if self.link is not None and data:
+            data = self.link.receive(data)
+        buf = self._buffer
+        buf += data
+        responses = []
+        while buf and not self._busy:
+            if self._binary_length is not None:
+                if len(buf) < self._binary_length:
+                    break
+                responses.append(self._write_binary_data(bytes(buf[:self._binary_length])))
+                del buf[:self._binary_length]
+                self._binary_length = None
+                continue
+
+            idx = buf.find(b'\r')
+            if idx < 0:
+                break
+            cmd = bytes(buf[:idx]).strip()
+            del buf[:idx + 1]
+            if cmd:
+                response = self.handle(cmd)
+                if response:
+                    responses.append(response)
+
+        if responses:
+            self._send(b''.join(responses))
+    # end feed
+
+    def _send(self, data):
+        if self.link is not None:
+            data = self.link.transmit(data)
+        if data and self.write is not None:
+            self.write(data)
+
+    def queue_mt(self, message):
+        """Queue an MT message for the client to read and ring if ring alerts are on."""
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+        if len(message) > 270:
+            raise IridiumError("Message length must be no more than 270 bytes.")
+        self.mt_queue.append(message)
+        if self.options['ring_alerts']:
+            self.ring()
+    # end queue_mt
+
+    def ring(self):
+        """Write an SBD ring alert."""
+        self._send(Command.RING + b'\n')
+# end class EmulatedModem
+
 
 
 class IridiumServer(IridiumCommunicator):
-    """Iridium Server emulator for testing."""
+    """Iridium Server emulator for testing.
+
+    The commands are answered by an `EmulatedModem` in the `modem` attribute. The listening thread gives it the bytes
+    from the serial port and a timer writes the delayed session response, so the thread never blocks. Every command is
+    answered by `check_incoming`. Override it to change or add commands.
+
+    Set the `link` attribute to a `LinkModel` to add session latency, a signal quality trace, session failures and
+    serial line errors. With a link model the MO message is only given to `write_iridium` after a successful session.
+    """
 
     DEFAULT_OPTIONS = {'echo': True,
                        'ring_alerts': True,
@@ -28,21 +327,46 @@ class IridiumServer(IridiumCommunicator):
                        }
 
     def __init__(self, serialport=None, signal=None, options=None):
+        # The modem must exist before the communicator sets the serial number
+        self.modem = EmulatedModem(random.randint(0, 65535), write=lambda data: self._silent_write(data))
+        self.modem.write_iridium = lambda data: self.write_iridium(data)  # Allow write_iridium to be replaced
+        self.modem.call_later = self._call_later
+        self._handle_command = self.modem.handle
+        self.modem.handle = self.check_incoming
+        self._modem_lock = threading.RLock()
+        self._timers = set()
+
+        serial_number = self.modem.serial_number
         super().__init__(None, signal, options)
-
-        # Variables
-        self._serial_number = str(random.randint(0, 65535))
-        self._system_time = 0
-        self._session_counter = 0
-        self._signal_quality = 5
-        self._read_history = collections.deque(maxlen=10)
-        self._mo_status = 0
-        self._mt_msn = 0
+        self._serial_number = serial_number
+        self.modem.options = self.options  # The modem commands and set_option change the same options
 
         if serialport is not None:
             self.serialport = serialport
     # end Constructor
 
+    @property
+    def link(self):
+        """Return the `LinkModel` of the modem or None."""
+        return self.modem.link
+
+    @link.setter
+    def link(self, value):
+        self.modem.link = value
+
+    @property
+    def _serial_number(self):
+        return self.modem.serial_number
+
+    @_serial_number.setter
+    def _serial_number(self, value):
+        self.modem.serial_number = str(value)
+
+    @property
+    def _write_queue(self):
+        """Return the MT messages waiting for the client to read."""
+        return self.modem.mt_queue
+
     def connect(self, port_id=None, create_thread=True):
         """Connect to the iridium modem over the serial port and ensure that it is working.
         
@@ -75,22 +399,48 @@ class IridiumServer(IridiumCommunicator):
         self.signal.connected()
     # end connect
 
+    def close(self):
+        """Cancel the delayed session responses and close the serial port."""
+        with self._modem_lock:
+            for timer in self._timers:
+                timer.cancel()
+            self._timers.clear()
+        super().close()
+    # end close
+
+    def _call_later(self, delay, callback, *args):
+        """Run the callback with the modem lock after the delay seconds in a timer thread."""
+        def run():
+            with self._modem_lock:
+                self._timers.discard(timer)
+                callback(*args)
+
+        timer = threading.Timer(delay, run)
+        timer.daemon = True
+        with self._modem_lock:
+            self._timers.add(timer)
+        timer.start()
+        return timer
+    # end _call_later
+
     def write_iridium(self, data):
         """Write to the iridium? This command is called after a complete Write Binary command has been received.
         
         Args:
-            data (bytes): 2 bytes of message length, contents, 2 bytes of checksum
+            data (bytes): Message length as text, contents, 2 bytes of checksum
         """
         pass
 
     def write_serial(self, msg):
+        """Queue an MT message for the client to read and ring."""
         if len(msg) > 270:
             raise IridiumError("Message length must be no more than 270 bytes.")
 
         if isinstance(msg, str):
             msg = msg.encode("utf-8")
-        self._write_queue.append(msg)
-        self._silent_write(b"SBDRING\n")
+        with self._modem_lock:
+            self.modem.mt_queue.append(msg)
+            self.modem.ring()  # The server rings even when ring alerts are off
     # end write_serial
     
     send_message = write_serial
@@ -119,242 +469,31 @@ class IridiumServer(IridiumCommunicator):
     # end set_ring_alerts
 
     def echo_command(self, cmd):
-        """Check if echo is on and echo the command if it is.
-        
-        Note:
-            This command clears the `_read_buf`! If you implement a receive command in check_incoming without an echo
-            be sure to clear the `_read_buf`!
+        """Return the echo of the command if echo is on or b''.
 
         Args:
             cmd (bytes): The given command to echo.
         """
-        if self.is_echo():
-            self._silent_write(cmd + b'\r\n')
+        return self.modem._echo(cmd.rstrip(b'\r'))
     # end echo_command
 
     def check_io(self, message=b''):
-        """Check for incoming and outgoing messages."""
-        # Add the message to the existing buffer
-        if message != b'':
-            self._read_history.append(message)
-        self._read_buf += message
-
-        while b'\r' in self._read_buf:
-            data, self._read_buf = self._read_buf.split(b'\r', 1)
-            self.check_incoming(data + b'\r')
+        """Give the incoming bytes to the modem, which writes the responses."""
+        if message:
+            with self._modem_lock:
+                self.modem.feed(message)
     # end check_io
 
     def check_incoming(self, cmd):
-        """Run the thread trying to connect."""
-        # Ping
-        if cmd == Command.PING + b'\r':
-            self.echo_command(cmd)
-            self._silent_write(Command.OK + b'\r\n')
-
-        # Echo
-        elif cmd == Command.ECHO_ON + b'\r':
-            self.set_echo(True)
-            self.echo_command(cmd)
-            self._silent_write(Command.OK + b'\r\n')
-        elif cmd == Command.ECHO_OFF + b'\r':
-            self.set_echo(False)
-            self._silent_write(Command.OK + b'\r\n')
-
-        # Flow Control
-        elif cmd == Command.FLOW_CONTROL_ON + b'\r':
-            self.set_flow_control(True)
-            self.echo_command(cmd)
-            self._silent_write(Command.OK + b'\r\n')
-        elif cmd == Command.FLOW_CONTROL_OFF + b'\r':
-            self.set_flow_control(False)
-            self.echo_command(cmd)
-            self._silent_write(Command.OK + b'\r\n')
-
-        # Ring Alerts
-        elif cmd == Command.RING_ALERTS_ON + b'\r':
-            self.set_ring_alerts(True)
-            self.echo_command(cmd)
-            self._silent_write(Command.OK + b'\r\n')
-        elif cmd == Command.RING_ALERTS_OFF + b'\r':
-            self.set_ring_alerts(False)
-            self.echo_command(cmd)
-            self._silent_write(Command.OK + b'\r\n')
-
-        # Repeat the last command
-        elif cmd == Command.REPEAT_LAST_COMMAND + b'\r':
-            self.echo_command(cmd)
-            self._read_history.pop()  # Remove the b'A/' Repeat Last Command from history. Don't know.
-            self._silent_write(self._read_history[-1] + b'\r\n\r\n')  # Skip repeat of the b'A/'
-            self._silent_write(Command.OK + b'\r\n')
-
-        # Return echo
-        elif cmd == Command.RETURN_ECHO + b'\r':
-            self.echo_command(cmd)
-            value = int(self.is_echo())
-            self._silent_write(str(value).encode("utf-8") + b'\r\n\r\n')
-            self._silent_write(Command.OK + b'\r\n')
-
-        # Return Identification
-        elif cmd == Command.RETURN_IDENTIFICATION + b'\r':
-            self.echo_command(cmd)
-            self._silent_write(b'4' + b'\r\n\r\n')  # 4 for Iridium 9602 Family
-            self._silent_write(Command.OK + b'\r\n')
-
-        # System Time
-        elif cmd == Command.SYSTEM_TIME + b'\r':
-            self.echo_command(cmd)
-            # Network Time - I have no idea if this is right. Maybe just have a counter of total seconds running?
-            # Find the time now minus the epoch in hex
-            t = ((datetime.datetime.utcnow() - self.IRIDIUM_EPOCH).total_seconds()) * 1000 / 90
-            h = hex(int(t))[2:]
-            self._silent_write(b"-MSSTM: " + h.encode("utf-8").zfill(8) + b'\r\n\r\n')
-            self._silent_write(Command.OK + b'\r\n')
-
-        # Signal Quality
-        elif cmd == Command.SIGNAL_QUALITY + b'\r':
-            self.echo_command(cmd)
-            # Request signal strength
-            msg = b''.join((b"+CSQ:",
-                            str(self._signal_quality).encode("utf-8"),  # Signal threshold is 2, max is 5
-                            b'\r\n\r\n',  # End the message
-                            ))
-            self._silent_write(msg)
-            self._silent_write(Command.OK + b'\r\n')
-
-        # Serial Number
-        elif cmd == Command.SERIAL_NUMBER + b'\r':
-            self.echo_command(cmd)
-            # Serial Number/IMEI number
-            self._silent_write(str(self._serial_number).encode('utf_8') + b'\r\n\r\n')
-            self._silent_write(Command.OK + b'\r\n')
-
-        # Clear MO Buffer
-        elif cmd == Command.CLEAR_MO_BUFFER + b'\r':
-            self.echo_command(cmd)
-            # Respond with success
-            self._silent_write(b'0' + b'\r\n\r\n')
-            self._silent_write(Command.OK + b'\r\n')
-
-        # Check Ring
-        elif cmd == Command.CHECK_RING + b'\r':
-            self.echo_command(cmd)
-            # Check the ring message
-            msg = b''.join((b"+CRIS: ",  # Ring response
-                            b'0,',  # Telephone 0
-                            str(len(self._write_queue)).encode("utf-8"),  # SBD ring indication status
-                            b'\r\n\r\n'  # End the message
-                            ))
-            self._silent_write(msg)
-            self._silent_write(Command.OK + b'\r\n')
-
-        # Session
-        elif cmd == Command.SESSION + b'\r':
-            self.echo_command(cmd)
-            # Session
-            mt_status = int(len(self._write_queue) > 0)
-            try:
-                mt_len = len(self._write_queue[0])
-                queue_len = len(self._write_queue)-1
-            except IndexError:
-                mt_len = 0
-                queue_len = 0
-
-            msg = b''.join((b'+SBDIX: ',
-                            str(self._mo_status).encode("utf-8"), b',',  # MO Status
-                            str(self._session_counter).encode("utf-8"), b',',
-                            str(mt_status).encode("utf-8"), b',',
-                            str(self._mt_msn).encode("utf-8"), b',',
-                            str(mt_len).encode("utf-8"), b',',
-                            str(queue_len).encode("utf-8"),
-                            b'\r\n\r\n'
-                            ))
-            self._silent_write(msg)
-
-            self._session_counter = (self._session_counter + 1) & 0xffff
-            self._mt_msn = (self._mt_msn + 1) & 0xffff
-            self._mo_status = 0
-
-            self._silent_write(Command.OK + b'\r\n')
-
-        # Read Binary
-        elif cmd == Command.READ_BINARY + b'\r':
-            # Read Binary Data
-            if len(self._write_queue) > 0:
-                msg = self._write_queue.popleft()
-                msg_len = len(msg).to_bytes(2, 'big')
-                checksum = int(sum(msg)).to_bytes(4, 'big')[2:]  # smallest 2 bytes of the sum
-                self._silent_write(b''.join((b'AT+SBDRB\r', msg_len, msg, checksum, b'\r\n\r\n')))
-
-            self._silent_write(Command.OK + b'\r\n')
-
-        # Write Binary
-        elif cmd.startswith(Command.WRITE_BINARY):
-            # Read the length from write binary and return a READY for the device to send data
-            data = cmd.replace(Command.WRITE_BINARY, b'').strip()
-            self.echo_command(cmd)
-
-            try:
-                length = int(data.decode("utf-8"))  # length of the expected message
-
-                # Read for the Binary data
-                self._silent_write(Command.READY + b'\r\n')
-
-                # Read the Contents of the Write Binary message
-                # Note: this section cannot be in the main read loop because b'\r' can be in the contents of the message
-                msg = self.read_serial()
-                start = time.time()
-                while len(msg) < length + 2:
-                    # Prevent running forever
-                    if time.time() - start < 60:
-                        self._mo_status = 18
-                        self._silent_write(Command.OK + b'\r\n')
-                        raise IridiumError("Timeout on Write Binary")
-
-                    msg += self.read_serial()
-                    
-                # Successful write binary command with the correct length
-                contents = msg[:-2]
-                checksum = msg[-2:]
-                calc_check = int(sum(contents)).to_bytes(4, 'big')[2:]  # smallest 2 bytes of the sum
-                if checksum == calc_check:
-                    # This is were a read Iridium modem would send the message
-                    self.write_iridium(b''.join((str(length).encode("utf-8"), contents, checksum)))
-
-                    self._mo_status = 1  # Success
-                    self._silent_write(b'\r\n')
-                    self._silent_write(b'0' + b'\r\n')  # Success
-
-                else:
-                    self._mo_status = 18  # Connect lost (RF drop). I don't think there is a checksum fail message
-
-                    self._silent_write(b'\r\n')
-                    self._silent_write(b'18' + b'\r\n')  # Error
-
-                self._silent_write(b'\r\n')
-                self._silent_write(Command.OK + b'\r\n')
-
-            except IridiumError:
-                self._mo_status = 10  # Gateway reported that the call did not complete in the allowed time.
-
-                # Message failed
-                self._silent_write(b'\r\n')
-                self._silent_write(b'10' + b'\r\n')  # Error
-                self._silent_write(b'\r\n')
-                self._silent_write(Command.OK + b'\r\n')
-
-            except:
-                self._mo_status = 14  # Invalid segment size.
-
-                # Message failed
-                self._silent_write(b'\r\n')
-                self._silent_write(b'14' + b'\r\n')  # Error
-                self._silent_write(b'\r\n')
-                self._silent_write(Command.OK + b'\r\n')
-
-        # Message with no action
-        elif self._read_buf.endswith(b'\r'):
-            self.echo_command(cmd)
-            self._silent_write(Command.OK + b'\r\n')
+        """Return the response to one command from the client. The modem calls this for every command.
+
+        Args:
+            cmd (bytes): Command without the b'\r'.
+
+        Returns:
+            response (bytes): Bytes to write to the client. The modem answers unknown commands with b''.
+        """
+        return self._handle_command(cmd.rstrip(b'\r'))
     # end check_incoming
 # end class IridiumServer
 
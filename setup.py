@@ -79,6 +79,8 @@ if __name__ == "__main__":
               'pyserial>=3.4',
               ],
           extras_require={
+              'zstd': ['zstandard'],
+              'numpy': ['numpy'],
               },
 
           # entry_points={
@@ -0,0 +1,95 @@
+"""
+    test.benchmark_batch
+    SeaLandAire Technologies
+    @author: jengel
+
+Decode a directory of synthetic captures with `decode_batch` in one process and with a process pool. Half of the files
+are raw captures from `benchmark_replay` and half are framed captures written with the `CaptureWriter`. The records
+must match for both modes and formats, every read binary message must be decoded with a good checksum and the corrupted
+message in each file must be reported as a checksum failure.
+
+Run with `python tests/benchmark_batch.py [file count] [file KB]`
+"""
+import os
+import sys
+import csv
+import json
+import tempfile
+import multiprocessing
+
+from pyiridium9602 import CaptureWriter, decode_batch, iter_capture, SEGMENT_COMMAND, SEGMENT_WRITTEN
+from benchmark_replay import make_capture
+
+
+def corrupt(capture):
+    """Flip the last checksum byte of the first read binary response."""
+    idx = capture.index(b'AT+SBDRB\rAT+SBDRB\r') + 18
+    end = idx + 2 + int.from_bytes(capture[idx: idx + 2], 'big') + 1
+    return capture[:end] + bytes([capture[end] ^ 0xFF]) + capture[end + 1:]
+
+
+def write_framed(filename, capture):
+    """Write the raw capture as a framed capture. Commands are writes and everything else is read."""
+    with CaptureWriter(filename) as writer:
+        for kind, command, start, end in iter_capture(capture):
+            if kind == SEGMENT_COMMAND or kind == SEGMENT_WRITTEN:
+                writer.record_write(capture[start: end])
+            else:
+                writer.record_read(capture[start: end])
+
+
+def make_files(directory, count, size):
+    messages = 0
+    for i in range(count):
+        capture, file_messages, _ = make_capture(size, seed=i)
+        capture = corrupt(capture)
+        messages += len(file_messages)
+        if i % 2:
+            write_framed(os.path.join(directory, 'unit{:04d}.cap'.format(i)), capture)
+        else:
+            with open(os.path.join(directory, 'unit{:04d}.log'.format(i)), 'wb') as file:
+                file.write(capture)
+    return messages
+
+
+def load(filename):
+    if filename.endswith('.csv'):
+        with open(filename, newline='') as file:
+            return sorted(tuple(row) for row in csv.reader(file))[:-1]  # Header sorts last
+    with open(filename) as file:
+        return sorted(tuple((k, v) for k, v in json.loads(line).items() if k != 'time') for line in file)
+
+
+def run(count=200, size_kb=100):
+    with tempfile.TemporaryDirectory() as tmp:
+        captures = os.path.join(tmp, 'captures')
+        os.mkdir(captures)
+        messages = make_files(captures, count, size_kb * 1000)
+        print("{} captures of {} KB with {:,} read binary messages on {} CPUs".format(
+            count, size_kb, messages, multiprocessing.cpu_count()))
+
+        outputs = {}
+        for processes in (1, None):
+            for fmt in ('jsonl', 'csv'):
+                output = os.path.join(tmp, 'records_{}.{}'.format(processes, fmt))
+                result = decode_batch([captures], output, processes=processes)
+                outputs[(processes, fmt)] = output
+                print("{:<10} {:<6} {:>8.1f} files/s {:>10,.0f} records/s ({:,} records, {} failures)".format(
+                    "1 process" if processes == 1 else "pool", fmt, result.files_per_sec, result.records_per_sec,
+                    result.records, result.failures))
+
+        with open(outputs[(1, 'jsonl')]) as file:
+            records = [json.loads(line) for line in file]
+        mt = [r for r in records if r['type'] == 'mt_message']
+        failed = sum(not r['checksum_ok'] for r in mt)
+        print("Read binary messages decoded: {} of {}. Checksum failures found: {} of {}".format(
+            len(mt), messages, failed, count))
+        same = load(outputs[(1, 'jsonl')]) == load(outputs[(None, 'jsonl')]) and \
+            load(outputs[(1, 'csv')]) == load(outputs[(None, 'csv')])
+        print("Pool records match: {}".format(same))
+        return same and len(mt) == messages and failed == count
+
+
+if __name__ == "__main__":
+    success = run(*(int(arg) for arg in sys.argv[1:3]))
+    sys.exit(0 if success else 1)
@@ -0,0 +1,92 @@
+"""
+    test.benchmark_check_io
+    SeaLandAire Technologies
+    @author: jengel
+
+Measure the bytes per second that can be pushed through `IridiumCommunicator.check_io`. No serial port is needed.
+
+Run with `python tests/benchmark_check_io.py`
+"""
+import time
+
+import pyiridium9602
+from pyiridium9602 import Command, IridiumCommunicator
+
+
+def silent_communicator():
+    """Return a communicator that does not print or write anything."""
+    iridium_port = IridiumCommunicator()
+    iridium_port.signal.notification = lambda *args: None
+    iridium_port.write_serial = lambda msg: None
+    return iridium_port
+
+
+def read_binary_response(size):
+    """Return the bytes the modem responds with for a read binary command with a payload of the given size."""
+    content = bytes(i & 0xFF for i in range(size))
+    checksum = int(sum(content)).to_bytes(4, 'big')[2:]
+    return b''.join((b'AT+SBDRB\r', len(content).to_bytes(2, 'big'), content, checksum, b'\r\n\r\nOK\r\n'))
+
+
+def chunk(data, size):
+    """Split the data into chunks of the given size."""
+    return [data[i: i+size] for i in range(0, len(data), size)]
+
+
+def bench_read_binary(payload_size=32768, chunk_size=16, repeat=5):
+    """Feed large read binary responses in small chunks while the read binary command is pending."""
+    iridium_port = silent_communicator()
+    received = []
+    iridium_port.signal.message_received = received.append
+    chunks = chunk(read_binary_response(payload_size), chunk_size)
+    total = sum(len(c) for c in chunks) * repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        iridium_port._previous_command = Command.READ_BINARY
+        for c in chunks:
+            iridium_port.check_io(c)
+    elapsed = time.perf_counter() - start
+    assert len(received) == repeat, "Messages were not received!"
+    return total, elapsed
+
+
+def bench_echo_lines(lines=20000):
+    """Feed many short unsolicited lines like a chatty modem with echo on and no pending command."""
+    iridium_port = silent_communicator()
+    data = [b'AT+CSQ\r\r\n', b'+CSQ:5\r\n', b'\r\n', b'OK\r\n'] * (lines // 4)
+    total = sum(len(d) for d in data)
+
+    start = time.perf_counter()
+    for d in data:
+        iridium_port.check_io(d)
+    elapsed = time.perf_counter() - start
+    return total, elapsed
+
+
+def bench_pending_lines(lines=20000):
+    """Feed many short lines while a command is waiting for its OK."""
+    iridium_port = silent_communicator()
+    data = [b'+CSQ:5\r\n'] * lines + [b'OK\r\n']
+    total = sum(len(d) for d in data)
+
+    start = time.perf_counter()
+    iridium_port._previous_command = Command.SIGNAL_QUALITY
+    for d in data:
+        iridium_port.check_io(d)
+    elapsed = time.perf_counter() - start
+    assert iridium_port.pending_command() is None, "The command did not finish!"
+    return total, elapsed
+
+
+def report(name, total, elapsed):
+    print("{:<40} {:>12,.0f} bytes/sec ({:,} bytes in {:.3f} sec)".format(name, total / elapsed, total, elapsed))
+
+
+if __name__ == "__main__":
+    print("pyiridium9602", pyiridium9602.__version__)
+    for size in (1024, 8192, 32768):
+        report("read binary {} bytes, 16 byte chunks".format(size), *bench_read_binary(size, 16))
+    report("read binary 32768 bytes, 256 byte chunks", *bench_read_binary(32768, 256))
+    report("unsolicited echo lines", *bench_echo_lines())
+    report("pending command lines", *bench_pending_lines())
@@ -0,0 +1,118 @@
+"""
+    test.benchmark_checksum
+    SeaLandAire Technologies
+    @author: jengel
+
+Microbenchmarks for the SBD checksum.
+
+  * `checksum` against the old `int(sum(content)).to_bytes(4, 'big')[2:]` for one message.
+  * `Checksum` updated with serial port sized reads against one `sum()` after the last read.
+  * The time for the `check_io` call with the last byte of a read binary response. The checksum is already calculated
+    when the last byte arrives, so only the last read is summed. The full sum is forced by resetting the incremental
+    state before the last read.
+  * `checksum_batch` and `verify_checksums` with NumPy (if installed) against a Python loop for log analysis.
+
+Run with `python tests/benchmark_checksum.py`
+"""
+import time
+import random
+import timeit
+
+from pyiridium9602 import Command, IridiumCommunicator, checksum, Checksum, checksum_batch, verify_checksums
+from pyiridium9602 import pyiridium_checksum
+
+
+def report(name, seconds, count, unit="us", scale=1e6):
+    print("{:<60} {:>10.3f} {}".format(name, seconds / count * scale, unit))
+
+
+def bench_single(sizes=(270, 340, 4096), number=20000):
+    for size in sizes:
+        content = bytes(i & 0xFF for i in range(size))
+        assert checksum(content) == int(sum(content)).to_bytes(4, 'big')[2:]
+        old = timeit.timeit(lambda: int(sum(content)).to_bytes(4, 'big')[2:], number=number)
+        new = timeit.timeit(lambda: checksum(content), number=number)
+        report("{} bytes int(sum()).to_bytes(4)[2:]".format(size), old, number)
+        report("{} bytes checksum()".format(size), new, number)
+
+
+def bench_incremental(size=4096, read_size=16, number=2000):
+    content = bytes(i & 0xFF for i in range(size))
+    reads = [content[i: i+read_size] for i in range(0, size, read_size)]
+
+    def incremental():
+        check = Checksum()
+        for data in reads:
+            check.update(data)
+        return check.digest()
+
+    assert incremental() == checksum(content)
+    report("{} bytes Checksum.update() per {} byte read (total)".format(size, read_size),
+           timeit.timeit(incremental, number=number), number)
+    report("{} bytes sum() once after the last read".format(size),
+           timeit.timeit(lambda: checksum(b''.join(reads)), number=number), number)
+
+
+def bench_last_byte(size=4096, read_size=16, repeat=500):
+    """Return the time for the check_io call that receives the last bytes of the read binary response."""
+    content = bytes(random.Random(size).getrandbits(8) for _ in range(size))
+    response = b''.join((b'AT+SBDRB\r', len(content).to_bytes(2, 'big'), content, checksum(content),
+                         b'\r\n\r\nOK\r\n'))
+    reads = [response[i: i+read_size] for i in range(0, len(response) - 8, read_size)]
+    last = response[sum(map(len, reads)):]
+
+    iridium_port = IridiumCommunicator()
+    iridium_port.signal.notification = lambda *args: None
+    iridium_port.write_serial = lambda msg: None
+    received = []
+    iridium_port.signal.message_received = received.append
+
+    results = {}
+    for name, reset in (("incremental", False), ("sum at the end", True)):
+        elapsed = 0
+        for _ in range(repeat):
+            iridium_port._previous_command = Command.READ_BINARY
+            for data in reads:
+                iridium_port.check_io(data)
+            if reset:
+                iridium_port._read_binary_check = None
+            start = time.perf_counter()
+            iridium_port.check_io(last)
+            elapsed += time.perf_counter() - start
+        results[name] = elapsed
+        report("{} bytes last read to message_received ({})".format(size, name), elapsed, repeat)
+    assert len(received) == 2 * repeat and all(msg == content for msg in received)
+    return results
+
+
+def bench_batch(count=100000, seed=9602):
+    rand = random.Random(seed)
+    payloads = [bytes(rand.getrandbits(8) for _ in range(rand.randint(0, 340))) for _ in range(count // 10)] * 10
+    checksums = [checksum(p) for p in payloads]
+
+    start = time.perf_counter()
+    loop = [checksum(p) for p in payloads]
+    report("{} messages [checksum(p) for p in payloads]".format(count), time.perf_counter() - start, count)
+
+    start = time.perf_counter()
+    batch = checksum_batch(payloads)
+    report("{} messages checksum_batch() {}".format(
+        count, "NumPy" if pyiridium_checksum.numpy is not None else "(NumPy is not installed)"),
+        time.perf_counter() - start, count)
+    assert batch == loop
+
+    start = time.perf_counter()
+    valid = [checksum(p) == c for p, c in zip(payloads, checksums)]
+    report("{} messages verify with a Python loop".format(count), time.perf_counter() - start, count)
+
+    start = time.perf_counter()
+    assert verify_checksums(payloads, checksums) == valid
+    report("{} messages verify_checksums()".format(count), time.perf_counter() - start, count)
+
+
+if __name__ == "__main__":
+    bench_single()
+    bench_incremental()
+    bench_last_byte(270)
+    bench_last_byte(4096)
+    bench_batch()
@@ -0,0 +1,106 @@
+"""
+    test.benchmark_codec
+    SeaLandAire Technologies
+    @author: jengel
+
+Measure the compression ratio, the encode and decode time per message and the SBD sessions saved by `MessageCodec`
+over a message corpus. The dictionaries are trained on the first half of the corpus and measured on the second half.
+
+A recorded corpus can be given as a file with one message per line. Otherwise a telemetry corpus is generated.
+
+Run with `python tests/benchmark_codec.py [corpus file]`
+"""
+import sys
+import time
+import random
+
+from pyiridium9602 import MessageCodec, train_dictionary, CODEC_ZLIB, CODEC_LZMA, CODEC_ZSTD
+from pyiridium9602.pyiridium_codec import zstandard
+
+
+MO_LIMIT = 340
+
+
+def telemetry_corpus(count=2000, seed=9602):
+    """Return position and status reports like a tracking buoy would send."""
+    rand = random.Random(seed)
+    lat, lon = 27.9506, -82.4572
+    messages = []
+    for i in range(count):
+        lat += rand.uniform(-0.001, 0.001)
+        lon += rand.uniform(-0.001, 0.001)
+        if i % 5 == 0:
+            msg = ('{{"type":"status","id":"BUOY-0042","seq":{},"battery_v":{:.2f},"temp_c":{:.1f},'
+                   '"humidity":{},"errors":[],"mode":"{}"}}').format(
+                i, rand.uniform(11.5, 13.2), rand.uniform(18, 31), rand.randint(40, 95),
+                rand.choice(("normal", "normal", "normal", "low_power")))
+        else:
+            msg = "$POS,BUOY-0042,{},2026-10-16T{:02d}:{:02d}:{:02d}Z,{:.5f},{:.5f},{:.1f},{:.1f},{},OK".format(
+                i, (i // 3600) % 24, (i // 60) % 60, i % 60, lat, lon, rand.uniform(0, 3), rand.uniform(0, 360),
+                rand.randint(3, 12))
+        messages.append(msg.encode())
+    return messages
+
+
+def sessions(sizes):
+    """Return the number of sessions for one message per session and for messages packed together."""
+    per_message = sum((size + MO_LIMIT - 1) // MO_LIMIT for size in sizes)
+    packed = (sum(sizes) + MO_LIMIT - 1) // MO_LIMIT
+    return per_message, packed
+
+
+def measure(codec, messages):
+    """Return the encoded sizes and the encode and decode seconds per message."""
+    start = time.perf_counter()
+    encoded = [codec.encode(msg) for msg in messages]
+    encode_time = (time.perf_counter() - start) / len(messages)
+
+    start = time.perf_counter()
+    decoded = [codec.decode(msg) for msg in encoded]
+    decode_time = (time.perf_counter() - start) / len(messages)
+    assert decoded == messages, "The messages did not decode correctly!"
+    return [len(msg) for msg in encoded], encode_time, decode_time
+
+
+def run(messages):
+    half = len(messages) // 2
+    train, test = messages[:half], messages[half:]
+
+    start = time.perf_counter()
+    dictionary = train_dictionary(train, 1024)
+    train_time = time.perf_counter() - start
+
+    codecs = [("zlib", MessageCodec((CODEC_ZLIB,))),
+              ("zlib + dictionary", MessageCodec((CODEC_ZLIB,), {1: dictionary})),
+              ("lzma", MessageCodec((CODEC_LZMA,))),
+              ]
+    if zstandard is not None:
+        codecs.append(("zstd", MessageCodec((CODEC_ZSTD,))))
+        codecs.append(("zstd + dictionary", MessageCodec((CODEC_ZSTD,), {1: dictionary})))
+        codecs.append(("best + dictionary", MessageCodec((CODEC_ZLIB, CODEC_ZSTD), {1: dictionary})))
+
+    raw_sizes = [len(msg) for msg in test]
+    raw_total = sum(raw_sizes)
+    raw_sessions = sessions(raw_sizes)
+    print("{} messages ({} test), {:.1f} bytes per message. {} byte dictionary trained in {:.2f} sec".format(
+        len(messages), len(test), raw_total / len(test), len(dictionary), train_time))
+    print("{:<20} {:>7} {:>11} {:>11} {:>20} {:>18}".format(
+        "codec", "ratio", "encode us", "decode us", "sessions per msg", "sessions packed"))
+    print("{:<20} {:>7.3f} {:>11} {:>11} {:>20} {:>18}".format("raw", 1, "-", "-", *raw_sessions))
+    for name, codec in codecs:
+        sizes, encode_time, decode_time = measure(codec, test)
+        per_message, packed = sessions(sizes)
+        print("{:<20} {:>7.3f} {:>11.1f} {:>11.1f} {:>20} {:>11} ({:>+4})".format(
+            name, sum(sizes) / raw_total, encode_time * 1e6, decode_time * 1e6, per_message, packed,
+            packed - raw_sessions[1]))
+    if zstandard is None:
+        print("zstd was skipped. Install the zstandard package to measure it.")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as file:
+            corpus = [line.rstrip(b'\r\n') for line in file if line.strip()]
+    else:
+        corpus = telemetry_corpus()
+    run(corpus)
@@ -0,0 +1,77 @@
+"""
+    test.benchmark_exchange
+    SeaLandAire Technologies
+    @author: jengel
+
+Measure the wall time per message of `IridiumCommunicator.exchange` against an `IridiumServer` over a pseudo terminal.
+The single transaction is compared with writing the message, then running a session and reading the received message
+as separate blocking steps.
+
+Run with `python tests/benchmark_exchange.py [messages]` (Linux/macOS only).
+"""
+import sys
+import time
+import threading
+import statistics
+
+from pyiridium9602 import Command, back_to_back
+
+
+def separate_steps(client, message):
+    """Write the message, then run a session that reads the received message, waiting for each step."""
+    client.wait_request(client.queue_send_message(message))
+    request = client.acquire_request(Command.SESSION, options={'auto_read': False})
+    read = [r for r in request.follow_ups if r.command == Command.READ_BINARY]
+    return request.value[1], read[0].value[1] if read else None
+
+
+def single_exchange(client, message):
+    """Write the message, run a session and read the received message as one transaction."""
+    result = client.exchange(message)
+    return result.mo_msn, result.mt_payload
+
+
+def measure(server, client, func, count):
+    """Return the wall time in seconds of each message exchange. Every other exchange receives a message."""
+    times = []
+    for i in range(count):
+        expected = None
+        if i % 2 == 0:
+            expected = "mt {}".format(i).encode()
+            server._write_queue.append(expected)
+
+        start = time.perf_counter()
+        mo_msn, mt_payload = func(client, "mo {}".format(i))
+        times.append(time.perf_counter() - start)
+        assert mt_payload == expected, (mt_payload, expected)
+    return sorted(times)
+
+
+def busy(client, stop):
+    """Keep asking for the signal quality like another part of the program that shares the modem."""
+    while not stop.is_set():
+        client.acquire_signal_quality(wait_time=5)
+
+
+if __name__ == "__main__":
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    loopback = back_to_back('pty', options={'ring_alerts': False})
+    iridium_server, iridium_client = loopback.server, loopback.communicator
+    try:
+        for num_busy in (0, 4):
+            stop_busy = threading.Event()
+            busy_threads = [threading.Thread(target=busy, args=(iridium_client, stop_busy)) for _ in range(num_busy)]
+            for th in busy_threads:
+                th.start()
+
+            for name, method in (("separate steps", separate_steps), ("exchange", single_exchange)):
+                results = measure(iridium_server, iridium_client, method, num)
+                print("{:<16} {} busy threads  {} messages  median {:7.3f} ms  p99 {:7.3f} ms  total {:.2f} sec".format(
+                    name, num_busy, num, statistics.median(results) * 1000,
+                    results[int(len(results) * 0.99) - 1] * 1000, sum(results)))
+
+            stop_busy.set()
+            for th in busy_threads:
+                th.join()
+    finally:
+        loopback.close()
@@ -0,0 +1,70 @@
+"""
+    test.benchmark_farm
+    SeaLandAire Technologies
+    @author: jengel
+
+Load test the `EmulatorFarm`. Many `AsyncIridiumCommunicator` clients run in the same event loop as the farm, so the
+farm and the clients share one core. Each client checks that it talks to its own modem (serial number, MOMSN and MT
+queue), then runs signal quality, check ring and session commands as fast as it can. The aggregate command rate of the
+farm is reported for in-memory ports and for pseudo terminals. pyserial ports use select(), which only works with file
+descriptors below 1024, so only some of the pseudo terminal modems get a client when there are many modems.
+
+Run with `python tests/benchmark_farm.py [modems] [seconds]` (the pty transport is Linux/macOS only).
+"""
+import sys
+import time
+import asyncio
+
+from pyiridium9602 import AsyncIridiumCommunicator, EmulatorFarm
+
+
+async def client(farm, modem, end):
+    """Check the modem's identity and counters, then run commands until the end time."""
+    iridium_port = AsyncIridiumCommunicator(modem.port, options={'ring_alerts': False})
+    iridium_port.signal.notification = lambda *args: None
+    await iridium_port.connect()
+    try:
+        mt_message = b'mt for ' + modem.serial_number.encode('utf-8')
+        farm.send_mt(modem, mt_message)
+        await iridium_port.send(b'mo from ' + modem.serial_number.encode('utf-8'))
+        result = await iridium_port.session()
+        received = await iridium_port.messages().__anext__()
+        ok = (await iridium_port.get_serial_number() == modem.serial_number and result[1] == 0 and
+              received == mt_message and list(modem.mo_messages) == [b'mo from ' + modem.serial_number.encode('utf-8')])
+
+        while time.perf_counter() < end:
+            await iridium_port.signal_quality()
+            await iridium_port.ring_status()
+            await iridium_port.session()
+        return ok and modem.mo_msn > 1
+    finally:
+        iridium_port.close()
+# end client
+
+
+async def run_farm(transport, count, seconds, clients=None):
+    farm = EmulatorFarm(transport, {'ring_alerts': False})
+    modems = farm.add_modems(count)
+    farm.attach()
+    try:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(client(farm, modem, start + seconds) for modem in modems[:clients]))
+        stats = farm.stats()
+    finally:
+        farm.close()
+    print("{:<7} {} modems {} clients: {:,} commands in {:.1f} sec = {:,.0f} commands/s. Own serial number, MOMSN and "
+          "MT queue: {}".format(transport, stats.modems, len(results), stats.commands, stats.seconds,
+                                stats.commands_per_sec, all(results)))
+    return all(results)
+# end run_farm
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    success = asyncio.run(run_farm('memory', count, seconds))
+    if sys.platform != 'win32':
+        # Each farm pseudo terminal uses 2 file descriptors and each pyserial client uses 5
+        clients = max(1, min(count, (1000 - 2 * count) // 5))
+        success = asyncio.run(run_farm('pty', count, seconds, clients)) and success
+    sys.exit(0 if success else 1)
@@ -0,0 +1,179 @@
+"""
+    test.benchmark_gateway
+    SeaLandAire Technologies
+    @author: jengel
+
+Measure the end-to-end pipeline through the `DirectIPGateway`. An application server receives the MO messages over TCP
+and sends MT messages to the gateway's MT address. `AsyncIridiumCommunicator` clients talk to an `EmulatorFarm` and
+send an MO message with every session. Every message carries its send time, so the MO latency (client write binary to
+application) and the MT latency (application to client read binary) are measured along with the message rates. Each MO
+message must arrive with the IMEI of its modem and each MT message must be read by the modem it was sent to.
+
+A blocking `IridiumCommunicator` and an `IridiumServer` on a gateway thread are also checked with `exchange`.
+
+Run with `python tests/benchmark_gateway.py [modems] [seconds]`.
+"""
+import sys
+import time
+import asyncio
+import statistics
+
+from pyiridium9602 import AsyncIridiumCommunicator, EmulatorFarm, DirectIPGateway, MOMessage, back_to_back, \
+    encode_mt, read_directip, send_directip
+
+
+def stamp(name, number):
+    """Return a payload with the name, a number and the send time."""
+    return '{} {} {:.9f}'.format(name, number, time.perf_counter()).encode('utf-8')
+
+
+def latency(payload):
+    """Return the seconds since the payload's send time."""
+    return time.perf_counter() - float(payload.rsplit(b' ', 1)[1])
+
+
+def percentiles(values):
+    values = sorted(values) or [0]
+    return "median {:6.1f} ms  p99 {:6.1f} ms".format(statistics.median(values) * 1000,
+                                                      values[int(len(values) * 0.99) - 1] * 1000)
+
+
+class Application(object):
+    """TCP application that receives MO messages and sends MT messages."""
+
+    def __init__(self):
+        self.mo_latencies = []
+        self.mt_latencies = []
+        self.errors = 0
+        self.server = None
+        self.receivers = []
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.receive_mo, '127.0.0.1', 0)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        """Stop accepting and wait for the gateway to close its MO connections."""
+        self.server.close()
+        await asyncio.wait_for(asyncio.gather(*self.receivers), 5)
+
+    async def receive_mo(self, reader, writer):
+        self.receivers.append(asyncio.current_task())
+        while True:
+            message = await read_directip(reader)
+            if message is None:
+                break
+            if not isinstance(message, MOMessage) or not message.payload.startswith(message.imei.encode('utf-8')):
+                self.errors += 1
+            self.mo_latencies.append(latency(message.payload))
+        writer.close()
+
+    async def send_mt(self, address, modems, end):
+        """Send MT messages to the modems in turn on one connection until the end time."""
+        reader, writer = await asyncio.open_connection(*address)
+        number = 0
+        while time.perf_counter() < end:
+            modem = modems[number % len(modems)]
+            writer.write(encode_mt(modem.serial_number, stamp(modem.serial_number, number),
+                                   number.to_bytes(4, 'big')))
+            await writer.drain()
+            confirmation = await read_directip(reader)
+            if not confirmation.success:
+                await asyncio.sleep(0.01)  # Queue full. Wait for the clients to read
+            number += 1
+        writer.close()
+    # end send_mt
+# end class Application
+
+
+async def client(app, modem, end):
+    """Send an MO message with every session and check the received MT messages."""
+    iridium_port = AsyncIridiumCommunicator(modem.port, options={'ring_alerts': False})
+    iridium_port.signal.notification = lambda *args: None
+
+    def message_received(message):
+        if not bytes(message).startswith(modem.serial_number.encode('utf-8')):
+            app.errors += 1
+        app.mt_latencies.append(latency(bytes(message)))
+    iridium_port.signal.message_received = message_received
+
+    await iridium_port.connect()
+    try:
+        number = 0
+        while time.perf_counter() < end:
+            await iridium_port.send(stamp(modem.serial_number, number))
+            await iridium_port.session()
+            number += 1
+    finally:
+        iridium_port.close()
+# end client
+
+
+async def run_pipeline(count, seconds):
+    app = Application()
+    mo_address = await app.start()
+    farm = EmulatorFarm(options={'ring_alerts': False})
+    modems = farm.add_modems(count)
+    gateway = DirectIPGateway(mo_address, ('127.0.0.1', 0))
+    gateway.add_farm(farm)
+    farm.attach()
+    await gateway.start()
+    try:
+        end = time.perf_counter() + seconds
+        gateway.reset_stats()
+        await asyncio.gather(app.send_mt(gateway.mt_address, modems, end),
+                             *(client(app, modem, end) for modem in modems))
+        await asyncio.sleep(0.1)  # Let the last MO messages arrive
+        stats = gateway.stats()
+    finally:
+        await gateway.stop()
+        farm.close()
+        await app.stop()
+
+    success = app.errors == 0 and len(app.mo_latencies) == stats.mo_forwarded > 0 and len(app.mt_latencies) > 0
+    print("{} modems: {:.0f} MO/s ({}), {:.0f} MT/s read ({} queued). Right IMEI: {}".format(
+        count, len(app.mo_latencies) / stats.seconds, stats.mo_forwarded, len(app.mt_latencies) / stats.seconds,
+        stats.mt_queued, success))
+    print("    MO latency {}   MT latency {}".format(percentiles(app.mo_latencies), percentiles(app.mt_latencies)))
+    return success
+# end run_pipeline
+
+
+def check_server(count=100):
+    """Run exchanges with a blocking communicator and an IridiumServer on a gateway thread."""
+    app = Application()
+    app_loop = asyncio.new_event_loop()
+    mo_address = app_loop.run_until_complete(app.start())
+
+    gateway = DirectIPGateway(mo_address, ('127.0.0.1', 0))
+    with back_to_back(options={'ring_alerts': False}) as loop:
+        gateway.add_server(loop.server)
+        gateway.start_thread()
+        try:
+            # The server rings, so the MT message is read by the ring session or the exchange session
+            imei = loop.server._serial_number
+            loop.communicator.signal.message_received = lambda message: app.mt_latencies.append(latency(message))
+            for number in range(count):
+                confirmation = app_loop.run_until_complete(
+                    send_directip(gateway.mt_address, imei, stamp(imei, number)))
+                loop.communicator.exchange(stamp(imei, number), wait_time=5)
+                app.errors += confirmation.status != 1
+            loop.communicator.wait_for_idle(5)
+            app_loop.run_until_complete(asyncio.sleep(0.1))  # Receive the MO messages
+        finally:
+            gateway.close()
+    app_loop.run_until_complete(app.stop())
+    app_loop.close()
+
+    success = app.errors == 0 and len(app.mo_latencies) == len(app.mt_latencies) == count
+    print("server: {} exchanges, MO latency {}   MT latency {}: {}".format(
+        count, percentiles(app.mo_latencies), percentiles(app.mt_latencies), success))
+    return success
+# end check_server
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    results = [check_server(), asyncio.run(run_pipeline(count, seconds))]
+    sys.exit(0 if all(results) else 1)
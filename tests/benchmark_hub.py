@@ -0,0 +1,133 @@
+"""
+    test.benchmark_hub
+    SeaLandAire Technologies
+    @author: jengel
+
+Measure the CPU use and thread count of many modems served by one `IridiumHub` thread compared with a listen thread for
+every modem. The modems are emulated on pseudo terminals by one thread that answers the AT commands, so the emulator
+costs the same in both modes.
+
+Run with `python tests/benchmark_hub.py [seconds]` (Linux/macOS only).
+"""
+import os
+import pty
+import tty
+import sys
+import time
+import selectors
+import threading
+
+import serial
+
+from pyiridium9602 import IridiumCommunicator, IridiumHub
+
+
+RESPONSES = {b'AT+CSQ': b'+CSQ:5\r\n\r\nOK\r\n',
+             b'AT+SBDSX': b'+SBDSX: 0, 0, 0, 0, 0, 0\r\n\r\nOK\r\n',
+             }
+
+
+class ModemEmulator(object):
+    """Answer AT commands for many pseudo terminal masters with one thread."""
+
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.buffers = {}
+        self.commands = 0
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+
+    def add_modem(self):
+        """Return the port name for a new emulated modem."""
+        master, slave = pty.openpty()
+        tty.setraw(master)
+        tty.setraw(slave)
+        self.buffers[master] = b''
+        self.selector.register(master, selectors.EVENT_READ)
+        return os.ttyname(slave)
+
+    def run(self):
+        while True:
+            for key, _ in self.selector.select():
+                fd = key.fd
+                try:
+                    data = self.buffers[fd] + os.read(fd, 4096)
+                except OSError:
+                    self.selector.unregister(fd)
+                    continue
+
+                *lines, self.buffers[fd] = data.split(b'\r')
+                for line in lines:
+                    self.commands += 1
+                    os.write(fd, line + b'\r' + RESPONSES.get(line, b'OK\r\n'))
+# end class ModemEmulator
+
+
+def connect_modems(emulator, count, hub=None):
+    """Connect the given number of communicators to emulated modems with a hub or a listen thread each."""
+    modems = []
+    for _ in range(count):
+        modem = IridiumCommunicator(serial.Serial(emulator.add_modem()))
+        modem.signal.notification = lambda *args: None
+        if hub is not None:
+            hub.register(modem)
+        modem.connect()
+        modems.append(modem)
+    return modems
+
+
+def measure_cpu(modems, duration, rate):
+    """Return the process CPU seconds used per wall second while every modem asks for the signal quality `rate` times
+    per second.
+    """
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    next_time = start
+    while time.perf_counter() - start < duration:
+        for modem in modems:
+            modem.queue_signal_quality()
+        next_time += 1 / rate
+        time.sleep(max(0, next_time - time.perf_counter()))
+    cpu = (time.process_time() - start_cpu) / (time.perf_counter() - start)
+    for modem in modems:
+        modem.wait_for_idle(5)
+    return cpu
+
+
+def measure_idle_cpu(duration):
+    """Return the process CPU seconds used per wall second while nothing is happening."""
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    time.sleep(duration)
+    return (time.process_time() - start_cpu) / (time.perf_counter() - start)
+
+
+def run(emulator, count, use_hub, duration=3, rate=10):
+    hub = None
+    if use_hub:
+        hub = IridiumHub()
+        hub.start()
+
+    modems = connect_modems(emulator, count, hub)
+    try:
+        threads = threading.active_count()
+        idle = measure_idle_cpu(duration)
+        start_commands = emulator.commands
+        busy = measure_cpu(modems, duration, rate)
+        commands = emulator.commands - start_commands
+        print("{:<16} {:>3} modems  threads {:>3}  idle CPU {:6.2%}  {:>4.0f} cmds/sec CPU {:6.2%}".format(
+            "hub" if use_hub else "thread per modem", count, threads, idle, commands / duration, busy))
+    finally:
+        for modem in modems:
+            modem.close()
+        if hub is not None:
+            hub.close()
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    modem_emulator = ModemEmulator()
+    modem_emulator.thread.start()
+    for num in (1, 16, 64):
+        run(modem_emulator, num, False, seconds)
+        run(modem_emulator, num, True, seconds)
@@ -0,0 +1,116 @@
+"""
+    test.benchmark_lexer
+    SeaLandAire Technologies
+    @author: jengel
+
+Measure the response parser throughput over synthetic +SBDIX, +CSQ, +CRIS and -MSSTM responses. The parse functions
+are compared with the implementations that decoded and split each response before `ResponseLexer`. `lex_responses`
+lexes the same responses joined into one capture in one pass.
+
+Run with `python tests/benchmark_lexer.py [response count]`
+"""
+import sys
+import time
+import random
+
+from pyiridium9602 import IridiumError, parse_session, parse_signal_quality, parse_check_ring, parse_system_time, \
+    lex_responses
+
+
+def legacy_parse(data, tag, convert):
+    """strip, find, slice and decode like the parse functions did before the lexer."""
+    resp = data.strip()
+    idx = resp.find(tag)
+    if idx >= 0:
+        resp = resp[idx + len(tag):].strip()
+        endline = resp.find(b'\n')
+        if endline >= 0:
+            resp = resp[:endline].strip()
+        return convert(resp.decode("utf-8"))
+    raise IridiumError("Could not parse!")
+
+
+def legacy_session(text):
+    parts = text.split(",")
+    return int(parts[0]), int(parts[1]), int(parts[2]), int(parts[3]), int(parts[4]), int(parts[5])
+
+
+def legacy_ring(text):
+    parts = text.split(",")
+    return int(parts[0]), int(parts[1])
+
+
+def legacy_system_time(text):
+    if len(text) < 8:
+        raise ValueError(text)
+    return int(text, 16)
+
+
+PARSERS = {b'SBDIX': (parse_session, lambda d: legacy_parse(d, b"+SBDIX:", legacy_session)),
+           b'CSQ': (parse_signal_quality, lambda d: legacy_parse(d, b"+CSQ:", int)),
+           b'CRIS': (parse_check_ring, lambda d: legacy_parse(d, b"+CRIS:", legacy_ring)),
+           b'MSSTM': (parse_system_time, lambda d: legacy_parse(d, b"-MSSTM:", legacy_system_time)),
+           }
+
+
+def make_responses(count, seed=9602):
+    """Return a list of (kind, response bytes) like a field unit that polls the signal and runs sessions."""
+    rand = random.Random(seed)
+    responses = []
+    msn = 0
+    sys_time = 0x1a2b3c00
+    for _ in range(count):
+        kind = rand.choice((b'CSQ', b'CSQ', b'CRIS', b'SBDIX', b'MSSTM'))
+        if kind == b'CSQ':
+            data = b'AT+CSQ\r+CSQ:%d\r\n\r\n' % rand.randint(0, 5)
+        elif kind == b'CRIS':
+            data = b'AT+CRIS\r+CRIS: 0,%d\r\n\r\n' % (rand.random() < 0.1)
+        elif kind == b'SBDIX':
+            msn += 1
+            mt_status = rand.random() < 0.2
+            data = b'AT+SBDIX\r+SBDIX: %d, %d, %d, %d, %d, %d\r\n\r\n' % (
+                rand.choice((0, 0, 0, 32, 18)), msn, mt_status, msn // 3, rand.randint(1, 270) * mt_status,
+                rand.randint(0, 2) * mt_status)
+        else:
+            sys_time += rand.randint(1, 1000)
+            data = b'AT-MSSTM\r-MSSTM: %08x\r\n\r\n' % sys_time
+        responses.append((kind, data))
+    return responses
+
+
+def run(count=1000000):
+    responses = make_responses(count)
+    by_kind = {}
+    for kind, data in responses:
+        by_kind.setdefault(kind, []).append(data)
+
+    print("{:,} responses".format(count))
+    print("{:<10} {:>10} {:>16} {:>16} {:>9}".format("response", "count", "legacy resp/s", "lexer resp/s", "speedup"))
+    for kind, items in sorted(by_kind.items()):
+        new, legacy = PARSERS[kind]
+        assert [tuple(v) if isinstance(v, tuple) else v for v in map(new, items[:10000])] == \
+            list(map(legacy, items[:10000]))
+
+        start = time.perf_counter()
+        for data in items:
+            legacy(data)
+        legacy_rate = len(items) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for data in items:
+            new(data)
+        new_rate = len(items) / (time.perf_counter() - start)
+        print("{:<10} {:>10,} {:>16,.0f} {:>16,.0f} {:>8.2f}x".format(
+            kind.decode(), len(items), legacy_rate, new_rate, new_rate / legacy_rate))
+
+    capture = b''.join(b'%s\r\nOK\r\n' % data for _, data in responses)
+    start = time.perf_counter()
+    lexed = sum(1 for _ in lex_responses(capture))
+    elapsed = time.perf_counter() - start
+    assert lexed == count
+    print("lex_responses over a {:,.1f} MB capture: {:,.0f} responses/s, {:.1f} MB/s".format(
+        len(capture) / 1e6, lexed / elapsed, len(capture) / elapsed / 1e6))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,106 @@
+"""
+    test.benchmark_listen
+    SeaLandAire Technologies
+    @author: jengel
+
+Measure the idle CPU use and the command response latency of `IridiumCommunicator.listen` against an `IridiumServer`
+over a pseudo terminal. The select based listen is compared with the readline polling listen.
+
+Run with `python tests/benchmark_listen.py` (Linux/macOS only).
+"""
+import time
+import threading
+import statistics
+
+from pyiridium9602 import back_to_back
+
+
+def start_listening(iridium_port, use_select):
+    """Start the listen thread with the given mode and wait for it to be listening."""
+    th = threading.Thread(target=iridium_port.listen, args=(use_select,))
+    th.daemon = True
+    th.start()
+    while not iridium_port.is_listening():
+        time.sleep(0.001)
+    iridium_port.listen_thread = th
+
+
+def connect_pair(use_select):
+    """Connect an IridiumServer and an IridiumCommunicator through two bridged pseudo terminals."""
+    loopback = back_to_back('pty', connect=False)
+    start_listening(loopback.server, use_select)
+    loopback.server.connect()
+    start_listening(loopback.communicator, use_select)
+    loopback.communicator.connect()
+    return loopback
+
+
+def measure_idle_cpu(duration=3):
+    """Return the process CPU seconds used per wall second while nothing is happening."""
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    time.sleep(duration)
+    return (time.process_time() - start_cpu) / (time.perf_counter() - start)
+
+
+def measure_latency(client, count=200):
+    """Return the signal quality request to callback latencies in seconds."""
+    received = threading.Event()
+    client.signal.signal_quality_updated = lambda sig: received.set()
+
+    latencies = []
+    for _ in range(count):
+        received.clear()
+        start = time.perf_counter()
+        client.request_signal_quality()
+        received.wait(5)
+        latencies.append(time.perf_counter() - start)
+
+        # Wait for the command to clear before the next request
+        client.wait_for_idle(5)
+    return latencies
+
+
+def measure_acquire_latency(client, count=200):
+    """Return the latencies in seconds of the blocking `acquire_signal_quality` method."""
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.acquire_signal_quality(wait_time=5)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def measure_waiting_cpu(client, duration=2):
+    """Return the process CPU seconds used per wall second while a thread waits for a command that never finishes."""
+    client.previous_command = b'AT+WAIT'  # Pending command that was never written, so it never finishes
+    start_cpu = time.process_time()
+    start = time.perf_counter()
+    with client.wait_for_command(duration, wait_for_previous=0):
+        pass
+    cpu = (time.process_time() - start_cpu) / (time.perf_counter() - start)
+    client.previous_command = None
+    return cpu
+
+
+def run(use_select):
+    name = "select listen" if use_select else "readline polling listen"
+    loopback = connect_pair(use_select)
+    client = loopback.communicator
+    try:
+        idle = measure_idle_cpu()
+        latencies = sorted(measure_latency(client))
+        print("{:<25} idle CPU {:6.2%}   latency median {:7.3f} ms   p99 {:7.3f} ms".format(
+            name, idle, statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000))
+
+        latencies = sorted(measure_acquire_latency(client))
+        waiting = measure_waiting_cpu(client)
+        print("{:<25} wait CPU {:6.2%}   acquire median {:7.3f} ms   p99 {:7.3f} ms".format(
+            "", waiting, statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000))
+    finally:
+        loopback.close()
+
+
+if __name__ == "__main__":
+    run(False)
+    run(True)
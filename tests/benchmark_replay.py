@@ -0,0 +1,143 @@
+"""
+    test.benchmark_replay
+    SeaLandAire Technologies
+    @author: jengel
+
+Replay synthetic serial captures with the memory mapped `ReplayEngine` and with the loop `run_serial_log_file` used
+before, which copied the rest of the capture after every command. The captures have signal quality, session, read
+binary and write binary commands. The binary messages contain b'AT', b'OK' and b'READY' to check that they do not split
+the commands. Every message must be received exactly and every command must finish successfully.
+
+Run with `python tests/benchmark_replay.py [capture MB]`
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+
+from pyiridium9602 import Command, IridiumCommunicator, ReplayEngine, iter_capture, has_read_binary_data, checksum
+
+
+def legacy_replay(buffer, communicator):
+    """Walk the capture like `run_serial_log_file` did before the `ReplayEngine`."""
+    while len(buffer) > 0:
+        at_idx = buffer.find(b'AT')
+        if at_idx == -1:
+            break
+
+        end_idx = buffer[at_idx:].find(b'\r')
+        newline_idx = buffer[at_idx:].find(b'\n')
+        if end_idx + 2 < newline_idx:
+            previous_data = buffer[:at_idx]
+            if previous_data != b"":
+                communicator.check_io(previous_data)
+            cmd = buffer[at_idx: at_idx+end_idx]
+            buffer = buffer[at_idx+end_idx+1:]
+
+            ok_idx = buffer.find(Command.OK)
+            if ok_idx == -1:
+                break
+
+            data = buffer[:ok_idx+2]
+            buffer = buffer[ok_idx+2:]
+            if cmd == Command.READ_BINARY:
+                while not has_read_binary_data(data) and Command.OK in buffer:
+                    ok_idx = buffer.index(Command.OK)
+                    data = data + buffer[:ok_idx+2]
+                    buffer = buffer[ok_idx+2:]
+                if not has_read_binary_data(data):
+                    data = buffer
+                    buffer = b''
+
+            communicator._previous_command = cmd
+            communicator.check_io(data)
+        else:
+            data = buffer[:at_idx+end_idx]
+            if data != b"":
+                communicator.check_io(data)
+            buffer = buffer[at_idx+end_idx:]
+# end legacy_replay
+
+
+def make_message(rand):
+    """Return a message with command like bytes in it."""
+    body = bytes(rand.getrandbits(8) for _ in range(rand.randint(1, 200)))
+    return body[:20] + b'AT+CSQ\rOK\r\nREADY' + body[20:]
+
+
+def make_capture(size, seed=9602):
+    """Return the capture bytes, the read binary messages and the commands in it."""
+    rand = random.Random(seed)
+    parts = []
+    messages = []
+    commands = []
+    length = 0
+    while length < size:
+        kind = rand.random()
+        if kind < 0.4:
+            part = b'AT+CSQ\rAT+CSQ\r\r\n+CSQ:%d\r\n\r\nOK\r\n' % rand.randint(0, 5)
+        elif kind < 0.6:
+            part = b'AT+SBDIX\rAT+SBDIX\r\r\n+SBDIX: 0, %d, 1, 2, 50, 0\r\n\r\nOK\r\n' % rand.randint(0, 65535)
+        elif kind < 0.8:
+            message = make_message(rand)
+            messages.append(message)
+            part = b''.join((b'AT+SBDRB\rAT+SBDRB\r', len(message).to_bytes(2, 'big'), message, checksum(message),
+                             b'\r\n\r\nOK\r\n'))
+        else:
+            message = make_message(rand)
+            command = b'AT+SBDWB=%d' % len(message)
+            part = b''.join((command, b'\r', command, b'\r\r\nREADY\r\n', message, checksum(message),
+                             b'\r\n0\r\n\r\nOK\r\n'))
+        commands.append(part[:part.index(b'\r')])
+        if rand.random() < 0.05:
+            part = b'\r\nSBDRING\r\n' + part
+        parts.append(part)
+        length += len(part)
+    return b''.join(parts), messages, commands
+
+
+def make_communicator(received, finished):
+    iridium_port = IridiumCommunicator()
+    iridium_port.signal.command_finished = lambda command, success, data: finished.append((command, success))
+    iridium_port.signal.notification = lambda *args: None
+    iridium_port.signal.message_received = received.append
+    iridium_port.write_serial = lambda msg: None
+    iridium_port.queue_command = lambda *args, **kwargs: None
+    return iridium_port
+
+
+def run(size_mb=50):
+    with tempfile.TemporaryDirectory() as tmp:
+        for size, legacy in ((250000, True), (1000000, True), (int(size_mb * 1e6), False)):
+            capture, messages, commands = make_capture(size)
+            expected = [(command, True) for command in commands]
+            filename = os.path.join(tmp, 'capture.log')
+            with open(filename, 'wb') as file:
+                file.write(capture)
+
+            print("{:,} byte capture with {:,} read binary messages".format(len(capture), len(messages)))
+            start = time.perf_counter()
+            segments = sum(1 for _ in iter_capture(capture))
+            elapsed = time.perf_counter() - start
+            print("  {:<28} {:>10.3f} sec {:>8.1f} MB/s ({:,} segments)".format(
+                "iter_capture", elapsed, len(capture) / elapsed / 1e6, segments))
+
+            received, finished = [], []
+            result = ReplayEngine(make_communicator(received, finished)).replay_file(filename)
+            print("  {:<28} {:>10.3f} sec {:>8.1f} MB/s ({:,} commands)".format(
+                "ReplayEngine.replay_file", result.seconds, result.mb_per_sec, result.commands))
+            assert received == messages, "The replayed messages do not match!"
+            assert finished == expected, "The replayed commands do not match!"
+
+            if legacy:
+                received, finished = [], []
+                start = time.perf_counter()
+                legacy_replay(capture, make_communicator(received, finished))
+                elapsed = time.perf_counter() - start
+                print("  {:<28} {:>10.3f} sec {:>8.1f} MB/s (messages match: {}, commands match: {})".format(
+                    "legacy loop", elapsed, len(capture) / elapsed / 1e6, received == messages, finished == expected))
+
+
+if __name__ == "__main__":
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else 50)
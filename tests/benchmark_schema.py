@@ -0,0 +1,90 @@
+"""
+    test.benchmark_schema
+    SeaLandAire Technologies
+    @author: jengel
+
+Compare `SchemaRegistry` records with JSON for telemetry. Prints the records per second to encode and decode and the
+bytes per record for one record per message, a batch of records per message and compact JSON.
+
+Run with `python tests/benchmark_schema.py [record count]`
+"""
+import sys
+import json
+import time
+import random
+
+from pyiridium9602 import SchemaRegistry, Bool, Enum, Bits, MO_LIMIT
+
+
+MODES = ['normal', 'low_power', 'fault', 'maintenance']
+
+
+def make_registry():
+    registry = SchemaRegistry()
+    registry.register(1, 'position', [('seq', 'I'), ('time', 'I'), ('lat', 'f'), ('lon', 'f'), ('speed', 'e'),
+                                      ('heading', 'H'), ('battery_mv', 'H'), ('satellites', Bits(4)),
+                                      ('mode', Enum(MODES)), ('gps_fix', Bool()), ('alarm', Bool())])
+    return registry
+
+
+def make_records(count, seed=9602):
+    rand = random.Random(seed)
+    lat, lon = 27.9506, -82.4572
+    records = []
+    for i in range(count):
+        lat += rand.uniform(-0.001, 0.001)
+        lon += rand.uniform(-0.001, 0.001)
+        records.append({'seq': i, 'time': 1791763200 + i * 60, 'lat': lat, 'lon': lon,
+                        'speed': round(rand.uniform(0, 3), 1), 'heading': rand.randrange(360),
+                        'battery_mv': rand.randint(11500, 13200), 'satellites': rand.randint(3, 12),
+                        'mode': rand.choice(MODES), 'gps_fix': rand.random() < 0.95, 'alarm': rand.random() < 0.01})
+    return records
+
+
+def timed(func, count):
+    """Return the result and the records per second."""
+    start = time.perf_counter()
+    result = func()
+    return result, count / (time.perf_counter() - start)
+
+
+def run(count=50000):
+    registry = make_registry()
+    schema = registry.get('position')
+    records = make_records(count)
+    batch_size = schema.batch_capacity(MO_LIMIT)
+    batches = [records[i: i+batch_size] for i in range(0, count, batch_size)]
+
+    rows = []
+
+    payloads, encode_rate = timed(lambda: [json.dumps(r, separators=(',', ':')).encode() for r in records], count)
+    decoded, decode_rate = timed(lambda: [json.loads(p) for p in payloads], count)
+    assert decoded == records
+    rows.append(("json", encode_rate, decode_rate, sum(map(len, payloads)) / count, len(payloads)))
+
+    payloads, encode_rate = timed(lambda: [registry.encode('position', r) for r in records], count)
+    decoded, decode_rate = timed(lambda: [registry.decode(p) for p in payloads], count)
+    assert [r.seq for r in decoded] == [r['seq'] for r in records]
+    rows.append(("schema", encode_rate, decode_rate, sum(map(len, payloads)) / count, len(payloads)))
+
+    tuples = [tuple(r[name] for name in schema.names) for r in records]
+    payloads, encode_rate = timed(lambda: [schema.encode(r) for r in tuples], count)
+    decoded, decode_rate = timed(lambda: [schema.decode(p) for p in payloads], count)
+    rows.append(("schema tuples", encode_rate, decode_rate, sum(map(len, payloads)) / count, len(payloads)))
+
+    payloads, encode_rate = timed(lambda: [registry.encode_batch('position', b) for b in batches], count)
+    decoded, decode_rate = timed(lambda: [r for p in payloads for r in registry.decode(p)], count)
+    assert [r.mode for r in decoded] == [r['mode'] for r in records]
+    assert max(map(len, payloads)) <= MO_LIMIT
+    rows.append(("schema batch {}".format(batch_size), encode_rate, decode_rate, sum(map(len, payloads)) / count,
+                 len(payloads)))
+
+    print("{} position records, {} byte schema record".format(count, schema.size))
+    print("{:<18} {:>14} {:>14} {:>14} {:>10}".format("format", "encode rec/s", "decode rec/s", "bytes/record",
+                                                      "messages"))
+    for name, encode_rate, decode_rate, size, messages in rows:
+        print("{:<18} {:>14,.0f} {:>14,.0f} {:>14.1f} {:>10}".format(name, encode_rate, decode_rate, size, messages))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
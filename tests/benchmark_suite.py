@@ -0,0 +1,314 @@
+"""
+    test.benchmark_suite
+    SeaLandAire Technologies
+    @author: jengel
+
+Offline microbenchmarks for the protocol hot paths with regression thresholds. No serial port is needed.
+
+  * `check_io` with whole responses and with 1, 16 and 64 byte reads with the metrics off
+  * `check_io` with whole responses and the metrics on, so the cost of the metrics is its own number
+  * Each `parse_*` function, `has_read_binary_data` and `Command.is_command`
+  * Checksums and response lexing
+  * Capture walking and replay
+
+Each benchmark reports the best time per operation of several repeats. The results are compared with the baseline file
+and the run fails if a benchmark is slower than the baseline by more than the threshold. The 'thresholds' of the
+baseline file override the threshold for benchmarks that are noisy. The `check_io` cases with whole responses and large
+reads take a few microseconds, so they are timed for longer. A pure Python calibration loop is saved with the baseline.
+`--calibrate` scales the baseline by it to compare with a baseline from another machine.
+
+Run with `python tests/benchmark_suite.py [-k filter] [--threshold 20] [--calibrate] [--save] [--baseline file]`
+
+Save a new baseline with `--save` after a change that is meant to change the performance.
+"""
+import os
+import sys
+import json
+import time
+import timeit
+import fnmatch
+import argparse
+import platform
+import collections
+
+import pyiridium9602
+from pyiridium9602 import Command, IridiumCommunicator, checksum, Checksum, checksum_batch, lex_responses, \
+    iter_capture, ReplayEngine, decode_capture
+from benchmark_replay import make_capture
+
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+# name: function that returns (callable, operations per call)
+BENCHMARKS = collections.OrderedDict()
+
+# name: minimum time in seconds of each repeat for the benchmarks that are not timed for the default MIN_TIME
+MIN_TIMES = {}
+MIN_TIME = 0.02
+
+
+def benchmark(name, min_time=None):
+    """Register a benchmark setup function.
+
+    Args:
+        name (str): Benchmark name.
+        min_time (float)[None]: Minimum time in seconds of each repeat. Short noisy benchmarks are timed for longer.
+    """
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        if min_time is not None:
+            MIN_TIMES[name] = min_time
+        return setup
+    return decorator
+
+
+def calibrate():
+    """Pure Python loop that is used to scale the results between machines."""
+    def loop():
+        total = 0
+        for i in range(1000):
+            total += i * 2 % 7
+        return total
+    return loop, 1000
+
+
+# ========== Responses ==========
+def read_binary_response(size):
+    content = bytes(i & 0xFF for i in range(size))
+    return b''.join((b'AT+SBDRB\r', len(content).to_bytes(2, 'big'), content, checksum(content), b'\r\n\r\nOK\r\n'))
+
+
+RESPONSES = {
+    'csq': (Command.SIGNAL_QUALITY, b'AT+CSQ\r\r\n+CSQ:5\r\n\r\nOK\r\n'),
+    'sbdix': (Command.SESSION, b'AT+SBDIX\r\r\n+SBDIX: 0, 12, 1, 5, 42, 0\r\n\r\nOK\r\n'),
+    'sbdrb270': (Command.READ_BINARY, read_binary_response(270)),
+    }
+
+
+def silent_communicator(metrics=False):
+    iridium_port = IridiumCommunicator()
+    if not metrics:
+        iridium_port.metrics = None
+    iridium_port.signal = pyiridium9602.Signal()
+    iridium_port.signal.notification = lambda *args: None
+    iridium_port.write_serial = lambda msg: None
+    iridium_port.queue_command = lambda *args, **kwargs: None
+    return iridium_port
+
+
+def check_io_setup(command, response, chunk, metrics=False):
+    iridium_port = silent_communicator(metrics)
+    chunks = [response] if chunk is None else [response[i: i + chunk] for i in range(0, len(response), chunk)]
+    check_io = iridium_port.check_io
+
+    def run():
+        iridium_port._previous_command = command
+        for data in chunks:
+            check_io(data)
+    return run, 1
+
+
+for _name, (_command, _response) in RESPONSES.items():
+    for _chunk in (None, 64, 16, 1):
+        benchmark('check_io/{}/{}'.format(_name, 'whole' if _chunk is None else 'chunk{}'.format(_chunk)),
+                  min_time=None if _chunk == 1 else 0.1)(
+            lambda command=_command, response=_response, chunk=_chunk: check_io_setup(command, response, chunk))
+    benchmark('check_io_metrics/{}/whole'.format(_name), min_time=0.1)(
+        lambda command=_command, response=_response: check_io_setup(command, response, None, metrics=True))
+
+
+# ========== Parsers ==========
+PARSERS = {
+    'parse_system_time': b'AT-MSSTM\r\r\n-MSSTM: 1a2b3c4d\r\n\r\n',
+    'parse_serial_number': b'AT+CGSN\r\r\n300234010753370\r\n\r\n',
+    'parse_signal_quality': RESPONSES['csq'][1][:-2],
+    'parse_check_ring': b'AT+CRIS\r\r\n+CRIS: 0,1\r\n\r\n',
+    'parse_session': RESPONSES['sbdix'][1][:-2],
+    'parse_read_binary': RESPONSES['sbdrb270'][1][:-8],
+    'parse_write_binary': b'AT+SBDWB=11\r\r\nREADY\r\n\r\n0\r\n\r\n',
+    'parse_clear_buffer': b'AT+SBDD0\r\r\n0\r\n\r\n',
+    'has_read_binary_data': RESPONSES['sbdrb270'][1],
+    }
+
+
+def parser_setup(name, data):
+    func = getattr(pyiridium9602, name)
+    return (lambda: func(data)), 1
+
+
+for _name, _data in PARSERS.items():
+    benchmark('parse/' + _name)(lambda name=_name, data=_data: parser_setup(name, data))
+
+
+@benchmark('parse/parse_read_binary_into')
+def parse_read_binary_into():
+    data = PARSERS['parse_read_binary']
+    buffer = bytearray(340)
+    return (lambda: pyiridium9602.parse_read_binary_into(data, buffer)), 1
+
+
+@benchmark('command/is_command/hit')
+def is_command_hit():
+    return (lambda: Command.is_command(b'AT+SBDIX')), 1
+
+
+@benchmark('command/is_command/miss')
+def is_command_miss():
+    return (lambda: Command.is_command(b'+SBDIX: 0, 12, 1, 5, 42, 0')), 1
+
+
+# ========== Checksums ==========
+@benchmark('checksum/checksum/340')
+def checksum_340():
+    content = bytes(range(256)) + bytes(84)
+    return (lambda: checksum(content)), 1
+
+
+@benchmark('checksum/incremental/340_by_16')
+def checksum_incremental():
+    content = bytes(range(256)) + bytes(84)
+    reads = [content[i: i + 16] for i in range(0, len(content), 16)]
+
+    def run():
+        check = Checksum()
+        for data in reads:
+            check.update(data)
+        return check.digest()
+    return run, 1
+
+
+@benchmark('checksum/checksum_batch/1000')
+def checksum_batch_1000():
+    payloads = [bytes((i + j) & 0xFF for j in range(i % 340)) for i in range(1000)]
+    return (lambda: checksum_batch(payloads)), 1000
+
+
+# ========== Capture ==========
+CAPTURE = None
+
+
+def capture():
+    global CAPTURE
+    if CAPTURE is None:
+        CAPTURE = make_capture(200000, seed=20)[0]
+    return CAPTURE
+
+
+@benchmark('capture/lex_responses/200KB')
+def lex_capture():
+    data = capture()
+    return (lambda: sum(1 for _ in lex_responses(data))), len(data) // 1000
+
+
+@benchmark('capture/iter_capture/200KB')
+def iter_capture_200k():
+    data = capture()
+    return (lambda: sum(1 for _ in iter_capture(data))), len(data) // 1000
+
+
+@benchmark('capture/replay/200KB')
+def replay_200k():
+    data = capture()
+    engine = ReplayEngine(silent_communicator())
+    return (lambda: engine.replay(data)), len(data) // 1000
+
+
+@benchmark('capture/decode_capture/200KB')
+def decode_200k():
+    import tempfile
+    filename = os.path.join(tempfile.mkdtemp(), 'capture.log')
+    with open(filename, 'wb') as file:
+        file.write(capture())
+    return (lambda: decode_capture(filename)), len(capture()) // 1000
+
+
+# ========== Runner ==========
+def measure(setup, repeat=7, min_time=MIN_TIME):
+    """Return the best time in ns per operation."""
+    func, ops = setup()
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat, number)) / number / ops * 1e9
+
+
+def load_baseline(filename):
+    try:
+        with open(filename) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def run(pattern='*', threshold=20.0, save=False, baseline_file=BASELINE, repeat=7, retries=2, calibrate_scale=False):
+    """Run the benchmarks and return True if none regressed more than the threshold percent.
+
+    The regressed benchmarks are measured again after the others, up to `retries` times, and the best time is used.
+    This keeps a few noisy seconds on a busy machine from failing the run.
+    """
+    names = [name for name in BENCHMARKS if fnmatch.fnmatch(name, pattern)]
+    calibration = measure(calibrate, repeat * 3)
+    baseline = load_baseline(baseline_file) or {}
+    scale = calibration / baseline['calibration'] if baseline and calibrate_scale else 1.0
+    expected = {name: value * scale for name, value in baseline.get('results', {}).items()}
+    thresholds = baseline.get('thresholds', {})
+
+    def is_regressed(name):
+        return name in expected and (results[name] / expected[name] - 1) * 100 > thresholds.get(name, threshold)
+
+    def measure_name(name):
+        return measure(BENCHMARKS[name], repeat, MIN_TIMES.get(name, MIN_TIME))
+
+    results = collections.OrderedDict((name, measure_name(name)) for name in names)
+    for retry in range(retries):
+        # A new baseline uses the best of all passes
+        retry_names = names if save else list(filter(is_regressed, names))
+        if retry_names:
+            time.sleep(retry + 1)
+        for name in retry_names:
+            results[name] = min(results[name], measure_name(name))
+
+    print("Calibration {:.2f} ns/op (scale {:.2f} to the baseline machine). Threshold {:.0f}%".format(
+        calibration, scale, threshold))
+    print("{:<40} {:>14} {:>14} {:>9}  {}".format("benchmark", "ns/op", "baseline", "change", "status"))
+    for name, value in results.items():
+        if name not in expected:
+            print("{:<40} {:>14,.1f} {:>14} {:>9}  {}".format(name, value, "-", "-", "new"))
+        else:
+            print("{:<40} {:>14,.1f} {:>14,.1f} {:>+8.1f}%  {}{}".format(
+                name, value, expected[name], (value / expected[name] - 1) * 100,
+                "REGRESSED" if is_regressed(name) else "ok",
+                " (threshold {:.0f}%)".format(thresholds[name]) if name in thresholds else ""))
+    regressed = list(filter(is_regressed, names))
+
+    if save:
+        saved = dict(baseline, results=expected)  # Other results are kept on the scale of the new calibration
+        saved.setdefault('thresholds', {})
+        saved['results'].update(results)
+        if not baseline or scale != 1.0 or len(names) == len(BENCHMARKS):
+            saved['calibration'] = calibration
+        saved['python'] = platform.python_version()
+        saved['machine'] = platform.machine()
+        with open(baseline_file, 'w') as file:
+            json.dump(saved, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print("Saved the baseline to", baseline_file)
+
+    if regressed:
+        print("{} benchmarks regressed more than the threshold: {}".format(len(regressed), ", ".join(regressed)))
+    return not regressed
+# end run
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the protocol microbenchmarks against a baseline.")
+    parser.add_argument('-k', '--filter', default='*', help="Benchmark name pattern like 'parse/*'")
+    parser.add_argument('-t', '--threshold', type=float, default=20.0, help="Allowed slowdown in percent")
+    parser.add_argument('-r', '--repeat', type=int, default=7, help="Repeats for each benchmark (best is used)")
+    parser.add_argument('-b', '--baseline', default=BASELINE, help="Baseline JSON file")
+    parser.add_argument('-c', '--calibrate', action='store_true',
+                        help="Scale the baseline by the calibration loop for a baseline from another machine")
+    parser.add_argument('--save', action='store_true', help="Save the results as the new baseline")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.filter, args.threshold, args.save, args.baseline, args.repeat,
+                         calibrate_scale=args.calibrate) else 1)
@@ -0,0 +1,143 @@
+"""
+    test.benchmark_zero_copy
+    SeaLandAire Technologies
+    @author: jengel
+
+Measure the memory allocated to receive read binary messages with and without the 'zero_copy' option. A capture of
+read binary responses is written to a file and replayed through `IridiumCommunicator.check_io` in serial port sized
+reads. `tracemalloc` measures the memory above the baseline that is held when the message is delivered to
+`Signal.message_received` and the peak memory for each response. The time is measured without `tracemalloc`. The
+results of the read binary requests must keep their own content and the buffer must grow while a message view is held.
+
+Run with `python tests/benchmark_zero_copy.py [message count]`
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+import tracemalloc
+
+from pyiridium9602 import Command, CommandRequest, IridiumCommunicator
+
+
+def read_binary_response(content):
+    """Return the bytes the modem responds with for a read binary command."""
+    checksum = int(sum(content)).to_bytes(4, 'big')[2:]
+    return b''.join((b'AT+SBDRB\r', len(content).to_bytes(2, 'big'), content, checksum, b'\r\n\r\nOK\r\n'))
+
+
+def write_capture(filename, count, size, seed=9602):
+    """Write a capture of read binary responses and return the offset and length of each response."""
+    rand = random.Random(seed)
+    responses = []
+    offset = 0
+    with open(filename, 'wb') as file:
+        for _ in range(count):
+            response = read_binary_response(bytes(rand.getrandbits(8) for _ in range(size)))
+            file.write(response)
+            responses.append((offset, len(response)))
+            offset += len(response)
+    return responses
+
+
+def make_communicator(zero_copy, on_message):
+    iridium_port = IridiumCommunicator(options={'zero_copy': zero_copy})
+    iridium_port.signal.notification = lambda *args: None
+    iridium_port.signal.message_receive_failed = lambda *args: print("Message receive failed!")
+    iridium_port.write_serial = lambda msg: None
+    iridium_port.signal.message_received = on_message
+    return iridium_port
+
+
+def replay(iridium_port, capture, responses, read_size=64, trace=None):
+    """Replay each response like the listen thread would read it.
+
+    Args:
+        trace (list)[None]: If given the baseline memory before each response is appended and the peak memory above
+            the baseline is appended to the `peaks` attribute.
+    """
+    for offset, length in responses:
+        if trace is not None:
+            tracemalloc.reset_peak()
+            trace.append(tracemalloc.get_traced_memory()[0])
+        iridium_port._previous_command = Command.READ_BINARY
+        for i in range(offset, offset + length, read_size):
+            iridium_port.check_io(capture[i: min(i + read_size, offset + length)])
+        if trace is not None:
+            trace.peaks.append(tracemalloc.get_traced_memory()[1] - trace[-1])
+
+
+class Trace(list):
+    """Baseline memory before each response and the peak memory above the baseline for each response."""
+    def __init__(self):
+        super().__init__()
+        self.peaks = []
+
+
+def run(count=5000, size=270):
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'capture.bin')
+        responses = write_capture(filename, count, size)
+        with open(filename, 'rb') as file:
+            capture = file.read()
+
+    print("{} read binary responses with {} byte messages ({:,} byte capture)".format(count, size, len(capture)))
+    print("{:<12} {:>12} {:>20} {:>18} {:>10}".format("mode", "messages/s", "held at delivery", "mean peak bytes",
+                                                      "received"))
+    for zero_copy in (False, True):
+        received = []
+        held = []
+        trace = None
+
+        def on_message(message):
+            received.append(message[0])  # Use the message without keeping it
+            if trace is not None:
+                held.append(tracemalloc.get_traced_memory()[0] - trace[-1])
+
+        iridium_port = make_communicator(zero_copy, on_message)
+        replay(iridium_port, capture, responses[:100])  # Warm up
+        del received[:]
+
+        start = time.perf_counter()
+        replay(iridium_port, capture, responses)
+        rate = count / (time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            trace = Trace()
+            replay(iridium_port, capture, responses, trace=trace)
+        finally:
+            tracemalloc.stop()
+
+        assert len(received) == 2 * count and len(held) == count, "Messages were not received!"
+        print("{:<12} {:>12,.0f} {:>20,.0f} {:>18,.0f} {:>10}".format(
+            "zero copy" if zero_copy else "copy", rate, sum(held) / count, sum(trace.peaks) / count, count))
+
+
+def check_results():
+    """Every read binary request keeps its own content and a held view does not stop the buffer from growing."""
+    held = []
+    iridium_port = make_communicator(True, held.append)
+    requests = []
+    for content in (b'first message', b'SECOND!!!!!!!', bytes(range(256)) * 20):
+        request = CommandRequest(Command.READ_BINARY)
+        requests.append(request)
+        iridium_port._pending_request = request
+        iridium_port._previous_command = Command.READ_BINARY
+        iridium_port.check_io(read_binary_response(content))
+
+    values = [request.value[1] for request in requests]
+    success = values == [b'first message', b'SECOND!!!!!!!', bytes(range(256)) * 20] and \
+        all(request.message == value for request, value in zip(requests, values)) and \
+        len(iridium_port._message_buffer) >= len(values[-1])
+    print("Read binary results keep their content and the buffer grew:", success)
+    return success
+
+
+if __name__ == "__main__":
+    message_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    success = check_results()
+    for message_size in (270, 4096):
+        run(message_count, message_size)
+    sys.exit(0 if success else 1)
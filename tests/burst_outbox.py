@@ -0,0 +1,92 @@
+"""
+    test.burst_outbox
+    SeaLandAire Technologies
+    @author: jengel
+
+Check the bounded outbox. Bursts of messages from several threads block for space instead of being dropped and each
+message reaches the `IridiumServer` with the right write binary command. Priority lanes, expiry and rejection are
+checked without a serial port.
+
+Run with `python tests/burst_outbox.py [threads] [messages per thread] [capacity]` (Linux/macOS only).
+"""
+import sys
+import time
+import threading
+
+from pyiridium9602 import IridiumCommunicator, IridiumServer, Outbox, OutboxFull, PtyLoopback
+
+
+def check_burst(num_threads=4, messages=100, capacity=20):
+    """Queue bursts of messages from several threads into a small outbox and check that every message arrived."""
+    loopback = PtyLoopback()
+
+    server = IridiumServer(loopback.port1)
+    server.signal.notification = lambda *args: None
+    received = []
+    server.write_iridium = received.append
+    server.connect()
+
+    client = IridiumCommunicator(loopback.port2)
+    client.signal.notification = lambda *args: None
+    client.outbox = Outbox(capacity)
+    client.connect()
+
+    def worker(i):
+        for j in range(messages):
+            client.queue_send_message("{}:{}".format(i, j), block=True, timeout=30)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(num_threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    client.wait_for_idle(30)
+    elapsed = time.perf_counter() - start
+    stats = client.outbox.stats()
+    client.close()
+    server.close()
+    loopback.close()
+
+    # The server gets the message length, the contents and 2 checksum bytes
+    payloads = [data[:-2] for data in received]
+    in_order = True
+    for i in range(num_threads):
+        expected = [str(len(msg)).encode() + msg.encode() for msg in ("{}:{}".format(i, j) for j in range(messages))]
+        in_order = in_order and [p for p in payloads if p in set(expected)] == expected
+    total = num_threads * messages
+    print("{} threads x {} messages into capacity {}: {} received in {:.2f} sec".format(
+        num_threads, messages, capacity, len(payloads), elapsed))
+    print("Outbox stats:", stats)
+    print("All messages received in order:", in_order)
+    return len(payloads) == total and in_order and stats['dropped'] == 0 and stats['high_water'] <= capacity
+
+
+def check_lanes():
+    """Check the priority, expiry and rejection behavior without a serial port."""
+    outbox = Outbox(capacity=3)
+    outbox.put(b'LOW', Outbox.PRIORITY_LOW)
+    outbox.put(b'NORMAL')
+    outbox.put(b'HIGH', Outbox.PRIORITY_HIGH)
+    try:
+        outbox.put(b'REJECTED')
+        rejected = False
+    except OutboxFull:
+        rejected = True
+    order = [outbox.get() for _ in range(4)]
+
+    iridium_port = IridiumCommunicator()
+    request = iridium_port.message_request(b'stale')
+    iridium_port.outbox.put(request, expires=0.01)
+    time.sleep(0.02)
+    expired = iridium_port.outbox.get() is None and request.dropped == 'expired' and request.wait_written(0)
+
+    stats = outbox.stats()
+    print("Lane order:", order, "Rejected when full:", rejected, "Expired request failed:", expired)
+    return order == [b'HIGH', b'NORMAL', b'LOW', None] and rejected and expired and stats['rejected'] == 1
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    success = check_lanes() and check_burst(*args)
+    sys.exit(0 if success else 1)
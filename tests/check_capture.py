@@ -0,0 +1,115 @@
+"""
+    test.check_capture
+    SeaLandAire Technologies
+    @author: jengel
+
+Check the framed capture. A communicator talks to an `IridiumServer` over a pseudo terminal with a `CaptureWriter`
+attached. The capture is replayed through a new communicator with `run_serial_log_file` and must give the same finished
+commands and received messages. The capture is replayed again at 4x speed to check the timing. Rotation is checked by
+writing frames into a small `max_bytes`.
+
+Run with `python tests/check_capture.py` (Linux/macOS only).
+"""
+import os
+import sys
+import time
+import tempfile
+
+from pyiridium9602 import Command, IridiumCommunicator, IridiumServer, CaptureWriter, iter_frames, run_serial_log_file, \
+    ReplayEngine, CAPTURE_READ, PtyLoopback, MemoryPort
+
+
+def watch(communicator):
+    """Return the lists of finished commands and received messages of the communicator."""
+    finished, received = [], []
+    communicator.signal.notification = lambda *args: None
+    communicator.signal.command_finished = lambda command, success, data: finished.append((command, success))
+    communicator.signal.message_received = lambda message: received.append(bytes(message))
+    return finished, received
+
+
+def record(filename):
+    """Record a session with the server and return the finished commands and received messages."""
+    loopback = PtyLoopback()
+
+    server = IridiumServer(loopback.port1)
+    server.signal.notification = lambda *args: None
+    server.connect()
+
+    client = IridiumCommunicator(loopback.port2)
+    finished, received = watch(client)
+    client.capture = CaptureWriter(filename)
+    try:
+        client.connect()
+        client.acquire_signal_quality()
+        time.sleep(1)  # Timing for the speed check
+        client.send_message(b"AT+CSQ\rOK\r\n in a message")
+        client.acquire_response(Command.SESSION)
+        server.write_serial(b"mt message with OK\r\n")
+        start = time.time()
+        while not received and time.time() - start < 10:
+            time.sleep(0.01)
+        time.sleep(0.5)  # Let the ring session finish
+    finally:
+        client.close()
+        server.close()
+        loopback.close()
+        client.capture.close()
+    return finished, received
+
+
+def check_capture():
+    success = True
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'modem.cap')
+        finished, received = record(filename)
+        with open(filename, 'rb') as file:
+            data = file.read()
+        frames = list(iter_frames(data))
+        reads = sum(1 for frame in frames if frame.direction == CAPTURE_READ)
+        duration = frames[-1].timestamp - frames[0].timestamp
+        print("Recorded {} commands and {} messages in {} frames ({} read, {} bytes, {:.2f} sec)".format(
+            len(finished), len(received), len(frames), reads, len(data), duration))
+
+        communicator = IridiumCommunicator(MemoryPort())
+        replay_finished, replay_received = watch(communicator)
+        result = run_serial_log_file(filename, communicator)
+        match = replay_finished == finished and replay_received == received and len(received) > 0
+        print("Replay matches: {} ({} commands, {:.1f} MB/s)".format(match, result.commands, result.mb_per_sec))
+        success = success and match
+
+        communicator = IridiumCommunicator()
+        watch(communicator)
+        result = ReplayEngine(communicator, speed=4).replay_file(filename)
+        timed = abs(result.seconds - duration / 4) < 0.1 + duration / 20
+        print("Replay at 4x speed took {:.2f} sec for {:.2f} sec: {}".format(result.seconds, duration, timed))
+        success = success and timed
+
+        # Rotation
+        rotated = os.path.join(tmp, 'rotated.cap')
+        with CaptureWriter(rotated, max_bytes=1000, backup_count=3) as writer:
+            for i in range(200):
+                writer.record_read(b'frame %03d\r\n' % i)
+        names = [rotated + suffix for suffix in ('.3', '.2', '.1', '')]
+        kept = []
+        for name in names:
+            with open(name, 'rb') as file:
+                data = file.read()
+            kept.extend(data[frame.start: frame.end] for frame in iter_frames(data))
+        rotates = all(os.path.getsize(name) <= 1000 + 20 for name in names) and \
+            not os.path.exists(rotated + '.4') and kept == [b'frame %03d\r\n' % i for i in range(200 - len(kept), 200)]
+        print("Rotated into {} files with the newest {} frames: {}".format(len(names), len(kept), rotates))
+        success = success and rotates
+
+        # The reader thread only appends to a deque
+        with CaptureWriter(os.path.join(tmp, 'speed.cap')) as writer:
+            start = time.perf_counter()
+            for _ in range(100000):
+                writer.record_read(b'+CSQ:5\r\n\r\nOK\r\n')
+            elapsed = time.perf_counter() - start
+        print("record() takes {:.2f} us".format(elapsed / 100000 * 1e6))
+    return success
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_capture() else 1)
@@ -0,0 +1,111 @@
+"""
+    test.check_fragment
+    SeaLandAire Technologies
+    @author: jengel
+
+Check the fragment layer. A large payload is sent to an `IridiumServer` over a pseudo terminal and a large payload is
+received from it. The reassembly table is checked for out of order segments, repeats, timeouts and eviction without a
+serial port.
+
+Run with `python tests/check_fragment.py [payload size]` (Linux/macOS only).
+"""
+import sys
+import time
+import random
+
+from pyiridium9602 import IridiumCommunicator, IridiumServer, FragmentLayer, Reassembler, split_message, MT_LIMIT, \
+    PtyLoopback
+
+
+def unframe(data):
+    """Return the message contents from the server's length, contents and checksum bytes."""
+    for digits in range(1, 4):
+        if int(data[:digits]) == len(data) - digits - 2:
+            return data[digits:-2]
+    raise ValueError(data)
+
+
+def check_round_trip(size=5000):
+    """Send a large payload to the server and receive a large payload from the server."""
+    loopback = PtyLoopback()
+
+    server = IridiumServer(loopback.port1)
+    server.signal.notification = lambda *args: None
+    server_received = []
+    server_reassembler = Reassembler(server_received.append)
+    server.write_iridium = lambda data: server_reassembler.add(unframe(data))
+    server.connect()
+
+    client = IridiumCommunicator(loopback.port2)
+    client.signal.notification = lambda *args: None
+    client_received = []
+    client.connect()
+    layer = FragmentLayer(client, client_received.append)
+
+    rand = random.Random(size)
+    mo_payload = bytes(rand.getrandbits(8) for _ in range(size))
+    mt_payload = bytes(rand.getrandbits(8) for _ in range(size))
+    try:
+        start = time.perf_counter()
+        results = layer.send(mo_payload)
+        mo_time = time.perf_counter() - start
+
+        # The server rings for each segment and the client reads them automatically
+        start = time.perf_counter()
+        for segment in split_message(42, mt_payload, MT_LIMIT):
+            server.write_serial(segment)
+        while not client_received and time.perf_counter() - start < 10:
+            time.sleep(0.01)
+        mt_time = time.perf_counter() - start
+    finally:
+        client.close()
+        server.close()
+        loopback.close()
+
+    print("Sent {} bytes in {} sessions in {:.3f} sec: {}".format(
+        size, len(results), mo_time, server_received == [mo_payload]))
+    print("Received {} bytes in {:.3f} sec: {}".format(size, mt_time, client_received == [mt_payload]))
+    return server_received == [mo_payload] and client_received == [mt_payload]
+
+
+def check_reassembler():
+    """Check out of order segments, repeats, repeats after completion, timeouts and eviction."""
+    received = []
+    failed = []
+    reassembler = Reassembler(received.append, lambda *args: failed.append(args), timeout=10, max_pending=2)
+
+    # Out of order with a repeated segment
+    segments = split_message(1, bytes(range(256)) * 4, 100)[::-1]
+    for segment in segments[:2] + segments[:1] + segments[2:]:
+        reassembler.add(segment, now=0)
+    in_order = received == [bytes(range(256)) * 4]
+
+    # A segment and a full re-send after the message completed are ignored and never time out
+    for segment in segments[:1] + segments:
+        reassembler.add(segment, now=0)
+    single = split_message(9, b'single', 100)
+    reassembler.add(single[0], now=0)
+    reassembler.add(single[0], now=0)
+    repeated = (received == [bytes(range(256)) * 4, b'single'] and len(reassembler) == 0 and
+                reassembler.duplicates == len(segments) + 2)
+    received.remove(b'single')
+
+    # Timeout
+    reassembler.add(split_message(2, bytes(300), 100)[0], now=1)
+    reassembler.expire(now=12)
+    timed_out = len(failed) == 1 and failed[0][0] == 2 and failed[0][2] == 4
+
+    # Eviction of the oldest message when the table is full
+    for msg_id in (3, 4, 5):
+        reassembler.add(split_message(msg_id, bytes(300), 100)[0], now=20)
+    evicted = len(failed) == 2 and failed[1][0] == 3 and len(reassembler) == 2
+
+    print("Reassembled out of order once:", in_order and len(received) == 1, "Repeats after completion ignored:",
+          repeated, "Timed out:", timed_out, "Evicted when full:", evicted)
+    return in_order and len(received) == 1 and repeated and timed_out and evicted
+
+
+if __name__ == "__main__":
+    payload_size = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    success = check_reassembler() and check_round_trip(payload_size)
+    sys.exit(0 if success else 1)
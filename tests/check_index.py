@@ -0,0 +1,116 @@
+"""
+    test.check_index
+    SeaLandAire Technologies
+    @author: jengel
+
+Check the capture index with a synthetic capture from `benchmark_replay`. The index is built, saved and loaded. It must
+find every command, session and read binary message. A seek to one message and a replay of the capture split into parts
+must give the same messages and commands as the full capture. A stale or broken sidecar file is rebuilt. A capture with
+more than 65535 distinct commands and a session with values out of range is indexed without an error.
+
+Run with `python tests/check_index.py [capture MB]`
+"""
+import os
+import sys
+import time
+import tempfile
+
+from pyiridium9602 import Command, IridiumError, CaptureIndex, ReplayEngine
+from benchmark_replay import make_capture, make_communicator
+
+
+def check_index(size_mb=5, parts=4):
+    capture, messages, commands = make_capture(int(size_mb * 1e6))
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'capture.log')
+        with open(filename, 'wb') as file:
+            file.write(capture)
+
+        start = time.perf_counter()
+        index = CaptureIndex.open(filename)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded = CaptureIndex.open(filename)
+        load_time = time.perf_counter() - start
+        print("Indexed {:,} commands from {:,} bytes in {:.3f} sec ({:.1f} MB/s). Loaded in {:.3f} sec ({:,} bytes)"
+              .format(len(index), len(capture), built, len(capture) / built / 1e6, load_time,
+                      os.path.getsize(filename + '.idx')))
+
+        success = True
+        checks = [("Loaded index matches", loaded.entries == index.entries),
+                  ("Commands match", [entry.command for entry in index] == commands),
+                  ("Payloads match", [index.payload(entry) for entry in index.find_command(Command.READ_BINARY)]
+                   == messages),
+                  ("Sessions found", len(index.sessions()) == commands.count(Command.SESSION)),
+                  ("Write binary by prefix", len(index.find_command(Command.WRITE_BINARY))
+                   == sum(cmd.startswith(Command.WRITE_BINARY) for cmd in commands)),
+                  ]
+
+        # Seek to one read binary message
+        entry = index.find_command(Command.READ_BINARY)[len(messages) // 2]
+        received, finished = [], []
+        ReplayEngine(make_communicator(received, finished)).replay_file(filename, entry.start, entry.end)
+        checks.append(("Seek replays one message", received == [messages[len(messages) // 2]] and
+                       finished == [(Command.READ_BINARY, True)]))
+
+        # MOMSN range
+        session = index.session(len(index.sessions()) // 2)
+        found = index.find_momsn(session.session.mo_msn)
+        checks.append(("MOMSN found", session in found and all(e.session.mo_msn == session.session.mo_msn
+                                                               for e in found)))
+
+        # Split replay gives the same result as the whole capture
+        ranges = index.split(parts)
+        received, finished = [], []
+        for start, end in ranges:
+            ReplayEngine(make_communicator(received, finished)).replay_file(filename, start, end)
+        checks.append(("{} split replays match".format(len(ranges)),
+                       received == messages and finished == [(command, True) for command in commands]))
+
+        # Stale and broken sidecar files
+        os.utime(filename, ns=(1, 1))
+        try:
+            CaptureIndex.load(filename + '.idx', filename)
+            stale = False
+        except IridiumError:
+            stale = True
+        with open(filename + '.idx', 'wb') as file:
+            file.write(b'broken')
+        checks.append(("Stale index detected", stale))
+        checks.append(("Broken index rebuilt", CaptureIndex.open(filename).entries == index.entries))
+
+    for name, result in checks:
+        print("{}: {}".format(name, result))
+        success = success and result
+    return success
+
+
+def check_limits(count=70000):
+    """Index a capture with many distinct SBDWT commands and a corrupt session result."""
+    capture = b''.join(b'AT+SBDWT=message %d\rAT+SBDWT=message %d\r\r\nOK\r\n' % (i, i) for i in range(count))
+    capture += b'AT+SBDIX\rAT+SBDIX\r\r\n+SBDIX: 0, 70000, 0, 0, 0, 0\r\n\r\nOK\r\n'
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'capture.log')
+        with open(filename, 'wb') as file:
+            file.write(capture)
+        index = CaptureIndex.open(filename)
+        loaded = CaptureIndex.load(filename + '.idx', filename)
+
+        entry = index.entries[-1]
+        try:
+            CaptureIndex([entry._replace(session=(0, 70000, 0, 0, 0, 0))], filename).save(filename + '.idx')
+            rejected = False
+        except IridiumError:
+            rejected = True
+        kept = CaptureIndex.load(filename + '.idx', filename).entries == index.entries
+
+    success = (len(index) == count + 1 and loaded.entries == index.entries and entry.command == Command.SESSION and
+               entry.session is None and rejected and kept)
+    print("{:,} distinct commands and a corrupt session indexed: {}, out of range entry rejected without writing: {}"
+          .format(len(index), len(index) == count + 1 and loaded.entries == index.entries, rejected and kept))
+    return success
+
+
+if __name__ == "__main__":
+    success = check_index(float(sys.argv[1]) if len(sys.argv) > 1 else 5)
+    sys.exit(0 if check_limits() and success else 1)
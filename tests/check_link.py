@@ -0,0 +1,139 @@
+"""
+    test.check_link
+    SeaLandAire Technologies
+    @author: jengel
+
+Check the `LinkModel`. The same seed must give the same sessions and serial line errors, the failure and error rates
+must be close to the configured probabilities and the signal quality must follow its trace. An `IridiumServer` with a
+link model is checked over an in-memory loopback and the `EmulatorFarm` is checked to run the session latencies of
+its modems at the same time instead of one after the other.
+
+Run with `python tests/check_link.py`.
+"""
+import sys
+import time
+import asyncio
+import collections
+
+from pyiridium9602 import Command, AsyncIridiumCommunicator, EmulatorFarm, LinkModel, back_to_back, \
+    uniform_latency, lognormal_latency
+
+
+def check_reproducible():
+    """The same seed gives the same outcomes and line errors. A different seed does not."""
+    def run(seed):
+        link = LinkModel(seed, lognormal_latency(8, 0.6, 2, 60), mo_failures={18: 0.1, 35: 0.1}, mt_error_rate=0.1,
+                         corrupt_rate=0.01, drop_rate=0.01)
+        sessions = [link.session(0) for _ in range(1000)]
+        return sessions, link.transmit(bytes(range(256)) * 40), link.receive(bytes(range(256)) * 40)
+
+    success = run(7) == run(7) and run(7) != run(8)
+    print("reproducible: {}".format(success))
+    return success
+# end check_reproducible
+
+
+def check_rates(count=100000):
+    """The measured rates are close to the configured probabilities."""
+    failures = {10: 0.02, 18: 0.05, 32: 0.01}
+    link = LinkModel(1, mo_failures=failures, mt_error_rate=0.1, corrupt_rate=0.002, drop_rate=0.001)
+    codes = collections.Counter(link.session(0).mo_status for _ in range(count))
+    mt_errors = link.counts['mt_errors'] - link.counts['failures']
+    link.transmit(bytes(count * 10))
+
+    measured = {code: codes[code] / count for code in failures}
+    measured['mt_error'] = mt_errors / codes[None]
+    measured['corrupt'] = link.counts['corrupted'] / (count * 10)
+    measured['drop'] = link.counts['dropped'] / (count * 10)
+    expected = dict(failures, mt_error=0.1, corrupt=0.002, drop=0.001)
+    success = all(abs(measured[key] - value) < value * 0.1 for key, value in expected.items())
+    print("rates:", ", ".join("{} {:.4f} ({})".format(key, measured[key], value) for key, value in expected.items()),
+          success)
+    return success
+# end check_rates
+
+
+def check_csq():
+    """A signal quality of 0 in the trace fails the session with MO status 32."""
+    link = LinkModel(csq=[5, 3, 0, 2], csq_interval=10)
+    trace = [link.signal_quality(t) for t in (0, 9.9, 10, 25, 35, 45)]
+    success = trace == [5, 5, 3, 0, 2, 5] and link.session(25).mo_status == 32 and link.session(35).success
+    print("signal quality trace {}: {}".format(trace, success))
+    return success
+# end check_csq
+
+
+def run_server(seed=6, max_sessions=20):
+    """Run sessions against a back-to-back server with a link model until the MO message is delivered."""
+    with back_to_back(options={'ring_alerts': False}) as loop:
+        loop.server.link = LinkModel(seed, uniform_latency(0.05, 0.05), mo_failures={18: 0.5})
+        delivered = []
+        loop.server.write_iridium = delivered.append
+
+        loop.communicator.queue_send_message(b'mo message')
+        start = time.perf_counter()
+        values = []
+        while not delivered and len(values) < max_sessions:
+            values.append(loop.communicator.acquire_request(Command.SESSION, 5, options={'auto_read': False}).value)
+        latency = (time.perf_counter() - start) / len(values)
+        signal_quality = loop.communicator.acquire_signal_quality(wait_time=5)
+    return values, delivered, latency, signal_quality
+# end run_server
+
+
+def check_server():
+    """The MO message is delivered by the first successful session and the same seed gives the same sessions."""
+    values, delivered, latency, signal_quality = run_server()
+    again = run_server()[0]
+
+    success = len(delivered) == 1 and delivered[0][:12] == b'10mo message' and values == again
+    success = success and all(value[0] == 18 and value[2] == 2 for value in values[:-1]) and values[-1][0] == 1
+    success = success and latency >= 0.05 and signal_quality == 5
+    print("server: {} sessions until the MO message was delivered {}, {:.3f} s per session: {}".format(
+        len(values), values, latency, success))
+    return success
+# end check_server
+
+
+async def farm_client(modem, sessions):
+    iridium_port = AsyncIridiumCommunicator(modem.port, options={'ring_alerts': False})
+    iridium_port.signal.notification = lambda *args: None
+    await iridium_port.connect()
+    try:
+        return [await iridium_port.session() for _ in range(sessions)]
+    finally:
+        iridium_port.close()
+
+
+async def run_farm(count, sessions):
+    farm = EmulatorFarm(options={'ring_alerts': False}, link_model=lambda sn: LinkModel(
+        int(sn), uniform_latency(5, 15), mo_failures={18: 0.1}, time_scale=0.01))
+    modems = farm.add_modems(count)
+    farm.attach()
+    try:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(farm_client(modem, sessions) for modem in modems))
+        elapsed = time.perf_counter() - start
+    finally:
+        farm.close()
+    return results, elapsed
+# end run_farm
+
+
+def check_farm(count=50, sessions=5):
+    """The session latencies of the farm modems overlap and the results are reproducible."""
+    results, elapsed = asyncio.run(run_farm(count, sessions))
+    again, _ = asyncio.run(run_farm(count, sessions))
+    statuses = collections.Counter(values[0] for result in results for values in result)
+
+    # Each session takes 0.05 - 0.15 s, so one after the other would take about count * sessions * 0.1 s
+    success = results == again and elapsed < sessions * 0.15 * 3 and statuses[18] > 0
+    print("farm: {} modems x {} sessions in {:.2f} s (serial {:.0f} s), MO status {}: {}".format(
+        count, sessions, elapsed, count * sessions * 0.1, dict(statuses), success))
+    return success
+# end check_farm
+
+
+if __name__ == "__main__":
+    results = [check_reproducible(), check_rates(), check_csq(), check_server(), check_farm()]
+    sys.exit(0 if all(results) else 1)
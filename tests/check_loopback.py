@@ -0,0 +1,128 @@
+"""
+    test.check_loopback
+    SeaLandAire Technologies
+    @author: jengel
+
+Check the loopback transports. An `IridiumCommunicator` and an `IridiumServer` are connected back-to-back over the
+in-memory ports and over the pseudo terminals. Each exchanges messages with binary contents (b'\\r', b'OK' and b'READY')
+in both directions and the signal quality command rate is measured. The in-memory ports are also checked with the `IridiumHub` and
+the `AsyncIridiumCommunicator` and with a server subclass that adds a command by overriding `check_incoming`.
+
+Run with `python tests/check_loopback.py [commands]` (the pty transport is Linux/macOS only).
+"""
+import sys
+import time
+import asyncio
+
+from pyiridium9602 import Command, IridiumServer, IridiumHub, AsyncIridiumCommunicator, back_to_back, memory_pair
+
+
+MESSAGES = [b'binary \r\n OK\r\n READY\r\n', bytes(range(256)), b'AT+CSQ\r']
+
+
+def check_transport(transport, commands=500):
+    """Exchange messages and measure the signal quality command rate."""
+    with back_to_back(transport, options={'ring_alerts': False}) as loop:
+        sent = []
+        loop.server.write_iridium = lambda data: sent.append(data)
+
+        start = time.perf_counter()
+        for _ in range(commands):
+            loop.communicator.acquire_signal_quality(wait_time=5)
+        rate = commands / (time.perf_counter() - start)
+
+        # The server rings, so the message is read by the ring session or the exchange session
+        received = []
+        loop.communicator.signal.message_received = lambda message: received.append(bytes(message))
+        for msg in MESSAGES:
+            loop.server.write_serial(msg)
+            loop.communicator.exchange(msg, wait_time=5)
+        loop.communicator.wait_for_idle(5)
+        sent = [data[len(str(len(msg))):-2] for msg, data in zip(MESSAGES, sent)]
+
+    success = sent == MESSAGES and received == MESSAGES
+    print("{:<7} {:>8.0f} commands/s   messages sent {} received {}: {}".format(
+        transport, rate, len(sent), len(received), success))
+    return success
+# end check_transport
+
+
+def check_hub(count=8):
+    """Serve many communicators on in-memory ports with one hub thread."""
+    hub = IridiumHub()
+    hub.start()
+    loops = []
+    try:
+        for _ in range(count):
+            loop = back_to_back('memory', options={'ring_alerts': False}, connect=False)
+            loop.server.connect()
+            hub.register(loop.communicator)
+            loop.communicator.connect()
+            loops.append(loop)
+        numbers = [loop.communicator.acquire_serial_number(wait_time=5) for loop in loops]
+        success = numbers == [loop.server._serial_number for loop in loops]
+    finally:
+        for loop in loops:
+            loop.close()
+        hub.close()
+    print("hub     {} communicators on in-memory ports: {}".format(count, success))
+    return success
+# end check_hub
+
+
+def check_async():
+    """Run the asyncio communicator on an in-memory port."""
+    port1, port2 = memory_pair()
+    server = IridiumServer(port1, options={'ring_alerts': False})
+    server.signal.notification = lambda *args: None
+    server.connect()
+
+    async def run():
+        modem = AsyncIridiumCommunicator(port2, options={'ring_alerts': False})
+        modem.signal.notification = lambda *args: None
+        await modem.connect()
+        try:
+            return await asyncio.gather(modem.signal_quality(), modem.get_serial_number())
+        finally:
+            modem.close()
+
+    try:
+        quality, number = asyncio.run(run())
+    finally:
+        server.close()
+    success = quality == 5 and number == server._serial_number
+    print("asyncio signal quality {} serial number {}: {}".format(quality, number, success))
+    return success
+# end check_async
+
+
+class ModelServer(IridiumServer):
+    """Server that also answers the model identification command."""
+    def check_incoming(self, cmd):
+        if cmd == b'AT+CGMM':
+            return self.echo_command(cmd) + b'IRIDIUM 9600 Family SBD Transceiver\r\n\r\nOK\r\n'
+        return super().check_incoming(cmd)
+
+
+def check_custom_command():
+    """Add a command to the server by overriding check_incoming."""
+    server = ModelServer(options={'ring_alerts': False})
+    server.signal.notification = lambda *args: None
+    with back_to_back('memory', server=server, options={'ring_alerts': False}) as loop:
+        request = loop.communicator.acquire_request(b'AT+CGMM', wait_time=5)
+        quality = loop.communicator.acquire_signal_quality(wait_time=5)
+    success = request.success and b'IRIDIUM 9600' in request.data and quality == 5
+    print("server subclass command {} and {}: {}".format(bytes(request.data).strip(), Command.SIGNAL_QUALITY, success))
+    return success
+# end check_custom_command
+
+
+if __name__ == "__main__":
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    results = [check_transport('memory', num)]
+    if sys.platform != 'win32':
+        results.append(check_transport('pty', num))
+    results.append(check_hub())
+    results.append(check_async())
+    results.append(check_custom_command())
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,142 @@
+"""
+    test.check_metrics
+    SeaLandAire Technologies
+    @author: jengel
+
+Check the communicator metrics against a back-to-back `IridiumServer` with a `LinkModel` that fails some sessions. The
+command counts, byte counters, session outcomes, checksum failures and queue depths must match what was sent, the
+commands with a value must share one histogram, the number of histograms must be capped, the Prometheus text must have
+one header for each metric and the cost of the metrics on a signal quality command is measured.
+
+Run with `python tests/check_metrics.py`.
+"""
+import re
+import sys
+import time
+import asyncio
+
+from pyiridium9602 import Command, IridiumServer, AsyncIridiumCommunicator, LinkModel, CommunicatorMetrics, \
+    back_to_back, memory_pair, prometheus_text
+
+
+def check_counts(commands=200, sessions=100):
+    """Run commands and sessions and compare the metrics with what happened."""
+    with back_to_back(options={'ring_alerts': False}) as loop:
+        loop.server.link = LinkModel(5, mo_failures={18: 0.2, 32: 0.1}, mt_error_rate=0.1)
+        client = loop.communicator
+        client.metrics.reset()
+        loop.server.metrics.reset()
+
+        for _ in range(commands):
+            client.acquire_signal_quality(wait_time=5)
+        for i in range(5):
+            client.acquire_request(b'AT+SBDWT=msg%d' % i, 5)  # One histogram for the text messages
+        mo_status = {}
+        for _ in range(sessions):
+            value = client.acquire_request(Command.SESSION, 5, options={'auto_read': False}).value
+            mo_status[value.mo_status] = mo_status.get(value.mo_status, 0) + 1
+        client.wait_for_idle(5)
+
+        # Receive a message with a bad checksum
+        loop.server.link = None
+        loop.server._write_queue.append(b'bad checksum')
+        good_checksum = loop.server._silent_write
+        loop.server._silent_write = lambda msg: good_checksum(msg.replace(b'bad checksum', b'bad checksuM'))
+        client.acquire_request(Command.READ_BINARY, 5)
+        loop.server._silent_write = good_checksum
+
+        snapshot = client.metrics_snapshot()
+        written = loop.server.metrics.bytes_read  # The server writes without write_serial, so only its reads count
+
+    csq = snapshot['commands']['AT+CSQ']
+    sbdix = snapshot['commands']['AT+SBDIX']
+    sbdwt = [name for name in snapshot['commands'] if name.startswith('AT+SBDWT')]
+    capped = CommunicatorMetrics()
+    for i in range(100):
+        capped.observe_command(b'AT+X%d' % i, 0.1)
+    success = (csq['count'] == commands and sbdwt == ['AT+SBDWT='] and snapshot['commands']['AT+SBDWT=']['count'] == 5
+               and len(capped.commands) == CommunicatorMetrics.MAX_COMMANDS + 1 and
+               capped.commands[CommunicatorMetrics.OTHER_COMMANDS].count == 100 - CommunicatorMetrics.MAX_COMMANDS and
+               csq['buckets'][-1][1] == commands and sbdix['count'] >= sessions and
+               all(snapshot['sessions']['mo_status'].get(code, 0) >= count for code, count in mo_status.items()) and
+               snapshot['sessions']['mt_status'].get(2, 0) > 0 and snapshot['checksum_failures']['mt'] == 1 and
+               snapshot['bytes_written'] == written and snapshot['bytes_read'] > 0 and
+               snapshot['queues']['outbox']['depth'] == 0)
+    print("counts: {} CSQ (median bucket {} s), {} SBDIX, MO status {}, MT status {}, checksum failures {}, "
+          "{} bytes written, {} bytes read, {} reads ({} readline): {}".format(
+            csq['count'], next(bound for bound, count in csq['buckets'] if count >= commands / 2), sbdix['count'],
+            snapshot['sessions']['mo_status'], snapshot['sessions']['mt_status'], snapshot['checksum_failures'],
+            snapshot['bytes_written'], snapshot['bytes_read'], snapshot['reads'], snapshot['readline_calls'], success))
+    return success, snapshot
+# end check_counts
+
+
+def check_async_queue():
+    """Count the received messages that are dropped when the message queue is full."""
+    port1, port2 = memory_pair()
+    server = IridiumServer(port1, options={'ring_alerts': False})
+    server.signal.notification = lambda *args: None
+    server.connect()
+
+    async def run():
+        modem = AsyncIridiumCommunicator(port2, options={'ring_alerts': False}, message_queue_size=2)
+        modem.signal.notification = lambda *args: None
+        await modem.connect()
+        try:
+            for i in range(5):
+                server._write_queue.append(b'mt %d' % i)
+            while server._write_queue:
+                await modem.session()
+            await modem.wait_idle(5)
+            return modem.metrics_snapshot()
+        finally:
+            modem.close()
+
+    try:
+        snapshot = asyncio.run(run())
+    finally:
+        server.close()
+    success = snapshot['messages'] == {'received': 5, 'dropped': 3} and snapshot['queues']['messages']['depth'] == 2
+    print("async message queue {} {}: {}".format(snapshot['messages'], snapshot['queues']['messages'], success))
+    return success
+# end check_async_queue
+
+
+def check_prometheus(snapshot):
+    """Every sample belongs to a metric with a TYPE header and the histogram buckets are cumulative."""
+    text = prometheus_text([({'imei': '300234010000000'}, snapshot), ({'imei': '300234010000001'}, snapshot)])
+    types = set(re.findall(r'^# TYPE (\S+) ', text, re.M))
+    samples = [line for line in text.splitlines() if line and not line.startswith('#')]
+    names = {re.sub(r'_(bucket|sum|count)$', '', re.match(r'[a-z_]+', line).group()) for line in samples}
+    buckets = [int(line.rsplit(' ', 1)[1]) for line in samples
+               if line.startswith('pyiridium_command_latency_seconds_bucket{imei="300234010000000",command="AT+CSQ"')]
+    success = (names <= types and len(re.findall(r'^# TYPE', text, re.M)) == len(types) and
+               buckets == sorted(buckets) and buckets[-1] == snapshot['commands']['AT+CSQ']['count'] and
+               'le="+Inf"' in text)
+    print("prometheus: {} metrics, {} samples: {}".format(len(types), len(samples), success))
+    return success
+# end check_prometheus
+
+
+def measure_overhead(commands=2000):
+    """Return the signal quality command rates with and without the metrics."""
+    rates = {}
+    with back_to_back(options={'ring_alerts': False}) as loop:
+        metrics = loop.communicator.metrics
+        for _ in range(3):
+            for name, value in (('off', None), ('on', metrics)):
+                loop.communicator.metrics = value
+                start = time.perf_counter()
+                for _ in range(commands):
+                    loop.communicator.acquire_signal_quality(wait_time=5)
+                rates[name] = max(rates.get(name, 0), commands / (time.perf_counter() - start))
+    print("overhead: {:.0f} commands/s with metrics, {:.0f} commands/s without".format(rates['on'], rates['off']))
+    return rates
+# end measure_overhead
+
+
+if __name__ == "__main__":
+    counts_ok, snap = check_counts()
+    results = [counts_ok, check_async_queue(), check_prometheus(snap)]
+    measure_overhead()
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,159 @@
+"""
+    test.stress_acquire
+    SeaLandAire Technologies
+    @author: jengel
+
+Stress test the blocking `acquire_*` methods. Many threads call the methods at the same time against an
+`IridiumServer` over a pseudo terminal and every returned value is checked. The user's Signal callbacks must keep
+working and must not be replaced. Many threads also run `acquire_message` at the same time and every thread must get
+the message that its own session read.
+
+Run with `python tests/stress_acquire.py [threads] [calls per thread]` (Linux/macOS only).
+"""
+import sys
+import time
+import random
+import threading
+import collections
+
+from pyiridium9602 import IridiumCommunicator, IridiumServer, IridiumError, Signal, PtyLoopback
+
+
+class CountingSignal(Signal):
+    """Signal that counts the callbacks."""
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.lock = threading.Lock()
+
+    def _count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+
+    def signal_quality_updated(self, signal):
+        self._count('signal_quality_updated')
+
+    def serial_number_updated(self, sn):
+        self._count('serial_number_updated')
+
+    def system_time_updated(self, system_time):
+        self._count('system_time_updated')
+
+    def check_ring_updated(self, tri, sri):
+        self._count('check_ring_updated')
+
+    def notification(self, ntype, message, additional_info):
+        if ntype == "Error":
+            print(ntype, message, additional_info)
+
+
+def stress(num_threads=16, calls=50):
+    loopback = PtyLoopback()
+
+    server = IridiumServer(loopback.port1)
+    server.signal.notification = lambda *args: None
+    server.connect()
+
+    signal = CountingSignal()
+    callbacks = {name: getattr(signal, name) for name in Signal.API}
+    client = IridiumCommunicator(loopback.port2, signal=signal)
+    client.connect()
+
+    expected = {'acquire_signal_quality': 5,
+                'acquire_serial_number': server._serial_number,
+                'acquire_ring': (0, 0),
+                'acquire_system_time': int,
+                }
+    signals = {'acquire_signal_quality': 'signal_quality_updated',
+               'acquire_serial_number': 'serial_number_updated',
+               'acquire_ring': 'check_ring_updated',
+               'acquire_system_time': 'system_time_updated',
+               }
+    called = collections.Counter()
+    errors = []
+    lock = threading.Lock()
+
+    def worker(seed):
+        rand = random.Random(seed)
+        for _ in range(calls):
+            name = rand.choice(list(expected))
+            try:
+                value = getattr(client, name)(wait_time=10)
+                exp = expected[name]
+                if (isinstance(exp, type) and not isinstance(value, exp)) or \
+                        (not isinstance(exp, type) and value != exp):
+                    errors.append((name, value))
+                with lock:
+                    called[signals[name]] += 1
+            except Exception as err:
+                errors.append((name, err))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(num_threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    client.close()
+    server.close()
+    loopback.close()
+
+    total = num_threads * calls
+    replaced = [name for name, cb in callbacks.items() if getattr(signal, name) != cb]
+    print("{} threads x {} calls: {} calls in {:.2f} sec ({:.0f} calls/sec)".format(
+        num_threads, calls, total, elapsed, total / elapsed))
+    print("Wrong values or errors:", len(errors), errors[:5])
+    print("Replaced signal callbacks:", replaced)
+    print("Signal counts match:", dict(signal.counts) == dict(called))
+    return not errors and not replaced and dict(signal.counts) == dict(called)
+
+
+def stress_messages(num_threads=16, calls=5):
+    """Every acquire_message call returns the message that its own session read or raises if its session did not read
+    a message. Only half of the calls can get a message, so no message may be returned twice.
+    """
+    loopback = PtyLoopback()
+
+    server = IridiumServer(loopback.port1, options={'ring_alerts': False})
+    server.signal.notification = lambda *args: None
+    server.connect()
+    total = num_threads * calls // 2  # The server keeps at most 100 MT messages
+    for i in range(total):
+        server._write_queue.append(b'mt %d' % i)
+
+    client = IridiumCommunicator(loopback.port2, options={'ring_alerts': False})
+    client.signal.notification = lambda *args: None
+    client.connect()
+
+    messages = []
+    errors = []
+
+    def worker():
+        for _ in range(calls):
+            try:
+                messages.append(client.acquire_message(wait_time=10))
+            except IridiumError as err:
+                errors.append(err)
+
+    threads = [threading.Thread(target=worker) for _ in range(num_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    client.close()
+    server.close()
+    loopback.close()
+
+    success = sorted(messages) == sorted(b'mt %d' % i for i in range(total)) and len(errors) == len(messages)
+    print("{} threads x {} acquire_message: {} messages, {} unique, {} without a message: {}".format(
+        num_threads, calls, len(messages), len(set(messages)), len(errors), success))
+    return success
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    success = stress(*args)
+    success = stress_messages(*args[:1]) and success
+    sys.exit(0 if success else 1)